@@ -26,6 +26,7 @@ import os
 from optparse import Option, OptionParser
 import signal
 import sys
+from migration.routing_metrics import RoutingMetrics
 from service_manager_core import ServiceManagerCore
 
 PROG = os.path.basename(os.path.splitext(__file__)[0])
@@ -176,8 +177,121 @@ def parse_config_arguments():
                            "is is lower than this threshold, a migration will"+ \
                            "not be started. Default is 1.0 [percent].")
 
+    parser.add_option('-k', '--forecast_windows',
+                      action='store',
+                      type='int',
+                      default=5,
+                      dest='forecast_windows',
+                      help="number of future migration cycles, over which the"+ \
+                           "predicted savings of a migration have to exceed"+ \
+                           "the cost of the migration itself. Default is 5.")
+
+    parser.add_option('-l', '--history_decay',
+                      action='store',
+                      type='float',
+                      default=0.5,
+                      dest='history_decay',
+                      help="weight of the older traffic history in the"+ \
+                           "exponentially decayed traffic history of every"+ \
+                           "client (between 0.0 and 1.0). Default is 0.5.")
+
+    parser.add_option('-b', '--migration_downtime',
+                      action='store',
+                      type='float',
+                      default=1.0,
+                      dest='migration_downtime',
+                      help="expected downtime of the service in seconds while"+ \
+                           "restarting it on the new host. The delay of the"+ \
+                           "forecast requests during the downtime and the"+ \
+                           "transfer time of the service has to be lower than"+ \
+                           "the expected latency gain of a migration. Default is 1.0 [seconds].")
+
+    parser.add_option('-w', '--routing_metric',
+                      action='store',
+                      type='string',
+                      default='etx',
+                      dest='routing_metric',
+                      help="metric to route and to rank the possible servers"+ \
+                           "of the service. Possible metrics are etx, rtt_avg,"+ \
+                           "throughput and hop, or a comma separated composite"+ \
+                           "weight, e.g. \"etx=1.0,rtt_avg=0.001\". Default is \"etx\".")
+
+    parser.add_option('-j', '--status_coalescing_window',
+                      action='store',
+                      type='float',
+                      default=0.5,
+                      dest='status_coalescing_window',
+                      help="time window to send identical status events of"+ \
+                           "the service only once to the clients, e.g. during"+ \
+                           "a burst of events in a migration. Default is 0.5 [seconds].")
+
+    parser.add_option('-x', '--status_encoding',
+                      action='store',
+                      type='choice',
+                      choices=['json', 'binary'],
+                      default='json',
+                      dest='status_encoding',
+                      help="encoding of the published status events of the"+ \
+                           "service. Events in both encodings are accepted and"+ \
+                           "who_is requests are answered in their encoding."+ \
+                           "Default is \"json\".")
+
+    parser.add_option('-y', '--location_ttl',
+                      action='store',
+                      type='float',
+                      default=30.0,
+                      dest='location_ttl',
+                      help="time to live of the service location in the"+ \
+                           "location directory, which answers the lookups of"+ \
+                           "the clients. The service running host refreshes"+ \
+                           "the location every half TTL. Default is 30.0 [seconds].")
+
+    parser.add_option('-i', '--drain_timeout',
+                      action='store',
+                      type='float',
+                      default=10.0,
+                      dest='drain_timeout',
+                      help="maximum time for the old service instance to"+ \
+                           "finish its in-flight requests after a migration."+ \
+                           "Meanwhile, new connections are relayed to the new"+ \
+                           "host. Default is 10.0 [seconds].")
+
+    parser.add_option('-z', '--relay_grace_period',
+                      action='store',
+                      type='float',
+                      default=10.0,
+                      dest='relay_grace_period',
+                      help="time to relay the connections of clients with"+ \
+                           "a stale service location to the new host after"+ \
+                           "the old service instance has been drained. 0 closes"+ \
+                           "the relay with the drain. Default is 10.0 [seconds].")
+
+    parser.add_option('-n', '--placement_file',
+                      action='store',
+                      type='string',
+                      default='',
+                      dest='placement_file',
+                      help="path to a JSON file with the CPU, RAM and bandwidth"+ \
+                           "capacities of the hosts and the other hosted services."+ \
+                           "If given, the service is placed jointly with the other"+ \
+                           "services within the capacities. Default is \"\".")
+
+    parser.add_option('-o', '--service_arguments',
+                      action='store',
+                      type='string',
+                      default='',
+                      dest='service_arguments',
+                      help="command line arguments of the service, e.g."+ \
+                           "\"-p 4\" for four processes of the performance"+ \
+                           "service. Default is \"\".")
+
     options, unrecognized_args = parser.parse_args()
 
+    try:
+        RoutingMetrics.parse_routing_metric(options.routing_metric)
+    except ValueError as exc:
+        parser.error("invalid routing metric: {}".format(exc))
+
     return options, unrecognized_args
 
 def main():
@@ -213,6 +327,10 @@ def main():
         sys.exit("Error in options: Cannot find adjacency list file"+ \
                  "\nUse option --help for more information.")
 
+    if options.placement_file and not os.path.exists(options.placement_file):
+        sys.exit("Error in options: Cannot find service placement file"+ \
+                 "\nUse option --help for more information.")
+
     if not os.path.exists(options.service_file) and options.run_service is True:
         sys.exit("Error in options: The \"run_service\" flag has been set, but"+ \
                  "the service file couldn\'t be found!\nUse option --help for more information.")
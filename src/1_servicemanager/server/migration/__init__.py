@@ -9,7 +9,8 @@ calculations. The decisions will be send to the mediator for further actions.
 
 __all__ = ["NetworkUtilizationInspector",
            "NetworkRouter",
-           "NetworkSniffer"]
+           "NetworkSniffer",
+           "ServicePlacement"]
 
 __version__ = '1.0'
 __author__ = 'Simon Lansing'
@@ -17,3 +18,4 @@ __author__ = 'Simon Lansing'
 from migration.network_utilization_inspector import NetworkUtilizationInspector
 from migration.network_router import NetworkRouter
 from migration.network_sniffer import NetworkSniffer
+from migration.service_placement import ServicePlacement
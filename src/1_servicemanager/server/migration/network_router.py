@@ -8,10 +8,13 @@ descending ordered list of the best hosts to run the service.
 import datetime
 import json
 import logging
+import math
 import operator
 import subprocess
 import sys
 from collections import deque
+from migration.routing_metrics import RoutingMetrics
+from migration.service_placement import ServicePlacement
 from utils import Networking
 
 LOGGER = logging.getLogger(__name__)
@@ -24,18 +27,45 @@ class NetworkRouter(object):
     create a descending ordered list of the best hosts to run the service.
 
     Attributes:
+        NUM_SUBNETS (:obj:`int`): The number of subnets 10.0.X in the testbed,
+            one for every wireless interface.
+        routing_metrics (:obj:`RoutingMetrics`): the metrics to weight the
+            edges of the adjacency list.
         routing_field (:obj:`str`): the field to use for weighting while
             calculating the routing.
         own_hostname (:obj:`str`): the name of the own host.
         adjacency_list (:obj:`list` of :obj:`list`): The adjacency list with
             the predefined routes in the network.
+        interface_adjacency_lists (:obj:`dict` of :obj:`list`): The adjacency
+            lists with only the edges of a single wireless interface.
+        nodes_connection_cost_tables (:obj:`dict` of :obj:`list`):
+            the precalculated lists of the costs from all host to all other
+            for every routing metric.
         nodes_connection_cost_table (:obj:`list` of :obj:`list`):
-            a precalculated list of the costs from all host to all other.
+            a precalculated list of the costs from all host to all other with
+            the selected routing metric.
         nodes_connection_hop_table (:obj:`list` of :obj:`list`):
             a precalculated list of the costs of hops from all host to all
             other.
+        nodes_connection_throughput_table (:obj:`list` of :obj:`list`):
+            a precalculated list of the bottleneck throughput in Mbit/s on the
+            routed paths from all host to all other.
+        nodes_connection_transfer_time_table (:obj:`list` of :obj:`list`):
+            a precalculated list of the expected transfer time in seconds per
+            byte on the routed paths from all host to all other.
+        nodes_connection_delay_table (:obj:`list` of :obj:`list`):
+            a precalculated list of the one-way delay in seconds of a packet
+            on the routed paths from all host to all other.
+        SEGMENT_SIZE (:obj:`int`): The maximum payload of a packet, to
+            estimate the number of packets of the traffic.
+        DEFAULT_HOP_DELAY (:obj:`float`): The one-way delay in seconds of an
+            edge without a measured RTT.
     """
 
+    NUM_SUBNETS = 3
+    SEGMENT_SIZE = 1460
+    DEFAULT_HOP_DELAY = 0.005
+
     def __init__(self, service_manager, configuration):
         """The initialization function of the class NetworkRouter.
 
@@ -53,7 +83,8 @@ class NetworkRouter(object):
         LOGGER.debug("network_routing init")
         self.testing_flag = configuration.testing
         self.own_hostname = None
-        self.routing_field = 'etx'
+        self.routing_metrics = RoutingMetrics(getattr(configuration, 'routing_metric', 'etx'))
+        self.routing_field = RoutingMetrics.get_routing_field(self.routing_metrics.routing_metric)
 
         if self.testing_flag is False:
             cmd = "hostname | egrep -o [1-9]+[0-9]*"
@@ -91,6 +122,10 @@ class NetworkRouter(object):
                         if node_neighbor.get('node') in configuration.unreachable_hosts:
                             self.adjacency_list[node].remove(node_neighbor)
 
+                self.routing_metrics.annotate_adjacency_list(self.adjacency_list)
+                self.interface_adjacency_lists = dict(
+                    (interface, self.create_interface_adjacency_list(self.adjacency_list, interface))
+                    for interface in self.get_interfaces_of_adjacency_list(self.adjacency_list))
                 adjacency_list_loaded = True
         except IOError as exc:
             LOGGER.error("No adjacency file found on location {}, Error({})={}".format(
@@ -101,21 +136,32 @@ class NetworkRouter(object):
             LOGGER.error("Unexpected error={}".format(exc), exc_info=True)
 
         if adjacency_list_loaded is True:
-            self.total_num_hosts = len(self.adjacency_list)
-            # create table with negative values, so nodes
-            # without connections are not used as service nodes
-            self.nodes_connection_cost_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
-            self.nodes_connection_hop_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
+            self.init_nodes_connection_tables()
+
+    def init_nodes_connection_tables(self):
+        """Creates and precalculates all tables of the loaded adjacency list."""
 
-            if LOGGER.isEnabledFor(logging.DEBUG):
-                time_a = datetime.datetime.now()
+        self.total_num_hosts = len(self.adjacency_list)
+        # create table with negative values, so nodes
+        # without connections are not used as service nodes
+        self.nodes_connection_cost_tables = dict(
+            (metric, [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)])
+            for metric in self.routing_metrics.get_all_metrics())
+        self.nodes_connection_cost_table = self.nodes_connection_cost_tables[self.routing_metrics.routing_metric]
+        self.nodes_connection_hop_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
+        self.nodes_connection_throughput_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
+        self.nodes_connection_transfer_time_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
+        self.nodes_connection_delay_table = [[-1.0 for x in range(self.total_num_hosts)] for y in range(self.total_num_hosts)]
 
-            self.calculate_nodes_connection_cost_table()
-            #LOGGER.info("nodes connection cost table ={}".format(self.nodes_connection_cost_table))
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            time_a = datetime.datetime.now()
 
-            if LOGGER.isEnabledFor(logging.DEBUG):
-                time_b = datetime.datetime.now()
-                LOGGER.debug("Total time to calculate the nodes connection cost table: " + str(time_b - time_a))
+        self.calculate_nodes_connection_cost_table()
+        #LOGGER.info("nodes connection cost table ={}".format(self.nodes_connection_cost_table))
+
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            time_b = datetime.datetime.now()
+            LOGGER.debug("Total time to calculate the nodes connection cost table: " + str(time_b - time_a))
 
     def get_own_hostname(self):
         """Method that returns the own name of the host."""
@@ -139,7 +185,7 @@ class NetworkRouter(object):
             if error:
                 LOGGER.error("Error while starting network interfaces: i=" + str(interface) + ", Error=" + str(error))
 
-    def dijkstra(self, adjacency_list, initial):
+    def dijkstra(self, adjacency_list, initial, routing_field=None):
         """Calculating the paths from an initial host to all other host
 
         This method calculates the paths from an initial host to all other
@@ -149,12 +195,17 @@ class NetworkRouter(object):
             adjacency_list (:obj:`list` of :obj:`list`): The interpretation of
                 the complete network to search paths in.
             initial (:obj:`int`): The hosts to start the algorithm from.
+            routing_field (:obj:`str`, optional): The field of the edges to
+                use for weighting. Default is the selected routing field.
 
         Returns:
             The weighted path length of the nodes visited on the path and a
             chained list with the order of visited hosts.
         """
 
+        if routing_field is None:
+            routing_field = self.routing_field
+
         nodes_visited = {initial: 0.0}
         path_prev_node = {}
 
@@ -176,8 +227,17 @@ class NetworkRouter(object):
             current_weight = nodes_visited[min_node]
 
             for neighbor in adjacency_list[min_node]:
+                edge_cost = neighbor.get(routing_field)
+                if routing_field not in neighbor:
+                    # the edges of foreign adjacency lists are not annotated
+                    edge_cost = self.routing_metrics.get_edge_cost(
+                        neighbor, RoutingMetrics.get_metric(routing_field))
+
+                # edges without a measured value for the metric are not usable
+                if edge_cost is None:
+                    continue
                 try:
-                    weight = current_weight + neighbor.get(self.routing_field)
+                    weight = current_weight + edge_cost
                 except Exception as exc:
                     LOGGER.error("Error while calucalting dijkstra, Error={}".format(exc))
                     continue
@@ -209,6 +269,25 @@ class NetworkRouter(object):
         nodes_visited, path_prev_node = self.dijkstra(adjacency_list, origin)
         #LOGGER.info("{}\n\n\n{}".format(nodes_visited, path_prev_node))
 
+        return self.get_path_from_prev_nodes(nodes_visited, path_prev_node, origin, destination)
+
+    @staticmethod
+    def get_path_from_prev_nodes(nodes_visited, path_prev_node, origin, destination):
+        """Extracts the path between two hosts from the result of the Dijkstra algorithm.
+
+        Args:
+            nodes_visited (:obj:`dict`): The weighted path length of all
+                reachable hosts from the Dijkstra algorithm.
+            path_prev_node (:obj:`dict`): The chained list of the previous
+                hosts on the paths from the Dijkstra algorithm.
+            origin (:obj:`int`): The hosts the algorithm was started from.
+            destination (:obj:`int`): The hosts to find the path to.
+
+        Returns:
+            The weighted path length and a list with the ordered hosts on the
+            path or a tuple of None, if the destination is not reachable.
+        """
+
         if origin == destination:
             return nodes_visited.get(destination), [origin]
         if len(path_prev_node) < 1 or path_prev_node.get(destination) is None:
@@ -226,6 +305,59 @@ class NetworkRouter(object):
 
         return nodes_visited.get(destination), list(full_path)
 
+    @staticmethod
+    def create_interface_adjacency_list(adjacency_list, interface):
+        """Creates the adjacency list of a single wireless interface.
+
+        The adjacency lists of the testbed contain up to three parallel edges
+        between two neighbors on the different wireless interfaces. The
+        returned adjacency list only contains the edges of one interface, so
+        the paths in it use only one radio from the origin to the destination.
+
+        Args:
+            adjacency_list (:obj:`list` of :obj:`list`): The interpretation of
+                the complete network.
+            interface (:obj:`int`): The number of the wireless interface.
+
+        Returns:
+            The adjacency list with the edges of the interface.
+        """
+
+        return [[edge for edge in node_neighbors if edge.get('interface') == interface]
+                for node_neighbors in adjacency_list]
+
+    def get_interfaces_of_adjacency_list(self, adjacency_list):
+        """Returns the sorted numbers of all interfaces used by the edges."""
+
+        return sorted(set(edge.get('interface')
+                          for node_neighbors in adjacency_list
+                          for edge in node_neighbors
+                          if edge.get('interface') is not None))
+
+    def calculate_interface_disjoint_paths(self, origin, destination):
+        """Calculates a path between two hosts for every wireless interface.
+
+        Every path uses the edges of only one interface, so the paths of the
+        different interfaces do not share a radio link and can be used in
+        parallel. If the hosts are not connected on an interface, the
+        interface is missing in the result.
+
+        Args:
+            origin (:obj:`int`): The hosts to start the paths from.
+            destination (:obj:`int`): The hosts to find the paths to.
+
+        Returns:
+            A dictionary with the weighted path length and the list of the
+            ordered hosts of the path for every connected interface.
+        """
+
+        interface_paths = {}
+        for interface, interface_adjacency_list in self.interface_adjacency_lists.iteritems():
+            length, full_path = self.shortest_path(interface_adjacency_list, origin, destination)
+            if full_path is not None:
+                interface_paths[interface] = (length, full_path)
+        return interface_paths
+
     def create_subnet_of_adjacency_list(self, adjacency_list,
                                         hosts_in_subnets):
         """Creates a new adjacency list and removes all not used edges
@@ -277,52 +409,148 @@ class NetworkRouter(object):
     def add_all_network_routes(self):
         """Add the network routes to the MIOT testbed nodes for static routing.
 
-        This method adds all used routes in the network to the MIOT testbed nodes for a static routing functionality.
+        This method adds all used routes in the network to the MIOT testbed
+        nodes for a static routing functionality. The traffic to the subnet
+        10.0.X of a host is routed on the interface-disjoint path of the
+        wireless interface X, so the traffic to the different addresses of a
+        host is spread across the radios. If the hosts are not connected on
+        that interface, the best path over all interfaces is used instead.
         """
 
         hostname = self.get_own_hostname()
+
+        # one Dijkstra run per interface and one over all interfaces for every destination
+        routing_trees = dict((interface, self.dijkstra(interface_adjacency_list, hostname))
+                             for interface, interface_adjacency_list
+                             in self.interface_adjacency_lists.iteritems())
+        nodes_visited, path_prev_node = self.dijkstra(self.adjacency_list, hostname)
+
         for i in range(1, len(self.adjacency_list)):
-            length, full_path = self.shortest_path(self.adjacency_list, hostname, i)
+            if i == hostname:
+                continue
+            length, full_path = self.get_path_from_prev_nodes(nodes_visited, path_prev_node, hostname, i)
 
-            if length is not None and full_path is not None:
-                if LOGGER.getEffectiveLevel() == logging.INFO:
-                    full_path_real_node_number = [x for x in full_path]
-                    LOGGER.info(str(hostname) + "->" + str(i) + "=" +
-                                str(length) + ", array_path=" + str(full_path_real_node_number))
-                edge = filter(lambda edge: edge['node'] == full_path[1], self.adjacency_list[hostname])[0]
-
-                for net in range(3):
-                    interface = edge.get('interface')
-                    cmd = "/sbin/route add 10.0." + str(net) + "." + str(full_path[-1]) + " gw 10.0." + str(interface) + "." + str(full_path[1]) + " wlan" + str(interface)
-                    out, error = subprocess.Popen(
-                        cmd, shell=True,
-                        stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
-                    # has already been set on the testbed nodes:
-                    # out, error = subprocess.Popen("/sbin/sysctl -w net.ipv4.ip_forward=1",
-                    #                                shell=True,stdout=subprocess.PIPE,
-                    #                                stderr=subprocess.PIPE).communicate()
-                    if out:
-                        LOGGER.info("CMD="+str(cmd))
-                        LOGGER.info("SET ROUTE, out="+str(out))
-                    if error:
-                        LOGGER.error("Error: " + error)
-            else:
+            if length is None or full_path is None:
                 LOGGER.info("NO ROUTE FOUND: " + str(hostname) + "->" + str(i))
+                continue
+
+            for net in range(self.NUM_SUBNETS):
+                net_length, net_path = None, None
+                if net in routing_trees:
+                    net_length, net_path = self.get_path_from_prev_nodes(
+                        routing_trees[net][0], routing_trees[net][1], hostname, i)
+
+                if net_path is not None and len(net_path) > 1:
+                    interface = net
+                else:
+                    net_length, net_path = length, full_path
+                    interface = self.get_routed_edge(hostname, full_path[1]).get('interface')
+
+                if LOGGER.getEffectiveLevel() == logging.INFO:
+                    LOGGER.info(str(hostname) + "->10.0." + str(net) + "." + str(i) + "=" +
+                                str(net_length) + ", array_path=" + str(net_path) +
+                                ", interface=" + str(interface))
+
+                cmd = "/sbin/route add 10.0." + str(net) + "." + str(net_path[-1]) + " gw 10.0." + str(interface) + "." + str(net_path[1]) + " wlan" + str(interface)
+                out, error = subprocess.Popen(
+                    cmd, shell=True,
+                    stdout=subprocess.PIPE, stderr=subprocess.PIPE).communicate()
+                # has already been set on the testbed nodes:
+                # out, error = subprocess.Popen("/sbin/sysctl -w net.ipv4.ip_forward=1",
+                #                                shell=True,stdout=subprocess.PIPE,
+                #                                stderr=subprocess.PIPE).communicate()
+                if out:
+                    LOGGER.info("CMD="+str(cmd))
+                    LOGGER.info("SET ROUTE, out="+str(out))
+                if error:
+                    LOGGER.error("Error: " + error)
 
     def calculate_nodes_connection_cost_table(self):
-        """Calculates the used cost table with the Dijkstra algorithm.
+        """Calculates the used cost tables with the Dijkstra algorithm.
 
-        This method precalculates the used connection cost table with the
-        Dijkstra algorithm to reduce the reading time on the path weight
-        between all hosts in the network.
+        This method precalculates the connection cost tables of all routing
+        metrics with the Dijkstra algorithm in one pass over all hosts to
+        reduce the reading time on the path weight between all hosts in the
+        network for every metric.
         """
 
         for host_from in range(self.total_num_hosts):
-            nodes_visited, _ = self.dijkstra(self.adjacency_list, host_from)
-            for host_to in nodes_visited:
-                self.nodes_connection_cost_table[host_from][host_to] = nodes_visited[host_to]
+            for metric, cost_table in self.nodes_connection_cost_tables.iteritems():
+                routing_field = RoutingMetrics.get_routing_field(metric)
+                nodes_visited, path_prev_node = self.dijkstra(self.adjacency_list, host_from, routing_field)
+                for host_to in nodes_visited:
+                    cost_table[host_from][host_to] = nodes_visited[host_to]
+
+                if routing_field == self.routing_field:
+                    self.calculate_nodes_connection_throughput_of_host(host_from, nodes_visited, path_prev_node)
         #LOGGER.info(self.nodes_connection_cost_table)
 
+    def get_routed_edge(self, node_from, node_to):
+        """Returns the edge between two neighbors, which is used for routing.
+
+        The adjacency list can contain several edges between two neighbors on
+        different interfaces. The edge with the lowest routing cost is used,
+        edges without a measured value for the metric are not used for
+        routing, like in the Dijkstra algorithm.
+        """
+
+        routed_edge = None
+        for edge in self.adjacency_list[node_from]:
+            if edge.get('node') != node_to or edge.get(self.routing_field) is None:
+                continue
+            if routed_edge is None or edge.get(self.routing_field) < routed_edge.get(self.routing_field):
+                routed_edge = edge
+        return routed_edge
+
+    def calculate_nodes_connection_throughput_of_host(self, host_from, nodes_visited, path_prev_node):
+        """Calculates the bottleneck throughput, transfer time and delay of paths.
+
+        This method precalculates the bottleneck throughput of the routed
+        paths from one host to all other hosts, the expected transfer time
+        per byte and the one-way delay of a packet on these paths. The delay
+        is the sum of the half measured RTTs of all hops of the path. Paths
+        with an edge without throughput information keep the value -1 in the
+        throughput and transfer time tables.
+
+        Args:
+            host_from (:obj:`int`): The host to start the paths from.
+            nodes_visited (:obj:`dict`): The weighted path length of all
+                reachable hosts from the Dijkstra algorithm.
+            path_prev_node (:obj:`dict`): The chained list of the previous
+                hosts on the paths from the Dijkstra algorithm.
+        """
+
+        bottleneck_throughput = {host_from: float('inf')}
+        path_delay = {host_from: 0.0}
+        self.nodes_connection_transfer_time_table[host_from][host_from] = 0.0
+        self.nodes_connection_delay_table[host_from][host_from] = 0.0
+
+        # visit the hosts by their path length, so the previous host is always known
+        for host_to in sorted(nodes_visited, key=nodes_visited.get):
+            if host_to == host_from:
+                continue
+
+            edge = self.get_routed_edge(path_prev_node.get(host_to), host_to)
+            previous_delay = path_delay.get(path_prev_node.get(host_to))
+            if edge is None or previous_delay is None:
+                continue
+
+            # the rtt_avg of the adjacency list is measured in milliseconds
+            hop_delay = self.DEFAULT_HOP_DELAY
+            if edge.get('rtt_avg'):
+                hop_delay = float(edge.get('rtt_avg')) / 2000.0
+            path_delay[host_to] = previous_delay + hop_delay
+            self.nodes_connection_delay_table[host_from][host_to] = path_delay[host_to]
+
+            previous_throughput = bottleneck_throughput.get(path_prev_node.get(host_to))
+            if previous_throughput is None or not edge.get('throughput'):
+                continue
+
+            bottleneck_throughput[host_to] = min(previous_throughput, float(edge.get('throughput')))
+            self.nodes_connection_throughput_table[host_from][host_to] = bottleneck_throughput[host_to]
+            self.nodes_connection_transfer_time_table[host_from][host_to] = \
+                8.0 / (bottleneck_throughput[host_to] * 1000000)
+
     def calculate_nodes_connection_hop_table(self):
         """Calculates the hop cost table with the Dijkstra algorithm.
 
@@ -336,8 +564,122 @@ class NetworkRouter(object):
                 if path_cost_value is not None and hop_list is not None:
                     self.nodes_connection_hop_table[host_from][host_to] = len(hop_list) - 1 # minus 1, since the source is in the list, too
 
+    def calculate_migration_cost(self, node_from, node_to, payload_size):
+        """Calculates the time to transfer the service between two hosts.
+
+        The expected transfer time is calculated with the precalculated
+        bottleneck throughput of the path between both hosts.
+
+        Args:
+            node_from (:obj:`int`): The host, which sends the service.
+            node_to (:obj:`int`): The host, which receives the service.
+            payload_size (:obj:`int`): The size of the service in bytes.
+
+        Returns:
+            The expected transfer time in seconds or None, if there is no path
+            with throughput information between both hosts.
+        """
+
+        transfer_time = self.nodes_connection_transfer_time_table[node_from][node_to]
+        if transfer_time < 0.0:
+            return None
+        return transfer_time * payload_size
+
+    def calculate_weighted_migration_cost(self, node_from, node_to, payload_size):
+        """Calculates the routing cost to transfer the service between two hosts.
+
+        The cost is the size of the service payload weighted with the cost of
+        the path between both hosts, so that it has the same unit as the
+        weighted traffic used to rank the hosts. It is used, if there is no
+        throughput information about the path.
+
+        Args:
+            node_from (:obj:`int`): The host, which sends the service.
+            node_to (:obj:`int`): The host, which receives the service.
+            payload_size (:obj:`int`): The size of the service in bytes.
+
+        Returns:
+            The weighted cost of the transfer or None, if there is no path
+            between both hosts.
+        """
+
+        path_cost = self.nodes_connection_cost_table[node_from][node_to]
+        if path_cost < 0.0:
+            return None
+        return path_cost * payload_size
+
+    @classmethod
+    def calculate_packet_count(cls, payload_size):
+        """Returns the number of packets of the segment size for a payload."""
+
+        return math.ceil(payload_size / float(cls.SEGMENT_SIZE))
+
+    def calculate_total_packet_count(self, in_out_packets):
+        """Calculates the number of packets of the traffic of all clients.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`): The
+                incoming and outgoing traffic of all clients.
+
+        Returns:
+            The number of incoming and outgoing packets of the segment size.
+        """
+
+        return sum(self.calculate_packet_count(in_out_values['in']) +
+                   self.calculate_packet_count(in_out_values['out'])
+                   for in_out_values in in_out_packets.itervalues())
+
+    def calculate_latency_gain(self, in_out_packets, node_from, node_to):
+        """Calculates the expected latency gain of a migration.
+
+        The traffic of every client is split into packets of the segment
+        size. Every packet saves the difference of the one-way delays of the
+        paths to the current and to the new host, and every byte saves the
+        difference of the transfer times at the bottleneck throughput of the
+        paths. With the forecast traffic of the next migration cycles, the
+        latency gain covers the whole forecast horizon. The transfer times
+        are left out for a client, if one of its paths has no throughput
+        information.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`): The
+                incoming and outgoing traffic of all clients.
+            node_from (:obj:`int`): The current host of the service.
+            node_to (:obj:`int`): The possible new host of the service.
+
+        Returns:
+            The expected latency gain in seconds or None, if a client is not
+            reachable from one of the hosts.
+        """
+
+        transfer_time_table = self.nodes_connection_transfer_time_table
+        delay_table = self.nodes_connection_delay_table
+        latency_gain = 0.0
+        for client_node, in_out_values in in_out_packets.iteritems():
+            client_node = int(client_node)
+            delays = (delay_table[client_node][node_from],
+                      delay_table[client_node][node_to],
+                      delay_table[node_from][client_node],
+                      delay_table[node_to][client_node])
+            if min(delays) < 0.0:
+                return None
+
+            in_packets = self.calculate_packet_count(in_out_values['in'])
+            out_packets = self.calculate_packet_count(in_out_values['out'])
+            latency_gain += in_packets * (delays[0] - delays[1]) + \
+                            out_packets * (delays[2] - delays[3])
+
+            transfer_times = (transfer_time_table[client_node][node_from],
+                              transfer_time_table[client_node][node_to],
+                              transfer_time_table[node_from][client_node],
+                              transfer_time_table[node_to][client_node])
+            if min(transfer_times) >= 0.0:
+                latency_gain += in_out_values['in'] * (transfer_times[0] - transfer_times[1]) + \
+                                in_out_values['out'] * (transfer_times[2] - transfer_times[3])
+        return latency_gain
+
     def calculcate_central_node_from_recent_connections(
-            self, recent_in_out_packets, recent_in_out_packets_total):
+            self, recent_in_out_packets, recent_in_out_packets_total, metric=None):
         """Main algorithm to calculate the best service running hosts.
 
         This method contains the main function of this class and calculates
@@ -351,11 +693,17 @@ class NetworkRouter(object):
                 outgoing traffic in this time slot.
             recent_in_out_packets_total(:obj:`int`): The total number of recent
                 incoming and outgoing data traffic, measured in bytes.
+            metric (:obj:`str`, optional): The routing metric to rank the
+                hosts with. Default is the selected routing metric.
 
         Returns:
             A list of the best nodes to run the server in descending order.
         """
 
+        cost_table = self.nodes_connection_cost_table
+        if metric is not None:
+            cost_table = self.nodes_connection_cost_tables[metric]
+
         #mostly_connected_nodes = sorted(
         #    recently_connected_nodes_counter.items(),
         #    key=operator.itemgetter(1), reverse=True
@@ -366,8 +714,8 @@ class NetworkRouter(object):
             for client_node, in_out_values in recent_in_out_packets.iteritems():
                 # calculate procentual cost of the mostly_connected_nodes
                 # to all possible server nodes
-                cost_to_server = self.nodes_connection_cost_table[int(client_node)][possible_new_server]
-                cost_from_server = self.nodes_connection_cost_table[possible_new_server][int(client_node)]
+                cost_to_server = cost_table[int(client_node)][possible_new_server]
+                cost_from_server = cost_table[possible_new_server][int(client_node)]
 
                 if cost_to_server >= 0.0 and cost_from_server >= 0.0:
                     #LOGGER.debug('cost to server: ' + str(cost_to_server))
@@ -386,3 +734,35 @@ class NetworkRouter(object):
         best_nodes = filter(lambda a: a[1] != -1, new_servers_ranked)
 
         return best_nodes
+
+    def calculate_joint_service_placement(self, services_in_out_packets,
+                                          node_capacities, services_demands=None,
+                                          candidate_nodes=None, time_bound=1.0):
+        """Calculates the joint placement of several services.
+
+        This method assigns all given services at once to the possible
+        service hosts and respects the capacities of the hosts, so that the
+        services are not all placed on the same central host.
+
+        Args:
+            services_in_out_packets (:obj:`dict` of :obj:`dict`): The traffic
+                matrices of all services, keyed by the service ID.
+            node_capacities (:obj:`dict` of :obj:`dict` of :obj:`float`): The
+                CPU, RAM and bandwidth capacities of the hosts.
+            services_demands (:obj:`dict` of :obj:`dict` of :obj:`float`,
+                optional): The CPU, RAM and bandwidth demands of the services.
+            candidate_nodes (:obj:`list` of :obj:`int`, optional): The
+                possible hosts of the services.
+            time_bound (:obj:`float`, optional): The maximum time in seconds
+                for the calculation. Default is 1.0.
+
+        Returns:
+            A tuple of the assignment from the service ID to the host and the
+            total weighted cost of all placed services.
+        """
+
+        service_placement = ServicePlacement(self.nodes_connection_cost_table,
+                                             node_capacities, time_bound)
+        return service_placement.place_services(services_in_out_packets,
+                                                services_demands,
+                                                candidate_nodes)
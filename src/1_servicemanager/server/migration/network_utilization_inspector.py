@@ -5,6 +5,7 @@ cycle, if there is a better host to run the service. This information will be
 sent to the service manager core.
 """
 
+import json
 import logging
 import subprocess
 import threading
@@ -34,12 +35,22 @@ class NetworkUtilizationInspector(object):
             incoming and outgoing data traffic, measured in bytes.
         best_new_choosen_nodes (:obj:`list` of :obj:`(int, int)`): A sorted
             list of all possible service hosts.
+        traffic_history (:obj:`dict` of :obj:`dict` of :obj:`list`): The
+            exponentially decayed level and trend of the incoming and
+            outgoing traffic of every client over the past migration cycles.
         check_cpu_ram_timer (:obj:`RepeatedTimer`): Timer to repeatedly check
             the current CPU and RAM status of the service on the host.
         cpu_ram_check_lock (:obj:`threading.Lock`): A lock that no two or
             more checks could occur in the same time.
+        service_placement (:obj:`dict`): The capacities of the hosts, the
+            other hosted services and the demands of this service for the
+            joint placement or None.
     """
 
+    TREND_SMOOTHING = 0.3
+    # the ID of this service in the joint placement with the other services
+    PLACEMENT_SERVICE_ID = 'service'
+
     def __init__(self, service_manager, configuration):
         """The initialization function of the NetworkUtilizationInspector.
 
@@ -68,10 +79,18 @@ class NetworkUtilizationInspector(object):
         self.cpu_threshold = configuration.cpu_threshold
         self.ram_threshold = configuration.ram_threshold
         self.migration_threshold = configuration.migration_threshold
+        self.forecast_windows = configuration.forecast_windows
+        self.history_decay = configuration.history_decay
+        self.migration_downtime = configuration.migration_downtime
 
         self.cb_send_service = service_manager.do_service_send_callback
         self.cb_no_recent_connections = service_manager.no_recent_connections_callback
         self.cb_calculate_central_node = service_manager.calculate_central_node_callback
+        self.cb_calculate_migration_cost = service_manager.calculate_migration_cost_callback
+        self.cb_calculate_weighted_migration_cost = service_manager.calculate_weighted_migration_cost_callback
+        self.cb_calculate_latency_gain = service_manager.calculate_latency_gain_callback
+        self.cb_calculate_packet_count = service_manager.calculate_packet_count_callback
+        self.cb_calculate_joint_service_placement = service_manager.calculate_joint_service_placement_callback
 
         #self.own_pid = os.getpid()
         self.check_connections_timer = None
@@ -79,12 +98,15 @@ class NetworkUtilizationInspector(object):
         self.recent_in_out_packets = defaultdict(lambda: defaultdict(int))
         self.recent_in_out_packets_total = 0
         self.best_new_choosen_nodes = None
+        self.traffic_history = defaultdict(lambda: {'in': None, 'out': None})
 
         self.check_cpu_ram_timer = None
         self.service_pid = None
         self.cpu_ram_check_lock = threading.Lock()
         self.recent_cpu_ram_usage = {'cpu': 0.0, 'ram': 0.0, 'counter':0}
 
+        self.service_placement = self.load_service_placement(configuration.placement_file)
+
     def __enter__(self):
         LOGGER.debug("migration_checker enter")
         return self
@@ -275,19 +297,212 @@ class NetworkUtilizationInspector(object):
         finally:
             self.cpu_ram_check_lock.release()
 
+    def update_traffic_history(self, in_out_packets):
+        """Adds the traffic of the last migration cycle to the history.
+
+        The history of every client contains an exponentially decayed level
+        and trend of its incoming and outgoing traffic (double exponential
+        smoothing). Clients without traffic in the last cycle decay towards
+        zero and are removed from the history, if they are fully faded out.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`): The
+                incoming and outgoing traffic of the last migration cycle.
+        """
+
+        level_smoothing = 1.0 - self.history_decay
+        for node_id in set(self.traffic_history.keys()) | set(in_out_packets.keys()):
+            history = self.traffic_history[node_id]
+            for direction in ('in', 'out'):
+                observed = float(in_out_packets.get(node_id, {}).get(direction, 0))
+                if history[direction] is None:
+                    # new clients fade in from zero, so a first burst is damped
+                    history[direction] = [level_smoothing * observed, 0.0]
+                    continue
+
+                level, trend = history[direction]
+                new_level = level_smoothing * observed + (1.0 - level_smoothing) * (level + trend)
+                trend = self.TREND_SMOOTHING * (new_level - level) + (1.0 - self.TREND_SMOOTHING) * trend
+                history[direction] = [new_level, trend]
+
+            if history['in'][0] < 1.0 and history['out'][0] < 1.0:
+                del self.traffic_history[node_id]
+
+    def forecast_traffic(self):
+        """Predicts the traffic of every client in the next migration cycles.
+
+        Returns:
+            A dictionary in the format of recent_in_out_packets with the
+            summed up predicted traffic of the next forecast_windows cycles
+            and the total predicted traffic.
+        """
+
+        forecast_in_out_packets = defaultdict(lambda: defaultdict(int))
+        forecast_total = 0.0
+        for node_id, history in self.traffic_history.iteritems():
+            for direction in ('in', 'out'):
+                level, trend = history[direction]
+                predicted = sum(max(0.0, level + window * trend)
+                                for window in range(1, self.forecast_windows + 1))
+                forecast_in_out_packets[node_id][direction] = predicted
+                forecast_total += predicted
+
+        return forecast_in_out_packets, forecast_total
+
+    def is_migration_worthwhile(self, new_node, forecast_in_out_packets, own_value, new_value):
+        """Weighs the cost of a migration against its expected latency gain.
+
+        The latency gain is the sum of the latency savings of all forecast
+        packets over the next migration cycles on the new host. The service is
+        not available during the transfer time of the service and one
+        downtime, so the forecast packets in this time wait on average half
+        of it. This delay of the stalled packets is the cost of the
+        migration. If there is no throughput information about the paths, the
+        savings are the difference of the forecast ranking values of the own
+        and the new host and the cost is the service size weighted with the
+        routing cost of the path to the new host.
+
+        Args:
+            new_node (:obj:`int`): The possible new host of the service.
+            forecast_in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`):
+                The forecast traffic of all clients.
+            own_value (:obj:`float`): The forecast ranking value of the own
+                host or None, if the own host does not reach all clients.
+            new_value (:obj:`float`): The forecast ranking value of the new
+                host.
+
+        Returns:
+            False, if the migration costs more than it saves, True otherwise.
+        """
+
+        transfer_time = self.cb_calculate_migration_cost(new_node)
+        latency_gain = self.cb_calculate_latency_gain(forecast_in_out_packets, new_node)
+
+        if transfer_time is None or latency_gain is None:
+            if own_value is None:
+                LOGGER.info("The own host does not reach all clients, migration to %s is worthwhile.", new_node)
+                return True
+
+            weighted_cost = self.cb_calculate_weighted_migration_cost(new_node)
+            if weighted_cost is None:
+                LOGGER.info("New server %s is not reachable.", new_node)
+                return False
+
+            LOGGER.info("No throughput information to new server %s, savings=%s, weighted_cost=%s",
+                        new_node, own_value - new_value, weighted_cost)
+            return own_value - new_value > weighted_cost
+
+        # the service is down once per migration for the packets arriving meanwhile
+        migration_time = transfer_time + self.migration_downtime
+        forecast_time = float(self.forecast_windows * self.connection_check_time)
+        stalled_packets = self.cb_calculate_packet_count(forecast_in_out_packets) * \
+                          min(1.0, migration_time / forecast_time)
+        migration_cost = stalled_packets * migration_time / 2.0
+        LOGGER.info("latency_gain=%s, transfer_time=%s, stalled_packets=%s, migration_cost=%s, forecast_windows=%s",
+                    latency_gain, transfer_time, stalled_packets, migration_cost, self.forecast_windows)
+        return latency_gain > migration_cost
+
+    @staticmethod
+    def load_service_placement(placement_file):
+        """Loads the configuration of the joint placement of all services.
+
+        The file contains the CPU, RAM and bandwidth capacities of the hosts,
+        the traffic matrices and demands of the other hosted services and the
+        demands of this service, e.g.
+
+            {"capacities": {"6": {"cpu": 100.0, "ram": 50.0}},
+             "services": {"sensor": {"in_out_packets": {"9": {"in": 1000, "out": 500}},
+                                     "demands": {"cpu": 40.0}}},
+             "demands": {"cpu": 40.0},
+             "time_bound": 1.0}
+
+        Args:
+            placement_file (:obj:`str`): The path of the file or None.
+
+        Returns:
+            The placement configuration or None, if there is no file.
+        """
+
+        if not placement_file:
+            return None
+
+        try:
+            with open(placement_file, 'r') as service_placement_file:
+                service_placement = json.load(service_placement_file)
+        except (IOError, ValueError) as exc:
+            LOGGER.error("Cannot load the service placement file %s, Error=%s", placement_file, exc)
+            return None
+
+        # the hosts are keyed by their node ID
+        service_placement['capacities'] = dict(
+            (int(node), capacities)
+            for node, capacities in service_placement.get('capacities', {}).iteritems())
+        service_placement.setdefault('services', {})
+        service_placement.setdefault('demands', {})
+        service_placement.setdefault('time_bound', 1.0)
+        return service_placement
+
+    def apply_joint_service_placement(self, choosen_nodes, forecast_in_out_packets):
+        """Places this service jointly with the other hosted services.
+
+        The host of this service in the joint placement is moved to the front
+        of the possible hosts, so that the service does not overload a host,
+        which is already used by other services. The migration threshold and
+        the migration cost still decide, if the migration is started.
+
+        Args:
+            choosen_nodes (:obj:`list` of :obj:`(int, int)`): The sorted list
+                of the possible service hosts.
+            forecast_in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`):
+                The forecast traffic of all clients of this service.
+
+        Returns:
+            The list of the possible service hosts starting with the host of
+            the joint placement.
+        """
+
+        services_in_out_packets = {}
+        services_demands = {}
+        for service_id, service in self.service_placement['services'].iteritems():
+            services_in_out_packets[service_id] = service.get('in_out_packets', {})
+            services_demands[service_id] = service.get('demands')
+        services_in_out_packets[self.PLACEMENT_SERVICE_ID] = forecast_in_out_packets
+        services_demands[self.PLACEMENT_SERVICE_ID] = self.service_placement['demands']
+
+        assignment, total_cost = self.cb_calculate_joint_service_placement(
+            services_in_out_packets,
+            self.service_placement['capacities'],
+            services_demands,
+            [node[0] for node in choosen_nodes],
+            self.service_placement['time_bound'])
+        LOGGER.info("Joint placement=%s, total cost=%s", assignment, total_cost)
+
+        placed_node = assignment.get(self.PLACEMENT_SERVICE_ID)
+        if placed_node is None:
+            LOGGER.info("No host for the service found in the joint placement.")
+            return choosen_nodes
+
+        # the sort is stable, so the other hosts keep their order
+        return sorted(choosen_nodes, key=lambda node: node[0] != placed_node)
+
     def check_recent_connections_for_best_server(self):
         """Checks the recent connections to calculate the best host.
 
         This method is called once every migration cycle to check, which host
-        is the best to run the service instance. It uses all gathered
-        information from packets and hosts to allocate the best service. The
-        results will be informed to the service manager core.
+        is the best to run the service instance. It uses the decayed traffic
+        history of all clients and its forecast over the next cycles to
+        allocate the best service, so that short bursts of single clients do
+        not trigger a migration. A migration is only started, if the predicted
+        savings exceed the cost of the migration. The results will be informed
+        to the service manager core.
         """
 
         LOGGER.debug("enter")
         try:
             self.connection_check_lock.acquire()
 
+            self.update_traffic_history(self.recent_in_out_packets)
+
             if self.recent_in_out_packets_total == 0:
                 self.cb_no_recent_connections()
                 return
@@ -295,9 +510,10 @@ class NetworkUtilizationInspector(object):
             #LOGGER.debug("start calculating central node from recent connections\ntotal={},\nseperated={}".format(
             #    self.recent_in_out_packets_total,
             #    self.recent_in_out_packets))
+            forecast_in_out_packets, forecast_total = self.forecast_traffic()
             best_nodes = self.cb_calculate_central_node(
-                self.recent_in_out_packets,
-                self.recent_in_out_packets_total)
+                forecast_in_out_packets,
+                forecast_total)
 
             if best_nodes is not [] and best_nodes[0][0] != self.own_node_id:
                 # the instance variable can be set,
@@ -312,6 +528,10 @@ class NetworkUtilizationInspector(object):
                 else:
                     self.best_new_choosen_nodes = best_nodes
 
+                if self.service_placement is not None and self.best_new_choosen_nodes:
+                    self.best_new_choosen_nodes = self.apply_joint_service_placement(
+                        self.best_new_choosen_nodes, forecast_in_out_packets)
+
                 LOGGER.info("Best Nodes: " + str(self.best_new_choosen_nodes))
 
                 # if the value between the best new server and the already running server is smaller than the migration threshold, do not migrate
@@ -331,6 +551,15 @@ class NetworkUtilizationInspector(object):
                                 LOGGER.info("The new server wouldn't be really better as a server. Migration rejected.")
                                 return
 
+                # the own host can be missing in the list of possible servers, so its value is taken from all nodes
+                if self.best_new_choosen_nodes and \
+                   not self.is_migration_worthwhile(self.best_new_choosen_nodes[0][0],
+                                                    forecast_in_out_packets,
+                                                    dict(best_nodes).get(self.own_node_id),
+                                                    self.best_new_choosen_nodes[0][1]):
+                    LOGGER.info("The predicted savings don't exceed the migration cost. Migration rejected.")
+                    return
+
                 avg_cpu, avg_ram = self.calculate_avg_cpu_and_ram_out_of_recent_usage()
                 LOGGER.info("avg cpu=" + str(avg_cpu) + ", avg ram=" + str(avg_ram))
 
@@ -0,0 +1,146 @@
+"""The module contains the metrics to weight the edges of the network.
+
+The RoutingMetrics of this module translates the measured values of every
+edge in the adjacency list (ETX, RTT, throughput and the hop itself) into
+routing costs, so that the NetworkRouter can calculate the cost tables for all
+metrics and for a composite weight of several metrics in the same pass.
+"""
+
+import logging
+
+LOGGER = logging.getLogger(__name__)
+
+def inverse_throughput(edge):
+    """Returns the inverse throughput of an edge as its routing cost."""
+
+    if not edge.get('throughput'):
+        return None
+    return 1.0 / float(edge.get('throughput'))
+
+class RoutingMetrics(object):
+    """This class calculates the routing costs of the edges for all metrics.
+
+    The RoutingMetrics class annotates every edge of an adjacency list with
+    its cost for every metric and the configured composite weight. The costs
+    are stored as additional fields of the edges, so the Dijkstra algorithm
+    can use them like the original measured values.
+
+    Example:
+        The routing metric is either the name of a single metric or a comma
+        separated list of weighted metrics:
+            etx
+            etx=1.0,rtt_avg=0.001
+
+    Attributes:
+        METRICS (:obj:`dict` of :obj:`function`): The functions to calculate
+            the routing cost of an edge for every metric.
+        COMPOSITE (:obj:`str`): The name of the composite metric.
+        metric_weights (:obj:`dict` of :obj:`float`): The weights of the
+            metrics in the composite metric.
+        routing_metric (:obj:`str`): The name of the selected metric.
+    """
+
+    METRICS = {'etx': lambda edge: edge.get('etx'),
+               'rtt_avg': lambda edge: edge.get('rtt_avg'),
+               'throughput': inverse_throughput,
+               'hop': lambda edge: 1.0}
+    COMPOSITE = 'composite'
+
+    def __init__(self, routing_metric='etx'):
+        """The initialization function of the class RoutingMetrics.
+
+        Args:
+            routing_metric (:obj:`str`, optional): The name of a single metric
+                or the comma separated weights of a composite metric. Default
+                is 'etx'.
+
+        Raises:
+            ValueError: If the routing metric contains an unknown metric.
+        """
+
+        self.metric_weights = self.parse_routing_metric(routing_metric)
+
+        if len(self.metric_weights) == 1 and self.metric_weights.values()[0] == 1.0:
+            self.routing_metric = self.metric_weights.keys()[0]
+        else:
+            self.routing_metric = self.COMPOSITE
+
+        LOGGER.debug("routing metric=%s, weights=%s", self.routing_metric, self.metric_weights)
+
+    @classmethod
+    def parse_routing_metric(cls, routing_metric):
+        """Parses the weights of the metrics from the given routing metric.
+
+        Args:
+            routing_metric (:obj:`str`): The name of a single metric or the
+                comma separated weights of a composite metric.
+
+        Returns:
+            A dictionary with the weight of every used metric.
+        """
+
+        metric_weights = {}
+        for metric_weight in str(routing_metric).split(','):
+            metric, _, weight = metric_weight.strip().partition('=')
+            if metric not in cls.METRICS:
+                raise ValueError("Unknown routing metric '{}', possible metrics are {}".format(
+                    metric, sorted(cls.METRICS.keys())))
+            metric_weights[metric] = float(weight) if weight else 1.0
+        return metric_weights
+
+    @staticmethod
+    def get_routing_field(metric):
+        """Returns the name of the edge field with the cost of a metric."""
+
+        return 'cost_' + metric
+
+    @staticmethod
+    def get_metric(routing_field):
+        """Returns the name of the metric of an edge field with its cost."""
+
+        return routing_field[len('cost_'):]
+
+    def get_all_metrics(self):
+        """Returns the names of all metrics including the composite one."""
+
+        return sorted(self.METRICS.keys()) + [self.COMPOSITE]
+
+    def get_edge_cost(self, edge, metric):
+        """Calculates the routing cost of an edge for a metric.
+
+        Args:
+            edge (:obj:`dict`): The edge of the adjacency list.
+            metric (:obj:`str`): The name of the metric or the composite one.
+
+        Returns:
+            The routing cost of the edge or None, if a measured value is
+            missing for the metric.
+        """
+
+        if metric != self.COMPOSITE:
+            return self.METRICS[metric](edge)
+
+        composite_cost = 0.0
+        for weighted_metric, weight in self.metric_weights.iteritems():
+            cost = self.METRICS[weighted_metric](edge)
+            if cost is None:
+                return None
+            composite_cost += weight * cost
+        return composite_cost
+
+    def annotate_adjacency_list(self, adjacency_list):
+        """Adds the routing costs of all metrics to every edge.
+
+        The edges of the adjacency list are extended in one pass with the
+        cost of every single metric and the composite metric. An edge without
+        a measured value for a metric gets the cost None for it.
+
+        Args:
+            adjacency_list (:obj:`list` of :obj:`list`): The adjacency list
+                with the edges of the network.
+        """
+
+        for node_neighbors in adjacency_list:
+            for edge in node_neighbors:
+                for metric in self.get_all_metrics():
+                    edge[self.get_routing_field(metric)] = self.get_edge_cost(edge, metric)
@@ -0,0 +1,244 @@
+"""The module contains the functions to place several services jointly.
+
+The ServicePlacement of this module assigns all hosted services at once to the
+possible service hosts. In contrast to the ranking of the NetworkRouter, which
+looks at one service in isolation, the placement respects the CPU, RAM and
+bandwidth capacities of the hosts, so that several services do not flock to
+the same central host and overload it.
+"""
+
+import logging
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+class ServicePlacement(object):
+    """This class calculates a joint placement of several services.
+
+    The ServicePlacement class solves a capacitated facility location problem
+    with a heuristic. The services are placed greedily in the order of their
+    regret (the additional cost, if the best host could not be used) and the
+    assignment is improved afterwards with a local search of relocations and
+    swaps until no improvement is found or the time bound is reached. The
+    time bound covers the whole calculation: the services, which have not
+    been placed before the deadline, stay without a host.
+
+    Attributes:
+        RESOURCES (:obj:`tuple` of :obj:`str`): The resources, which are
+            limited on every host.
+        nodes_connection_cost_table (:obj:`list` of :obj:`list`):
+            a precalculated list of the costs from all host to all other.
+        node_capacities (:obj:`dict` of :obj:`dict` of :obj:`float`): The
+            capacities of every host, e.g. {3: {'cpu': 100.0, 'ram': 50.0,
+            'bandwidth': 1000000}}. Missing hosts or resources are unlimited.
+        time_bound (:obj:`float`): The maximum time in seconds for the
+            calculation of the placement.
+    """
+
+    RESOURCES = ('cpu', 'ram', 'bandwidth')
+
+    def __init__(self, nodes_connection_cost_table, node_capacities=None, time_bound=1.0):
+        """The initialization function of the class ServicePlacement.
+
+        Args:
+            nodes_connection_cost_table (:obj:`list` of :obj:`list`):
+                a precalculated list of the costs from all host to all other,
+                e.g. from the NetworkRouter.
+            node_capacities (:obj:`dict` of :obj:`dict` of :obj:`float`,
+                optional): The capacities of the hosts.
+            time_bound (:obj:`float`, optional): The maximum time in seconds
+                for the calculation of the placement. Default is 1.0.
+        """
+
+        self.nodes_connection_cost_table = nodes_connection_cost_table
+        self.node_capacities = node_capacities if node_capacities is not None else {}
+        self.time_bound = time_bound
+
+    def get_node_capacity(self, node, resource):
+        """Returns the capacity of a resource on a host or infinity."""
+
+        return float(self.node_capacities.get(node, {}).get(resource, float('inf')))
+
+    def calculate_service_cost(self, in_out_packets, node):
+        """Calculates the weighted cost of a service running on a host.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`):
+                A dictionary, containing all with the service connected client
+                hosts and the amount of the incoming and outgoing traffic.
+            node (:obj:`int`): The possible host of the service.
+
+        Returns:
+            The sum of all ETX weighted incoming and outgoing traffic or None,
+            if one of the clients is not reachable from the host.
+        """
+
+        total_cost = 0.0
+        for client_node, in_out_values in in_out_packets.iteritems():
+            cost_to_server = self.nodes_connection_cost_table[int(client_node)][node]
+            cost_from_server = self.nodes_connection_cost_table[node][int(client_node)]
+
+            if cost_to_server < 0.0 or cost_from_server < 0.0:
+                return None
+
+            total_cost += cost_to_server * in_out_values.get('in', 0) + \
+                          cost_from_server * in_out_values.get('out', 0)
+        return total_cost
+
+    def get_service_demands(self, in_out_packets, demands):
+        """Returns the resource demands of a service.
+
+        If no bandwidth demand is given, the total recent traffic of the
+        service will be used as its bandwidth demand.
+        """
+
+        service_demands = dict((resource, 0.0) for resource in self.RESOURCES)
+        service_demands['bandwidth'] = float(sum(
+            in_out_values.get('in', 0) + in_out_values.get('out', 0)
+            for in_out_values in in_out_packets.itervalues()))
+
+        if demands:
+            service_demands.update(demands)
+        return service_demands
+
+    def fits_on_node(self, node, demands, node_usage):
+        """Checks if the demands fit into the remaining capacity of a host."""
+
+        for resource in self.RESOURCES:
+            if node_usage[node][resource] + demands[resource] > self.get_node_capacity(node, resource):
+                return False
+        return True
+
+    def place_services(self, services_in_out_packets, services_demands=None, candidate_nodes=None):
+        """Main algorithm to calculate the joint placement of all services.
+
+        Args:
+            services_in_out_packets (:obj:`dict` of :obj:`dict`): The traffic
+                matrices of all services, keyed by the service ID. Every value
+                has the same format as the recent_in_out_packets of the
+                NetworkUtilizationInspector.
+            services_demands (:obj:`dict` of :obj:`dict` of :obj:`float`,
+                optional): The CPU, RAM and bandwidth demands of every service.
+            candidate_nodes (:obj:`list` of :obj:`int`, optional): The possible
+                hosts of the services. Default are all hosts in the cost table.
+
+        Returns:
+            A tuple of the assignment as a dictionary from the service ID to
+            the host (None, if the service could not be placed in capacity or
+            in time) and the total weighted cost of all placed services.
+        """
+
+        deadline = time.time() + self.time_bound
+        if services_demands is None:
+            services_demands = {}
+        if candidate_nodes is None:
+            candidate_nodes = range(len(self.nodes_connection_cost_table))
+
+        # precalculate the cost of every service on every possible host
+        service_costs = {}
+        demands = {}
+        for service_id, in_out_packets in services_in_out_packets.iteritems():
+            if time.time() >= deadline:
+                LOGGER.info("Time bound reached while calculating the costs of the services.")
+                break
+            demands[service_id] = self.get_service_demands(in_out_packets,
+                                                           services_demands.get(service_id))
+            service_costs[service_id] = {}
+            for node in candidate_nodes:
+                cost = self.calculate_service_cost(in_out_packets, node)
+                if cost is not None:
+                    service_costs[service_id][node] = cost
+
+        node_usage = dict((node, dict((resource, 0.0) for resource in self.RESOURCES))
+                          for node in candidate_nodes)
+        assignment = dict((service_id, None) for service_id in services_in_out_packets)
+
+        # greedy construction: services with the highest regret first
+        def regret(service_id):
+            costs = sorted(service_costs[service_id].itervalues())
+            if len(costs) < 2:
+                return float('inf')
+            return costs[1] - costs[0]
+
+        for service_id in sorted(service_costs, key=regret, reverse=True):
+            if time.time() >= deadline:
+                LOGGER.info("Time bound reached while placing service %s.", service_id)
+                break
+            for node, _ in sorted(service_costs[service_id].iteritems(), key=lambda item: item[1]):
+                if self.fits_on_node(node, demands[service_id], node_usage):
+                    self.__add_usage(node_usage, node, demands[service_id], 1)
+                    assignment[service_id] = node
+                    break
+            else:
+                LOGGER.info("No host with enough capacity for service %s found.", service_id)
+
+        # local search: relocate single services and swap pairs of services
+        improved = True
+        while improved and time.time() < deadline:
+            improved = self.__relocate_services(assignment, service_costs, demands,
+                                                node_usage, deadline) or \
+                       self.__swap_services(assignment, service_costs, demands,
+                                            node_usage, deadline)
+
+        total_cost = sum(service_costs[service_id][node]
+                         for service_id, node in assignment.iteritems() if node is not None)
+        LOGGER.debug("Joint placement=%s, total cost=%s", assignment, total_cost)
+        return assignment, total_cost
+
+    @staticmethod
+    def __add_usage(node_usage, node, demands, sign):
+        for resource, value in demands.iteritems():
+            if resource in node_usage[node]:
+                node_usage[node][resource] += sign * value
+
+    def __relocate_services(self, assignment, service_costs, demands, node_usage, deadline):
+        for service_id, current_node in assignment.iteritems():
+            if current_node is None:
+                continue
+            current_cost = service_costs[service_id][current_node]
+            self.__add_usage(node_usage, current_node, demands[service_id], -1)
+
+            best_node = current_node
+            for node, cost in service_costs[service_id].iteritems():
+                if cost < service_costs[service_id][best_node] and \
+                   self.fits_on_node(node, demands[service_id], node_usage):
+                    best_node = node
+
+            self.__add_usage(node_usage, best_node, demands[service_id], 1)
+            if service_costs[service_id][best_node] < current_cost:
+                assignment[service_id] = best_node
+                return True
+            if time.time() >= deadline:
+                break
+        return False
+
+    def __swap_services(self, assignment, service_costs, demands, node_usage, deadline):
+        placed_services = [service_id for service_id, node in assignment.iteritems()
+                           if node is not None]
+        for index, service_a in enumerate(placed_services):
+            for service_b in placed_services[index + 1:]:
+                if time.time() >= deadline:
+                    return False
+                node_a, node_b = assignment[service_a], assignment[service_b]
+                if node_a == node_b or \
+                   node_b not in service_costs[service_a] or \
+                   node_a not in service_costs[service_b]:
+                    continue
+
+                gain = service_costs[service_a][node_a] + service_costs[service_b][node_b] - \
+                       service_costs[service_a][node_b] - service_costs[service_b][node_a]
+                if gain <= 0.0:
+                    continue
+
+                self.__add_usage(node_usage, node_a, demands[service_a], -1)
+                self.__add_usage(node_usage, node_b, demands[service_b], -1)
+                if self.fits_on_node(node_b, demands[service_a], node_usage) and \
+                   self.fits_on_node(node_a, demands[service_b], node_usage):
+                    self.__add_usage(node_usage, node_b, demands[service_a], 1)
+                    self.__add_usage(node_usage, node_a, demands[service_b], 1)
+                    assignment[service_a], assignment[service_b] = node_b, node_a
+                    return True
+
+                self.__add_usage(node_usage, node_a, demands[service_a], 1)
+                self.__add_usage(node_usage, node_b, demands[service_b], 1)
+        return False
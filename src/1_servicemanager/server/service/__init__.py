@@ -6,7 +6,9 @@ the second one can start, stop the service and notifies all clients,
 when the service status has been changed.
 """
 
-__all__ = ["ServiceHandler",
+__all__ = ["LocationDirectory",
+           "ServiceHandler",
+           "ServiceRelay",
            "ServiceTransporter",
            "ServiceStatusCodes",
            "TransportStatusCodes"]
@@ -14,7 +16,9 @@ __all__ = ["ServiceHandler",
 __version__ = '1.0'
 __author__ = 'Simon Lansing'
 
+from service.location_directory import LocationDirectory
 from service.service_handler import ServiceHandler
 from service.service_handler import ServiceStatusCodes
+from service.service_relay import ServiceRelay
 from service.service_transporter import ServiceTransporter
 from service.service_transporter import TransportStatusCodes
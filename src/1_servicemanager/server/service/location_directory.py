@@ -0,0 +1,153 @@
+"""The module contains the directory of the current service locations.
+
+Every service manager keeps the current location of the service, which it
+learns from the status events of the service handlers in the network. The
+clients resolve the current server with one unicast lookup at their local
+service manager instead of flooding the network with who_is broadcasts.
+"""
+
+import logging
+import socket
+import threading
+import time
+from utils import RepeatedTimer
+from utils import StatusCodec
+
+LOGGER = logging.getLogger(__name__)
+
+class LocationDirectory(object):
+    """This class answers the lookups of the clients for the service location.
+
+    The LocationDirectory stores the counter and the server IP address of the
+    current service instance with a time to live. The entry is updated by the
+    started, stopped and who_is_answer events of the service handlers. A
+    newer service instance (higher counter) always replaces the entry and a
+    stopped event only removes the entry of the same instance. The host
+    running the service refreshes the entries of all directories by
+    repeating its started event every half TTL.
+
+    A lookup is a who_is event sent to the LOOKUP_PORT. It is answered with a
+    who_is_answer event in the encoding of the lookup. The server IP address
+    of the answer is None, if no valid entry is known.
+
+    Attributes:
+        LOOKUP_PORT (:obj:`int`): The port to answer the lookups on.
+        entry_ttl (:obj:`float`): The time to live of an entry in seconds.
+        locations (:obj:`dict`): The counter, the server IP address and the
+            expiry time of every known service.
+        lookup_socket (:obj:`socket`): The socket to receive the lookups.
+        location_refresh (:obj:`RepeatedTimer`): The timer to repeat the
+            started event of the own service.
+    """
+
+    LOOKUP_PORT = 6501
+
+    def __init__(self, service_manager, configuration):
+        """The initialization function of the class LocationDirectory.
+
+        Args:
+            service_manager (:obj:`ServiceManager`): The instance of the
+                service manager core to extract the informations.
+            configuration (:obj:`optparse.Option`): The configuration of the
+                command line interface, e.g. to extract the TTL.
+        """
+
+        self.entry_ttl = configuration.location_ttl
+        self.cb_refresh_own_location = service_manager.refresh_service_location_callback
+
+        self.locations = {}
+        self.locations_lock = threading.Lock()
+
+        self.lookup_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.lookup_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.lookup_socket.settimeout(1.0)
+        self.lookup_socket.bind(('', self.LOOKUP_PORT))
+        self.lookup_event = threading.Event()
+        self.lookup_thread = threading.Thread(target=self.listen_for_lookups, args=())
+        self.lookup_thread.daemon = True
+        self.lookup_thread.start()
+
+        self.location_refresh = RepeatedTimer(self.entry_ttl / 2.0, self.cb_refresh_own_location)
+        self.location_refresh.start()
+
+        LOGGER.debug("location directory init")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        LOGGER.debug("location directory exit")
+        self.location_refresh.cancel()
+        self.lookup_event.set()
+        return self
+
+    def update_location(self, location_event):
+        """Updates the location of a service with a status event.
+
+        Args:
+            location_event (:obj:`dict`): The decoded status event with the
+                service_name, the event, the counter and the server_ip.
+        """
+
+        event = location_event.get('event')
+        service_name = location_event.get('service_name')
+        counter = location_event.get('counter')
+        server_ip = location_event.get('server_ip')
+        if counter is None or service_name is None:
+            return
+
+        with self.locations_lock:
+            current_counter, _, _ = self.locations.get(service_name, (None, None, None))
+
+            if event in ("started", "who_is_answer") and server_ip is not None:
+                if current_counter is None or counter >= current_counter:
+                    self.locations[service_name] = (counter, server_ip, time.time() + self.entry_ttl)
+                    if counter != current_counter:
+                        LOGGER.info("New location of %s: %s (counter=%s)", service_name, server_ip, counter)
+            elif event == "stopped" and counter == current_counter:
+                del self.locations[service_name]
+                LOGGER.info("Removed location of %s (counter=%s)", service_name, counter)
+
+    def get_location(self, service_name):
+        """Returns the counter and the server IP address of a service.
+
+        Args:
+            service_name (:obj:`str`): The name of the service.
+
+        Returns:
+            A tuple of the counter and the server IP address or a tuple of
+            None, if no valid entry is known.
+        """
+
+        with self.locations_lock:
+            counter, server_ip, expiry_time = self.locations.get(service_name, (None, None, None))
+            if expiry_time is None or expiry_time < time.time():
+                return None, None
+            return counter, server_ip
+
+    def listen_for_lookups(self):
+        """Answers the lookups of the clients for the service location."""
+
+        while self.lookup_event.is_set() is False:
+            try:
+                datagram, address = self.lookup_socket.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except socket.error as exc:
+                LOGGER.error("Error while receiving lookup, Error=%s", exc)
+                continue
+
+            try:
+                lookup = StatusCodec.decode(datagram)
+                if lookup.get('event') != "who_is":
+                    continue
+
+                counter, server_ip = self.get_location(lookup.get('service_name'))
+                self.lookup_socket.sendto(
+                    StatusCodec.encode(lookup.get('service_name'), "who_is_answer",
+                                       counter, server_ip, StatusCodec.get_encoding(datagram)),
+                    address)
+            except (ValueError, KeyError, socket.error) as exc:
+                LOGGER.error("Error while answering lookup from %s, Error=%s", address, exc)
+
+        self.lookup_socket.close()
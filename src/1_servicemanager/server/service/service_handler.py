@@ -8,15 +8,19 @@ service with a broadcast message.
 """
 
 import inspect
-import json
 import logging
 import os
+import shlex
 import signal
 import socket
 import subprocess
 import sys
 import threading
+import time
+from service.service_relay import ServiceRelay
 from utils import RepeatedTimer
+from utils import StatusCodec
+from utils import StatusPublisher
 from utils import Networking
 
 LOGGER = logging.getLogger(__name__)
@@ -34,6 +38,7 @@ class ServiceStatusCodes(object):
     STARTED_NORMALLY = 'STARTED_NORMALLY'
     ERROR_STARTING_SERVICE = 'ERROR_STARTING_SERVICE'
     IN_TRANSMISSION = 'IN_TRANSMISSION'
+    DRAINING = 'DRAINING'
 
 class ServiceHandler(object):
     """This class handles the service itself.
@@ -48,13 +53,19 @@ class ServiceHandler(object):
         service (:obj:`subprocess`): The process of the service.
         service_ports (:obj:`list` of :obj:`int`): The opend and used ports of
             the service.
+        service_tcp_ports (:obj:`list` of :obj:`int`): The service ports, which
+            are bound by TCP sockets of the service.
         service_status (:obj:`(ServiceStatusCodes,str)`): The current status
             of the service.
         service_id (:obj:`int`): The unique ID of the service instance.
         open_ports_check (:obj:`RepeatedTimer`): A timer to check the ports of
             the service.
-        server_broadcast_socket (:obj:`socket`): Socket to broadcast changes
-            to the service status.
+        server_broadcast_socket (:obj:`socket`): Socket to receive the who_is
+            requests of the clients.
+        status_publisher (:obj:`StatusPublisher`): The publisher to send the
+            changes of the service status to the clients.
+        service_relay (:obj:`ServiceRelay`): The relay of the connections to
+            the new host after a migration or None.
     """
 
     BROADCAST_PORT = 6500
@@ -76,17 +87,28 @@ class ServiceHandler(object):
         self.service_file_name_path = configuration.service_file
         self.own_node_id = service_manager.get_own_hostname_callback()
         self.cb_new_service_ports_found = service_manager.found_service_ports_callback
+        self.cb_service_location_changed = service_manager.service_location_changed_callback
 
         self.service = None
         self.service_ports = []
+        self.service_tcp_ports = []
         self.service_status = (ServiceStatusCodes.NOT_STARTED_YET, None)
         self.service_status_lock = threading.RLock()
 
         self.service_id = 1 # the id of the current service instance in the network
                             # (will be updated after receiving a service)
+        self.service_relay = None
 
         self.open_ports_check = RepeatedTimer(5, self.get_open_ports_of_service)
 
+        broadcast_addresses = ["10.0.0.255"]
+        if self.testing_flag is False:
+            broadcast_addresses.append("10.0.1.255")
+            broadcast_addresses.append("10.0.2.255")
+        self.status_publisher = StatusPublisher(broadcast_addresses, self.BROADCAST_PORT,
+                                                coalescing_window=configuration.status_coalescing_window,
+                                                encoding=configuration.status_encoding)
+
         self.server_broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.server_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
@@ -106,6 +128,8 @@ class ServiceHandler(object):
         self.open_ports_check.cancel()
         self.server_broadcast_event.set()
         self.stop_service()
+        self.close_service_relay()
+        self.status_publisher.close()
         return self
 
     def listen_for_whois_requests(self):
@@ -116,25 +140,21 @@ class ServiceHandler(object):
 
         while self.server_broadcast_event.is_set() is False:
             try:
-                new_message, address = self.server_broadcast_socket.recvfrom(16384)
-                new_message = json.loads(new_message)
+                datagram, address = self.server_broadcast_socket.recvfrom(16384)
+                new_message = StatusCodec.decode(datagram)
+
+                if new_message['event'] in ("started", "stopped", "who_is_answer"):
+                    self.cb_service_location_changed(new_message)
 
                 if new_message['event'] == "who_is":
                     status, _ = self.get_service_status()
                     if status == ServiceStatusCodes.STARTED_NORMALLY:
-                        own_server_ip = Networking.translate_node_id_to_ip_addr(self.own_node_id)
-
                         LOGGER.info("who_is message from %s = %s", address, new_message)
-                        publish_options = {}
-                        publish_options['service_name'] = "service"
-                        publish_options['event'] = "who_is_answer"
-                        publish_options['server_ip'] = own_server_ip
-                        publish_options['counter'] = self.service_id
-                        
                         try:
-                            who_is_answer_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                            who_is_answer_socket.sendto(json.dumps(publish_options), (address[0], self.BROADCAST_PORT))
-                            who_is_answer_socket.close()
+                            self.status_publisher.send_to(address[0], self.own_node_id,
+                                                          "service", "who_is_answer",
+                                                          self.service_id,
+                                                          StatusCodec.get_encoding(datagram))
                         except socket.error as exc:
                             LOGGER.error('Failed to answer who_is (socket.error): ' + str(exc), exc_info=True)
 
@@ -253,6 +273,7 @@ class ServiceHandler(object):
                 os.remove(self.service_file_name_path)
             self.open_ports_check.cancel()
             self.service_ports = []
+            self.service_tcp_ports = []
             self.set_service_status(ServiceStatusCodes.NOT_STARTED_YET, None)
             return True
         except Exception as exc:
@@ -281,7 +302,7 @@ class ServiceHandler(object):
         """
 
         try:
-            pid = self.service.pid
+            service_pids = self.get_service_pids()
             command = "netstat -tlnup | awk 'NR>2 { print $4, $7; }'"
             command = "netstat -tlnup | awk 'NR>2 { print $1, $4, $6, $7;}'"
             netstat_output = subprocess.check_output(command, shell=True)
@@ -290,14 +311,19 @@ class ServiceHandler(object):
             LOGGER.error("Error while getting open ports of service, Error="+ str(e))
         else:
             found_ports = []
+            # the ports of a prefork service are bound by its child processes
+            program_names = [str(pid) + "/python" for pid in service_pids]
             for line in netstat_output.split('\n'):
                 values = line.split(' ')
                 if len(values) > 1:
-                    if values[0] == "tcp" and values[3] == (str(pid) + "/python") or \
-                       values[0] == "udp" and values[2] == (str(pid) + "/python"):
+                    if values[0] == "tcp" and values[3] in program_names or \
+                       values[0] == "udp" and values[2] in program_names:
                         ip_address, port = self.seperate_ipv4_and_port(values[1])
-                        if port not in found_ports:
+                        if int(port) not in found_ports:
                             found_ports.append(int(port))
+                        # only the TCP ports are relayed after a migration
+                        if values[0] == "tcp" and int(port) not in self.service_tcp_ports:
+                            self.service_tcp_ports.append(int(port))
 
             if found_ports:
                 self.open_ports_check.cancel()
@@ -310,6 +336,33 @@ class ServiceHandler(object):
 
             self.cb_new_service_ports_found(self.service.pid, self.service_ports)
 
+    def get_service_pids(self, service=None):
+        """Gets the process IDs of the service and its child processes.
+
+        A service in prefork mode runs its work in child processes of the
+        started process, which bind the ports of the service.
+
+        Args:
+            service (:obj:`subprocess`, optional): The process of the service.
+                Default is the current service.
+
+        Returns:
+            A list of the process IDs, starting with the started process.
+        """
+
+        if service is None:
+            service = self.service
+        service_pids = [service.pid]
+        try:
+            children_output = subprocess.check_output(
+                ["ps", "-o", "pid=", "--ppid", str(service.pid)])
+        except (subprocess.CalledProcessError, OSError):
+            # ps fails, if the service has no child processes
+            return service_pids
+
+        service_pids.extend(int(pid) for pid in children_output.split())
+        return service_pids
+
     def send_broadcast_event(self, service_name, event):
         """Method to send an event to all hosts in the network.
 
@@ -317,16 +370,15 @@ class ServiceHandler(object):
         to all hosts in the network.
         """
 
-        broadcast_addresses = ["10.0.0.255"]
-        if self.testing_flag is False:
-            broadcast_addresses.append("10.0.1.255")
-            broadcast_addresses.append("10.0.2.255")
-
-        Networking.broadcast_service_status(
-            broadcast_addresses,
+        self.status_publisher.publish(
             self.own_node_id,
             service_name, event,
             self.service_id)
+        self.cb_service_location_changed({
+            'service_name': service_name,
+            'event': event,
+            'counter': self.service_id,
+            'server_ip': Networking.translate_node_id_to_ip_addr(self.own_node_id)})
 
     def start_service(self):
         """Method to start the service in an own subprocess.
@@ -340,9 +392,13 @@ class ServiceHandler(object):
         """
 
         try:
+            # the service is back on this host and needs its ports again
+            self.close_service_relay()
+
             # The os.setsid() is passed in the argument preexec_fn so
             # it's run after the fork() and before exec() to run the shell.
-            self.service = subprocess.Popen([sys.executable, self.service_file_name_path])
+            self.service = subprocess.Popen([sys.executable, self.service_file_name_path] +
+                                            shlex.split(self.configuration.service_arguments))
                                             #close_fds=True,# shell=True,
                                             #preexec_fn=os.setsid)
             LOGGER.info("Started service with pid="+str(self.service.pid))
@@ -379,7 +435,9 @@ class ServiceHandler(object):
 
             if self.service:
                 #os.killpg(os.getpgid(self.service.pid), signal.SIGTERM)
-                os.kill(self.service.pid, signal.SIGINT)
+                # a drained service has already finished
+                if self.service.poll() is None:
+                    os.kill(self.service.pid, signal.SIGINT)
                 # self.service.send_signal(signal.SIGINT)
 
                 # if self.service.wait() == 0:
@@ -397,6 +455,106 @@ class ServiceHandler(object):
 
         return True
 
+    def drain_service(self, new_server_ip, drain_timeout):
+        """Method to stop the service gracefully after a migration.
+
+        The new service instance has already been announced by the new host.
+        The local location directory learns the new location first, then the
+        relay of the new connections on the service ports to the new host is
+        started, before the service gets a SIGTERM to stop accepting
+        connections and to finish its in-flight requests. The waiting for the
+        service runs in an own thread, so the core loop is not blocked. After
+        the drain timeout the service is killed and the stopped event is sent.
+        The relay serves the clients with a stale location for the relay grace
+        period afterwards.
+
+        Args:
+            new_server_ip (:obj:`str`): The IP address of the new host.
+            drain_timeout (:obj:`float`): The maximum time in seconds to
+                finish the in-flight requests.
+
+        Returns:
+            True if the draining has been started, False in any occurred error.
+        """
+
+        service = self.service
+        try:
+            LOGGER.info("draining service, new server is %s", new_server_ip)
+            self.set_service_status(ServiceStatusCodes.DRAINING, None)
+            self.cb_service_location_changed({
+                'service_name': "service",
+                'event': "started",
+                'counter': self.service_id + 1,
+                'server_ip': new_server_ip})
+
+            if service and service.poll() is None:
+                self.open_ports_check.cancel()
+
+                # the relay accepts the new connections, as soon as the
+                # service stops accepting them
+                relay_ports = [port for port in self.service_ports if port in self.service_tcp_ports]
+                if new_server_ip is not None and relay_ports:
+                    self.close_service_relay()
+                    self.service_relay = ServiceRelay(relay_ports, new_server_ip)
+                    self.service_relay.start()
+
+                service.send_signal(signal.SIGTERM)
+        except OSError as exc:
+            LOGGER.error("Failed to drain service (OSError): %s", exc, exc_info=True)
+            return False
+
+        drain_thread = threading.Thread(target=self.finish_draining,
+                                        args=(service, self.service_relay, drain_timeout))
+        drain_thread.daemon = True
+        drain_thread.start()
+        return True
+
+    def finish_draining(self, service, service_relay, drain_timeout):
+        """Waits for the drained service and stops it.
+
+        Args:
+            service (:obj:`subprocess`): The process of the drained service.
+            service_relay (:obj:`ServiceRelay`): The relay to the new host or
+                None.
+            drain_timeout (:obj:`float`): The maximum time in seconds to
+                finish the in-flight requests.
+
+        Returns:
+            True if the service has been stopped, False in any occurred error.
+        """
+
+        try:
+            if service and service.poll() is None:
+                deadline = time.time() + drain_timeout
+                while service.poll() is None and time.time() < deadline:
+                    time.sleep(0.1)
+
+                if service.poll() is None:
+                    LOGGER.error("Service did not finish its requests in %s seconds, killing it",
+                                 drain_timeout)
+                    # the child processes are killed first, they would keep the ports
+                    for pid in reversed(self.get_service_pids(service)):
+                        os.kill(pid, signal.SIGKILL)
+                    service.wait()
+                else:
+                    LOGGER.info("Service has been drained")
+        except OSError as exc:
+            LOGGER.error("Failed to drain service (OSError): %s", exc, exc_info=True)
+
+        if service_relay is not None:
+            service_relay.close_later(self.configuration.relay_grace_period)
+        if self.service is not service:
+            # the service has been started again meanwhile
+            return True
+        return self.stop_service()
+
+    def close_service_relay(self):
+        """Closes the relay of the connections to the new host, if any."""
+
+        if self.service_relay is not None:
+            self.service_relay.close()
+            self.service_relay = None
+
     """Old functions from the previous middleware concept.
 
     def stop_service_v1(self):
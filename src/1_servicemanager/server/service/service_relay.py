@@ -0,0 +1,245 @@
+"""This module contains the ServiceRelay class.
+
+After a migration the old host still receives connections of the clients,
+which have not learned the new location of the service yet. The service relay
+accepts these connections on the old service ports and forwards them to the
+new host, so the clients are served with one extra hop instead of an error.
+
+The data is moved with os.splice through a pipe inside the kernel, if the
+platform supports it (Linux with Python 3.10 or newer). Otherwise a forwarding
+loop receives into one preallocated buffer per direction, which is the path of
+the service manager running with Python 2.
+"""
+
+import logging
+import os
+import socket
+import threading
+
+LOGGER = logging.getLogger(__name__)
+
+class ServiceRelay(object):
+    """This class forwards the connections of the service to the new host.
+
+    The ServiceRelay listens on the TCP ports of the old service instance and
+    connects every accepted client to the same port on the new host. The data
+    of both directions is forwarded until one side closes the connection. The
+    relay is closed with close_later after the grace period.
+
+    Attributes:
+        service_ports (:obj:`list` of :obj:`int`): The ports to relay.
+        destination_ip (:obj:`str`): The IP address of the new host.
+        connect_timeout (:obj:`float`): The timeout to connect to the new
+            host.
+        relay_sockets (:obj:`list` of :obj:`socket`): The listening sockets.
+    """
+
+    BUFFER_SIZE = 65536
+    SPLICE_FLAGS = getattr(os, 'SPLICE_F_MOVE', 0) | getattr(os, 'SPLICE_F_MORE', 0)
+
+    def __init__(self, service_ports, destination_ip, connect_timeout=5.0):
+        """The initialization function of the class ServiceRelay.
+
+        Args:
+            service_ports (:obj:`list` of :obj:`int`): The ports to relay.
+            destination_ip (:obj:`str`): The IP address of the new host.
+            connect_timeout (:obj:`float`, optional): The timeout to connect
+                to the new host. Default is 5.0.
+        """
+
+        self.service_ports = list(service_ports)
+        self.destination_ip = destination_ip
+        self.connect_timeout = connect_timeout
+
+        self.relay_sockets = []
+        self.relay_event = threading.Event()
+        self.close_timer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self
+
+    def start(self):
+        """Starts listening on the service ports.
+
+        The service ports may still be bound by the draining service, so the
+        sockets share them with SO_REUSEPORT.
+
+        Returns:
+            True, if at least one port is relayed.
+        """
+
+        for port in self.service_ports:
+            relay_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            relay_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            relay_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            try:
+                relay_socket.bind(('', port))
+                relay_socket.listen(128)
+            except socket.error as exc:
+                LOGGER.error("Failed to bind relay socket on port %s, Error=%s", port, exc)
+                relay_socket.close()
+                continue
+
+            self.relay_sockets.append(relay_socket)
+            relay_thread = threading.Thread(target=self.accept_connections,
+                                            args=(relay_socket, port))
+            relay_thread.daemon = True
+            relay_thread.start()
+
+        if not self.relay_sockets:
+            return False
+
+        LOGGER.info("Relaying ports %s to %s (splice=%s)",
+                    self.service_ports, self.destination_ip, hasattr(os, 'splice'))
+        return True
+
+    def close_later(self, grace_period):
+        """Closes the relay after a grace period.
+
+        Args:
+            grace_period (:obj:`float`): The time in seconds to accept further
+                connections.
+        """
+
+        if grace_period <= 0:
+            self.close()
+            return
+        LOGGER.info("Relay to %s closes in %s seconds", self.destination_ip, grace_period)
+        self.close_timer = threading.Timer(grace_period, self.close)
+        self.close_timer.daemon = True
+        self.close_timer.start()
+
+    def close(self):
+        """Stops accepting new connections on the service ports.
+
+        The already relayed connections are forwarded until they are closed.
+        """
+
+        if self.relay_event.is_set():
+            return
+        self.relay_event.set()
+        if self.close_timer is not None:
+            self.close_timer.cancel()
+        for relay_socket in self.relay_sockets:
+            try:
+                # wakes up the accepting thread
+                relay_socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            relay_socket.close()
+        LOGGER.info("Relay to %s closed", self.destination_ip)
+
+    def accept_connections(self, relay_socket, port):
+        """Accepts the connections of the clients on a service port.
+
+        Args:
+            relay_socket (:obj:`socket`): The listening socket.
+            port (:obj:`int`): The service port of the socket.
+        """
+
+        while self.relay_event.is_set() is False:
+            try:
+                client_socket, address = relay_socket.accept()
+            except socket.error as exc:
+                if self.relay_event.is_set() is False:
+                    LOGGER.error("Failed to accept relay connection, Error=%s", exc)
+                continue
+
+            LOGGER.info("Relaying connection of %s to %s:%s", address[0], self.destination_ip, port)
+            connection_thread = threading.Thread(target=self.relay_connection,
+                                                 args=(client_socket, port))
+            connection_thread.daemon = True
+            connection_thread.start()
+
+    def relay_connection(self, client_socket, port):
+        """Connects a client to the new host and forwards the data.
+
+        Args:
+            client_socket (:obj:`socket`): The accepted client connection.
+            port (:obj:`int`): The service port to connect to.
+        """
+
+        try:
+            server_socket = socket.create_connection((self.destination_ip, port),
+                                                     self.connect_timeout)
+            server_socket.settimeout(None)
+        except socket.error as exc:
+            LOGGER.error("Failed to connect relay to %s:%s, Error=%s", self.destination_ip, port, exc)
+            client_socket.close()
+            return
+
+        upstream_thread = threading.Thread(target=self.forward,
+                                           args=(client_socket, server_socket))
+        upstream_thread.daemon = True
+        upstream_thread.start()
+        self.forward(server_socket, client_socket)
+        upstream_thread.join()
+
+        client_socket.close()
+        server_socket.close()
+
+    def forward(self, source_socket, destination_socket):
+        """Forwards the data of one direction of a relayed connection.
+
+        The end of the data is passed on with a half close, so the other
+        direction continues until the answer has been forwarded.
+
+        Args:
+            source_socket (:obj:`socket`): The socket to read from.
+            destination_socket (:obj:`socket`): The socket to write to.
+        """
+
+        try:
+            if hasattr(os, 'splice'):
+                self.splice_data(source_socket, destination_socket)
+            else:
+                self.copy_data(source_socket, destination_socket)
+        except (OSError, socket.error) as exc:
+            LOGGER.error("Error while relaying data, Error=%s", exc)
+
+        try:
+            destination_socket.shutdown(socket.SHUT_WR)
+        except socket.error:
+            pass
+
+    def splice_data(self, source_socket, destination_socket):
+        """Moves the data between the sockets without copying it to user space.
+
+        Args:
+            source_socket (:obj:`socket`): The socket to read from.
+            destination_socket (:obj:`socket`): The socket to write to.
+        """
+
+        pipe_read_fd, pipe_write_fd = os.pipe()
+        try:
+            while True:
+                received = os.splice(source_socket.fileno(), pipe_write_fd,
+                                     self.BUFFER_SIZE, flags=self.SPLICE_FLAGS)
+                if received == 0:
+                    break
+                while received > 0:
+                    received -= os.splice(pipe_read_fd, destination_socket.fileno(),
+                                          received, flags=self.SPLICE_FLAGS)
+        finally:
+            os.close(pipe_read_fd)
+            os.close(pipe_write_fd)
+
+    def copy_data(self, source_socket, destination_socket):
+        """Copies the data between the sockets through one reused buffer.
+
+        Args:
+            source_socket (:obj:`socket`): The socket to read from.
+            destination_socket (:obj:`socket`): The socket to write to.
+        """
+
+        buf = bytearray(self.BUFFER_SIZE)
+        view = memoryview(buf)
+        while True:
+            received = source_socket.recv_into(buf)
+            if received == 0:
+                break
+            destination_socket.sendall(view[:received])
@@ -222,6 +222,10 @@ class ServiceTransporter(object):
             best_hosts (:obj:`list` of :obj:`int`): The list of the best hosts
                 in descending order.
             file_path (:obj:`str`): The path to the service file.
+
+        Returns:
+            A tuple of True and the IP address of the new host after a
+            successful sending, otherwise False and the error code.
         """
 
         LOGGER.debug("send_service enter")
@@ -284,7 +288,7 @@ class ServiceTransporter(object):
                             new_service_status = Networking.recv_packed(send_socket, self.GLOBAL_TIMEOUT)
                             LOGGER.info("service status code by other server: %s", new_service_status)
                             if new_service_status == TransportStatusCodes.OKAY:
-                                return True, None
+                                return True, node_ip_address
                             elif new_service_status == TransportStatusCodes.INTERNAL_SERVER_ERROR:
                                 return False, TransportStatusCodes.INTERNAL_SERVER_ERROR
                             elif new_service_status == TransportStatusCodes.TRANSPORT_ERROR:
@@ -15,6 +15,7 @@ from migration import NetworkRouter
 from migration import NetworkSniffer
 from service import ServiceTransporter
 from service import ServiceHandler
+from service import LocationDirectory
 from service import ServiceStatusCodes
 from utils import Networking
 
@@ -46,6 +47,8 @@ class ServiceManagerCore(object):
             incoming and outgoing traffic for the service
         network_utilization_inspector (NetworkUtilizationInspector): 
             Class to take repeatedly decisions for the next migration or duplication, based on the migration time
+        location_directory (LocationDirectory): Class to answer the lookups
+            of the clients for the current location of the service
         service_handler (ServiceHandler): Class to start and stop the service,
             and to inform clients via broadcast for a new or closing service
             instance
@@ -85,6 +88,8 @@ class ServiceManagerCore(object):
         self.network_utilization_inspector = NetworkUtilizationInspector(
             self, self.configuration)
 
+        self.location_directory = LocationDirectory(self, self.configuration)
+
         self.service_handler = ServiceHandler(self, self.configuration)
 
         self.service_transporter = ServiceTransporter(self, self.configuration)
@@ -95,6 +100,7 @@ class ServiceManagerCore(object):
 
     def __exit__(self, exc_type, exc_value, traceback):
         self.network_utilization_inspector.cancel_migration_check()
+        self.location_directory.__exit__(exc_type, exc_value, traceback)
         LOGGER.debug("service_manager_core exit")
         return self
 
@@ -324,6 +330,122 @@ class ServiceManagerCore(object):
             recent_in_out_packets,
             recent_in_out_packets_total)
 
+    def calculate_migration_cost_callback(self, new_node):
+        """Event to estimate the cost of a migration to another host.
+
+        The time to move the service file from this host to the new host is
+        calculated by the network router, so that the migration checker can
+        compare it with the expected latency gain of the migration.
+
+        Args:
+            new_node (:obj:`int`): The possible new host of the service.
+
+        Returns:
+            The expected transfer time of the service in seconds or None, if
+            there is no throughput information about the path.
+        """
+
+        return self.network_router.calculate_migration_cost(
+            self.get_own_hostname_callback(), new_node, self.get_service_size())
+
+    def calculate_weighted_migration_cost_callback(self, new_node):
+        """Event to estimate the routing cost of a migration to another host.
+
+        Args:
+            new_node (:obj:`int`): The possible new host of the service.
+
+        Returns:
+            The size of the service weighted with the routing cost of the path
+            to the new host or None, if the new host is not reachable.
+        """
+
+        return self.network_router.calculate_weighted_migration_cost(
+            self.get_own_hostname_callback(), new_node, self.get_service_size())
+
+    def get_service_size(self):
+        """Returns the size of the service file in bytes."""
+
+        if os.path.exists(self.configuration.service_file):
+            return os.path.getsize(self.configuration.service_file)
+        return 0
+
+    def calculate_latency_gain_callback(self, in_out_packets, new_node):
+        """Event to estimate the latency gain of a migration to another host.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`): The
+                expected incoming and outgoing traffic of all clients.
+            new_node (:obj:`int`): The possible new host of the service.
+
+        Returns:
+            The expected latency gain in seconds or None, if there is no
+            throughput information about the paths.
+        """
+
+        return self.network_router.calculate_latency_gain(
+            in_out_packets, self.get_own_hostname_callback(), new_node)
+
+    def calculate_joint_service_placement_callback(self, services_in_out_packets, node_capacities,
+                                                   services_demands, candidate_nodes, time_bound):
+        """Event to place this service jointly with the other hosted services.
+
+        Args:
+            services_in_out_packets (:obj:`dict` of :obj:`dict`): The traffic
+                matrices of all services, keyed by the service ID.
+            node_capacities (:obj:`dict` of :obj:`dict` of :obj:`float`): The
+                CPU, RAM and bandwidth capacities of the hosts.
+            services_demands (:obj:`dict` of :obj:`dict` of :obj:`float`): The
+                CPU, RAM and bandwidth demands of the services.
+            candidate_nodes (:obj:`list` of :obj:`int`): The possible hosts.
+            time_bound (:obj:`float`): The maximum time in seconds for the
+                calculation.
+
+        Returns:
+            A tuple of the assignment from the service ID to the host and the
+            total weighted cost of all placed services.
+        """
+
+        return self.network_router.calculate_joint_service_placement(
+            services_in_out_packets, node_capacities, services_demands,
+            candidate_nodes, time_bound)
+
+    def calculate_packet_count_callback(self, in_out_packets):
+        """Event to count the packets of the traffic of all clients.
+
+        Args:
+            in_out_packets (:obj:`dict` of :obj:`dict` of :obj:`int`): The
+                expected incoming and outgoing traffic of all clients.
+
+        Returns:
+            The number of incoming and outgoing packets.
+        """
+
+        return self.network_router.calculate_total_packet_count(in_out_packets)
+
+    def service_location_changed_callback(self, location_event):
+        """Event to inform, that a status event of a service has been seen.
+
+        The service handler reports its own and all received status events,
+        so the location directory knows the current server of the service.
+
+        Args:
+            location_event (:obj:`dict`): The decoded status event with the
+                service_name, the event, the counter and the server_ip.
+        """
+
+        self.location_directory.update_location(location_event)
+
+    def refresh_service_location_callback(self):
+        """Event to refresh the location of the own service in the network.
+
+        If the service runs on this host, the started event is repeated, so
+        the entries in the location directories of all hosts do not expire.
+        """
+
+        service_status, _ = self.service_handler.get_service_status()
+        if service_status == ServiceStatusCodes.STARTED_NORMALLY:
+            self.service_handler.send_broadcast_event("service", "started")
+
     def run(self):
         """The main running loop of the service manager core.
 
@@ -382,7 +504,9 @@ class ServiceManagerCore(object):
                                  service_sent_error_code)
                     if service_sent_successful is True:
                         if self.duplicate_service_event.is_set() is False:
-                            self.service_handler.stop_service()
+                            # on success the error code is the address of the new host
+                            self.service_handler.drain_service(service_sent_error_code,
+                                                               self.configuration.drain_timeout)
 
                         self.duplicate_service_event.clear()
                     else:
@@ -0,0 +1,127 @@
+"""Tests of the framed message I/O.
+
+Run from the server directory:
+    python -m unittest discover -s tests -t .
+"""
+
+import socket
+import threading
+import time
+import unittest
+import utils.framing as Framing
+
+try:
+    from utils.framing_asyncio import FramedProtocol
+except (ImportError, AttributeError, SyntaxError):
+    # asyncio.BufferedProtocol needs Python 3.7
+    FramedProtocol = None
+
+def pack_frame(payload):
+    return Framing.HEADER.pack(len(payload)) + payload
+
+class FramingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sender, self.receiver = socket.socketpair()
+
+    def tearDown(self):
+        self.sender.close()
+        self.receiver.close()
+
+    def test_larger_frame_while_the_previous_view_is_held(self):
+        self.sender.sendall(pack_frame(b'small') + pack_frame(b'a larger payload'))
+
+        buf = bytearray(8)
+        buf, payload = Framing.recv_frame_into(self.receiver, buf, 1.0)
+        self.assertEqual(payload.tobytes(), b'small')
+        buf, larger_payload = Framing.recv_frame_into(self.receiver, buf, 1.0)
+
+        self.assertEqual(larger_payload.tobytes(), b'a larger payload')
+        self.assertEqual(payload.tobytes(), b'small')
+
+    def test_buffer_is_reused_for_smaller_frames(self):
+        self.sender.sendall(pack_frame(b'first frame') + pack_frame(b'second'))
+
+        buf = bytearray(64)
+        first_buf, _ = Framing.recv_frame_into(self.receiver, buf, 1.0)
+        second_buf, payload = Framing.recv_frame_into(self.receiver, first_buf, 1.0)
+
+        self.assertIs(second_buf, buf)
+        self.assertEqual(payload.tobytes(), b'second')
+
+    def test_frame_and_eof(self):
+        Framing.send_frame(self.sender, b'payload', 1.0)
+        self.sender.close()
+
+        self.assertEqual(Framing.recv_frame(self.receiver, 1.0), bytearray(b'payload'))
+        self.assertIsNone(Framing.recv_frame(self.receiver, 1.0))
+
+    def test_slow_sender_does_not_extend_the_deadline(self):
+        self.sender.sendall(Framing.HEADER.pack(10))
+        sender_timer = threading.Timer(0.3, self.sender.sendall, args=(b'x',))
+        sender_timer.start()
+
+        start_time = time.time()
+        self.assertRaises(socket.timeout, Framing.recv_frame, self.receiver, 0.5)
+        elapsed_time = time.time() - start_time
+        sender_timer.join()
+
+        # the payload recv after the first byte only waits for the rest of the deadline
+        self.assertLess(elapsed_time, 0.75)
+        self.assertIsNone(self.receiver.gettimeout())
+
+    def test_frame_size_is_checked(self):
+        self.sender.sendall(Framing.HEADER.pack(100))
+
+        self.assertRaises(Framing.FrameSizeError, Framing.recv_frame, self.receiver, 1.0, 10)
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def writelines(self, data):
+        for chunk in data:
+            self.data += chunk
+
+    def close(self):
+        self.closed = True
+
+@unittest.skipIf(FramedProtocol is None, "the asyncio variant needs Python 3.7")
+class FramedProtocolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = []
+        self.transport = FakeTransport()
+        self.protocol = FramedProtocol(lambda protocol, frame: self.frames.append(bytes(frame)), max_size=100)
+        self.protocol.connection_made(self.transport)
+
+    def feed(self, data):
+        # the event loop fills the buffers of the protocol in chunks
+        while data:
+            view = self.protocol.get_buffer(-1)
+            chunk = data[:min(3, len(view))]
+            view[:len(chunk)] = chunk
+            self.protocol.buffer_updated(len(chunk))
+            data = data[len(chunk):]
+
+    def test_frames_are_received_in_chunks(self):
+        self.feed(pack_frame(b'first') + pack_frame(b'') + pack_frame(b'second frame'))
+
+        self.assertEqual(self.frames, [b'first', b'', b'second frame'])
+
+    def test_sent_frame_is_received(self):
+        self.protocol.send_frame(b'echo')
+        self.feed(bytes(self.transport.data))
+
+        self.assertEqual(self.frames, [b'echo'])
+
+    def test_too_large_frame_closes_the_connection(self):
+        self.feed(Framing.HEADER.pack(1000))
+
+        self.assertTrue(self.transport.closed)
+        self.assertEqual(self.frames, [])
+
+if __name__ == '__main__':
+    unittest.main()
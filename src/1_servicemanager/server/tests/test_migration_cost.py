@@ -0,0 +1,137 @@
+"""Tests of the migration cost model of the NetworkRouter and the inspector.
+
+Run from the server directory:
+    python -m unittest discover -s tests -t .
+"""
+
+import unittest
+from optparse import Values
+from migration.network_router import NetworkRouter
+from migration.network_utilization_inspector import NetworkUtilizationInspector
+from migration.routing_metrics import RoutingMetrics
+
+def create_line_adjacency_list(num_hosts, rtt_avg=20.0, throughput=5.0):
+    """Returns an adjacency list of the hosts 1 to num_hosts in a line."""
+
+    adjacency_list = [[] for _ in range(num_hosts + 1)]
+    for node in range(1, num_hosts):
+        for node_from, node_to in ((node, node + 1), (node + 1, node)):
+            edge = {'node': node_to, 'etx': 1.0, 'rtt_avg': rtt_avg, 'interface': 1}
+            if throughput is not None:
+                edge['throughput'] = throughput
+            adjacency_list[node_from].append(edge)
+    return adjacency_list
+
+def create_router(adjacency_list):
+    router = NetworkRouter.__new__(NetworkRouter)
+    router.routing_metrics = RoutingMetrics('etx')
+    router.routing_field = RoutingMetrics.get_routing_field('etx')
+    router.adjacency_list = adjacency_list
+    router.routing_metrics.annotate_adjacency_list(router.adjacency_list)
+    router.init_nodes_connection_tables()
+    return router
+
+class FakeServiceManager(object):
+    """Passes the callbacks of the inspector to a router like the core."""
+
+    def __init__(self, router, own_node, service_size):
+        self.router = router
+        self.own_node = own_node
+        self.service_size = service_size
+        self.do_service_send_callback = None
+        self.no_recent_connections_callback = None
+
+    def get_own_hostname_callback(self):
+        return self.own_node
+
+    def calculate_central_node_callback(self, in_out_packets, in_out_packets_total):
+        return self.router.calculcate_central_node_from_recent_connections(in_out_packets, in_out_packets_total)
+
+    def calculate_migration_cost_callback(self, new_node):
+        return self.router.calculate_migration_cost(self.own_node, new_node, self.service_size)
+
+    def calculate_weighted_migration_cost_callback(self, new_node):
+        return self.router.calculate_weighted_migration_cost(self.own_node, new_node, self.service_size)
+
+    def calculate_latency_gain_callback(self, in_out_packets, new_node):
+        return self.router.calculate_latency_gain(in_out_packets, self.own_node, new_node)
+
+    def calculate_packet_count_callback(self, in_out_packets):
+        return self.router.calculate_total_packet_count(in_out_packets)
+
+    def calculate_joint_service_placement_callback(self, services_in_out_packets, node_capacities,
+                                                   services_demands, candidate_nodes, time_bound):
+        return self.router.calculate_joint_service_placement(services_in_out_packets, node_capacities,
+                                                             services_demands, candidate_nodes, time_bound)
+
+def create_inspector(router, own_node, service_size=100000, migration_downtime=1.0, placement_file=None):
+    configuration = Values({'migration': True, 'testing': True, 'server_hosts': None,
+                            'connection_check_time': 30, 'cpu_ram_check_time': 1,
+                            'cpu_threshold': 90.0, 'ram_threshold': 90.0,
+                            'migration_threshold': 2.0, 'forecast_windows': 3,
+                            'history_decay': 0.5, 'migration_downtime': migration_downtime,
+                            'placement_file': placement_file})
+    return NetworkUtilizationInspector(FakeServiceManager(router, own_node, service_size), configuration)
+
+class MigrationCostTest(unittest.TestCase):
+
+    def test_latency_gain_counts_the_delay_of_every_hop(self):
+        router = create_router(create_line_adjacency_list(5))
+        traffic = {5: {'in': 1460, 'out': 1460}}
+
+        # one packet in every direction saves 3 hops with 10 ms each, the bottleneck stays the same
+        delay_gain = 2 * 3 * 0.010
+        self.assertAlmostEqual(router.calculate_latency_gain(traffic, 1, 4), delay_gain)
+        self.assertAlmostEqual(router.calculate_latency_gain(traffic, 4, 1), -delay_gain)
+
+    def test_clearly_better_host_passes_the_gate(self):
+        router = create_router(create_line_adjacency_list(5))
+        inspector = create_inspector(router, own_node=1)
+        # 500 packets of the clients at the end of the line over the forecast horizon
+        traffic = {4: {'in': 365000, 'out': 365000}, 5: {'in': 365000, 'out': 365000}}
+        ranking = dict(router.calculcate_central_node_from_recent_connections(traffic, 1460000))
+
+        self.assertTrue(inspector.is_migration_worthwhile(4, traffic, ranking[1], ranking[4]))
+
+    @staticmethod
+    def create_many_clients_router():
+        # 100 clients behind host 5 with 10 packets per direction, one hop with 2 ms less per packet
+        traffic = dict((node, {'in': 14600, 'out': 14600}) for node in range(100, 200))
+        adjacency_list = create_line_adjacency_list(5, rtt_avg=4.0)
+        adjacency_list.extend([] for _ in range(200 - len(adjacency_list)))
+        for node in traffic:
+            adjacency_list[node].append({'node': 5, 'etx': 1.0, 'rtt_avg': 0.0, 'interface': 1, 'throughput': 5.0})
+            adjacency_list[5].append({'node': node, 'etx': 1.0, 'rtt_avg': 0.0, 'interface': 1, 'throughput': 5.0})
+        return create_router(adjacency_list), traffic
+
+    def test_many_clients_with_a_small_gain_lose_against_the_downtime(self):
+        router, traffic = self.create_many_clients_router()
+        inspector = create_inspector(router, 4, service_size=0, migration_downtime=1.0)
+
+        # 2000 packets save 4 s in total, but 2000 / 90 s * 1 s packets wait 0.5 s on average
+        self.assertAlmostEqual(router.calculate_latency_gain(traffic, 4, 5), 4.0)
+        self.assertFalse(inspector.is_migration_worthwhile(5, traffic, 1.0, 0.0))
+
+    def test_downtime_is_weighted_by_the_stalled_packets(self):
+        router, traffic = self.create_many_clients_router()
+
+        self.assertTrue(create_inspector(router, 4, service_size=0,
+                                         migration_downtime=0.1).is_migration_worthwhile(5, traffic, 1.0, 0.0))
+        # ten times the traffic stalls ten times the packets, the same as for the gain
+        traffic = dict((node, {'in': 10 * values['in'], 'out': 10 * values['out']})
+                       for node, values in traffic.items())
+        self.assertFalse(create_inspector(router, 4, service_size=0,
+                                          migration_downtime=1.0).is_migration_worthwhile(5, traffic, 1.0, 0.0))
+
+    def test_routing_cost_without_throughput(self):
+        router = create_router(create_line_adjacency_list(5, throughput=None))
+        inspector = create_inspector(router, own_node=1, service_size=1000)
+        traffic = {5: {'in': 100000, 'out': 100000}}
+        ranking = dict(router.calculcate_central_node_from_recent_connections(traffic, 200000))
+
+        self.assertIsNone(router.calculate_migration_cost(1, 5, 1000))
+        self.assertTrue(inspector.is_migration_worthwhile(5, traffic, ranking[1], ranking[5]))
+        self.assertFalse(inspector.is_migration_worthwhile(5, {5: {'in': 10, 'out': 10}}, 80.0, 0.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Tests of the joint placement of several services under host capacities.
+
+Run from the server directory:
+    python -m unittest discover -s tests -t .
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from migration.service_placement import ServicePlacement
+from tests.test_migration_cost import create_inspector, create_line_adjacency_list, create_router
+
+def create_cost_table(num_hosts):
+    """Returns the costs of hosts in a line, one per hop."""
+
+    return [[abs(node_from - node_to) for node_to in range(num_hosts)] for node_from in range(num_hosts)]
+
+class ServicePlacementTest(unittest.TestCase):
+
+    def test_services_spread_over_the_capacity_of_the_central_host(self):
+        placement = ServicePlacement(create_cost_table(5), {2: {'cpu': 50.0}})
+        traffic = {1: {'in': 10, 'out': 10}, 2: {'in': 100, 'out': 100}}
+
+        assignment, total_cost = placement.place_services(
+            {'a': traffic, 'b': traffic},
+            {'a': {'cpu': 40.0}, 'b': {'cpu': 40.0}})
+
+        # only one service fits on the central host 2, the other one takes the next best host 1
+        self.assertEqual(sorted(assignment.values()), [1, 2])
+        self.assertEqual(total_cost, 20.0 + 200.0)
+
+    def test_service_without_enough_capacity_is_not_placed(self):
+        capacities = dict((node, {'ram': 10.0}) for node in range(5))
+        placement = ServicePlacement(create_cost_table(5), capacities)
+        traffic = {2: {'in': 100, 'out': 100}}
+
+        assignment, _ = placement.place_services({'a': traffic, 'b': traffic},
+                                                 {'a': {'ram': 8.0}, 'b': {'ram': 20.0}})
+
+        self.assertEqual(assignment['a'], 2)
+        self.assertIsNone(assignment['b'])
+
+    def test_bandwidth_demand_is_the_traffic_of_the_service(self):
+        placement = ServicePlacement(create_cost_table(3), {1: {'bandwidth': 300}})
+
+        assignment, _ = placement.place_services({'a': {1: {'in': 200, 'out': 200}}})
+
+        self.assertNotEqual(assignment['a'], 1)
+
+    def test_time_bound_covers_the_whole_calculation(self):
+        num_hosts = 200
+        placement = ServicePlacement(create_cost_table(num_hosts), time_bound=0.05)
+        services = dict((service_id, dict((node, {'in': service_id + 1, 'out': node})
+                                          for node in range(0, num_hosts, 3)))
+                        for service_id in range(200))
+
+        start_time = time.time()
+        assignment, _ = placement.place_services(services)
+
+        self.assertLess(time.time() - start_time, 0.5)
+        self.assertIn(None, assignment.values())
+
+    def test_no_service_is_placed_after_the_deadline(self):
+        placement = ServicePlacement(create_cost_table(5), time_bound=0.0)
+
+        assignment, total_cost = placement.place_services({'a': {1: {'in': 1, 'out': 1}}})
+
+        self.assertEqual(assignment, {'a': None})
+        self.assertEqual(total_cost, 0)
+
+class JointPlacementInspectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temporary_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temporary_path)
+
+    def create_placement_file(self, service_placement):
+        placement_file = os.path.join(self.temporary_path, 'placement.json')
+        with open(placement_file, 'w') as service_placement_file:
+            json.dump(service_placement, service_placement_file)
+        return placement_file
+
+    def test_occupied_best_host_is_moved_back(self):
+        router = create_router(create_line_adjacency_list(5))
+        placement_file = self.create_placement_file({
+            'capacities': {'3': {'cpu': 100.0}},
+            'services': {'sensor': {'in_out_packets': {'3': {'in': 1000, 'out': 1000}},
+                                    'demands': {'cpu': 80.0}}},
+            'demands': {'cpu': 40.0}})
+        inspector = create_inspector(router, own_node=1, placement_file=placement_file)
+        traffic = {3: {'in': 100, 'out': 100}}
+        best_nodes = router.calculcate_central_node_from_recent_connections(traffic, 200)
+        self.assertEqual(best_nodes[0][0], 3)
+
+        choosen_nodes = inspector.apply_joint_service_placement(best_nodes, traffic)
+
+        self.assertIn(choosen_nodes[0][0], (2, 4))
+        self.assertEqual(sorted(choosen_nodes), sorted(best_nodes))
+
+    def test_missing_placement_file_disables_the_placement(self):
+        router = create_router(create_line_adjacency_list(5))
+        inspector = create_inspector(router, own_node=1,
+                                     placement_file=os.path.join(self.temporary_path, 'missing.json'))
+
+        self.assertIsNone(inspector.service_placement)
+
+if __name__ == '__main__':
+    unittest.main()
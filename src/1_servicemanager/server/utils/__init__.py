@@ -5,13 +5,25 @@ help other classes, e.g. to store data in a ValueObject or set timed callback
 functions.
 """
 
-__all__ = ["Networking",
+__all__ = ["Framing",
+           "Networking",
            "NetworkPacket",
-           "RepeatedTimer"]
+           "RepeatedTimer",
+           "ResultLogWriter",
+           "ServiceConnector",
+           "StatusCodec",
+           "StatusPublisher",
+           "WorkerPool"]
 
 __version__ = '1.0'
 __author__ = 'Simon Lansing'
 
+import utils.framing as Framing
 import utils.network_functions as Networking
 from utils.network_packet import NetworkPacket
 from utils.repeated_timer import RepeatedTimer
+from utils.result_log import ResultLogWriter
+from utils.service_connector import ServiceConnector
+import utils.status_codec as StatusCodec
+from utils.status_publisher import StatusPublisher
+from utils.worker_pool import WorkerPool
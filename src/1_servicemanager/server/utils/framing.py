@@ -0,0 +1,234 @@
+"""The framed message I/O of the service manager.
+
+Every message on a TCP connection of the service manager is prefixed with its
+length as a 4-byte unsigned integer in network byte order. The functions of
+this module receive such frames without repeated string concatenation: the
+buffer of the announced length is allocated once and filled with recv_into on
+a memoryview, while a single deadline bounds the complete frame. The header
+and the payload are sent with one scatter/gather sendmsg call, if the platform
+supports it.
+
+The module is the only implementation of the blocking framing. The service
+manager uses it through utils.network_functions, the performance measurement
+and the network topology scripts import it directly. The asyncio variant for
+Python 3 is in utils.framing_asyncio.
+"""
+
+import logging
+import socket
+import struct
+import time
+
+LOGGER = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+# payloads up to this size are copied behind the header without sendmsg
+SMALL_FRAME_SIZE = 64 * 1024
+
+class FrameSizeError(ValueError):
+    """The announced length of a frame exceeds the maximum frame size."""
+
+def check_frame_size(length, max_size=MAX_FRAME_SIZE):
+    """Raises a FrameSizeError, if the length exceeds the maximum frame size."""
+
+    if max_size is not None and length > max_size:
+        raise FrameSizeError("Frame of {} bytes exceeds the maximum frame size of {} bytes".format(
+            length, max_size))
+
+def get_deadline(timeout):
+    """Returns the absolute deadline of a timeout or None without timeout."""
+
+    if timeout is None:
+        return None
+    return time.time() + timeout
+
+def recv_exactly_into(sock, view, deadline=None):
+    """Fills a memoryview with data received on a socket.
+
+    The socket has to be in blocking or timeout mode. With a deadline the
+    timeout of the socket is lowered to the remaining time before every
+    received chunk, so that a slow sender can not extend the receiving
+    process beyond it. The caller restores the timeout of the socket.
+
+    Args:
+        sock (:obj:`socket`): The socket to receive data.
+        view (:obj:`memoryview`): The writable view to fill completely.
+        deadline (:obj:`float`, optional): The absolute time as returned by
+            time.time(), at which the receiving process has to be completed.
+
+    Returns:
+        True, if the view has been filled, or False, if EOF is hit before.
+
+    Raises:
+        socket.timeout: If the deadline is exceeded.
+    """
+
+    received = 0
+    length = len(view)
+    while received < length:
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            sock.settimeout(remaining)
+
+        num_bytes = sock.recv_into(view[received:], length - received)
+        if not num_bytes:
+            return False
+        received += num_bytes
+    return True
+
+def recv_exactly(sock, n, timeout=None):
+    """Receives exactly n bytes on a socket into a preallocated buffer.
+
+    Args:
+        sock (:obj:`socket`): The socket to receive data.
+        n (:obj:`int`): The number of bytes to receive on the socket.
+        timeout (:obj:`int`, optional): The given timeout for the complete
+            receiving process.
+
+    Returns:
+        A bytearray with the n received bytes or None, if EOF is hit.
+
+    Raises:
+        socket.timeout: If the timeout is exceeded.
+    """
+
+    buf = bytearray(n)
+    previous_timeout = sock.gettimeout()
+    try:
+        sock.settimeout(timeout)
+        if not recv_exactly_into(sock, memoryview(buf), get_deadline(timeout)):
+            return None
+        return buf
+    except socket.timeout as exc:
+        LOGGER.error("Timeout while receiving data, Timeout=%s, Error=%s",
+                     timeout, exc)
+        raise
+    finally:
+        sock.settimeout(previous_timeout)
+
+def recv_frame(sock, timeout=None, max_size=MAX_FRAME_SIZE):
+    """Receives a length prefixed frame on a socket.
+
+    The header and the payload of the frame are received under one deadline.
+    The payload is written directly into a bytearray of the announced length.
+
+    Args:
+        sock (:obj:`socket`): The socket to receive data.
+        timeout (:obj:`int`, optional): The given timeout for the complete
+            frame.
+        max_size (:obj:`int`, optional): The maximum accepted payload size.
+            Default is MAX_FRAME_SIZE, None disables the check.
+
+    Returns:
+        A bytearray with the payload of the frame or None, if EOF is hit.
+
+    Raises:
+        socket.timeout: If the timeout is exceeded.
+        FrameSizeError: If the announced length exceeds the maximum size.
+    """
+
+    buf, view = recv_frame_into(sock, bytearray(), timeout, max_size)
+    if view is None:
+        return None
+    return buf
+
+def recv_frame_into(sock, buf, timeout=None, max_size=MAX_FRAME_SIZE):
+    """Receives a length prefixed frame into a reusable buffer.
+
+    A new buffer is only allocated, if the payload does not fit into the
+    given one, so a connection handler can receive all its frames without
+    new allocations:
+
+        buf = bytearray(4096)
+        while True:
+            buf, payload = recv_frame_into(sock, buf)
+
+    The given buffer is never resized, since the caller may still hold a
+    memoryview of the previous frame.
+
+    Args:
+        sock (:obj:`socket`): The socket to receive data.
+        buf (:obj:`bytearray`): The buffer to receive the payload into.
+        timeout (:obj:`int`, optional): The given timeout for the complete
+            frame.
+        max_size (:obj:`int`, optional): The maximum accepted payload size.
+            Default is MAX_FRAME_SIZE, None disables the check.
+
+    Returns:
+        A tuple of the buffer, which holds the payload, and a memoryview of
+        the buffer with the payload of the frame or None, if EOF is hit. The
+        view is only valid until the next frame is received into the buffer;
+        use its tobytes() method for a copy, since bytes() of a memoryview
+        returns its representation on Python 2.
+
+    Raises:
+        socket.timeout: If the timeout is exceeded.
+        FrameSizeError: If the announced length exceeds the maximum size.
+    """
+
+    deadline = get_deadline(timeout)
+    previous_timeout = sock.gettimeout()
+    try:
+        sock.settimeout(timeout)
+        header = bytearray(HEADER.size)
+        if not recv_exactly_into(sock, memoryview(header), deadline):
+            return buf, None
+
+        length = HEADER.unpack(bytes(header))[0]
+        check_frame_size(length, max_size)
+        if len(buf) < length:
+            buf = bytearray(length)
+
+        payload = memoryview(buf)[:length]
+        if not recv_exactly_into(sock, payload, deadline):
+            return buf, None
+        return buf, payload
+    except socket.timeout as exc:
+        LOGGER.error("Timeout while receiving data, Timeout=%s, Error=%s",
+                     timeout, exc)
+        raise
+    finally:
+        sock.settimeout(previous_timeout)
+
+def send_frame(sock, payload, timeout=None, max_size=MAX_FRAME_SIZE):
+    """Sends a payload as a length prefixed frame on a socket.
+
+    The header and the payload are passed to the kernel with one sendmsg
+    call without copying the payload. Without sendmsg small payloads are
+    copied behind the header and large ones are sent after it.
+
+    Args:
+        sock (:obj:`socket`): The socket to send data.
+        payload (:obj:`str`): The payload of the frame.
+        timeout (:obj:`int`, optional): The given timeout for the complete
+            sending process.
+        max_size (:obj:`int`, optional): The maximum payload size. Default
+            is MAX_FRAME_SIZE, None disables the check.
+
+    Raises:
+        socket.timeout: If the timeout is exceeded.
+        FrameSizeError: If the payload exceeds the maximum size.
+    """
+
+    check_frame_size(len(payload), max_size)
+    header = HEADER.pack(len(payload))
+    previous_timeout = sock.gettimeout()
+    try:
+        sock.settimeout(timeout)
+        if hasattr(sock, 'sendmsg'):
+            sent = sock.sendmsg([header, payload])
+            if sent < len(header):
+                sock.sendall(header[sent:])
+                sent = len(header)
+            if sent - len(header) < len(payload):
+                sock.sendall(memoryview(payload)[sent - len(header):])
+        elif len(payload) <= SMALL_FRAME_SIZE:
+            sock.sendall(header + payload)
+        else:
+            sock.sendall(header)
+            sock.sendall(payload)
+    finally:
+        sock.settimeout(previous_timeout)
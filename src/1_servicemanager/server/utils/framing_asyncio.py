@@ -0,0 +1,85 @@
+"""The asyncio variant of the framed message I/O.
+
+The FramedProtocol of this module receives the same length prefixed frames as
+utils.framing for servers and clients on an asyncio event loop. The module
+needs Python 3.7 or newer for asyncio.BufferedProtocol. The service manager
+runs with Python 2, so utils does not import it; the Python 3 tools import it
+directly.
+"""
+
+import asyncio
+import logging
+
+from utils.framing import HEADER, MAX_FRAME_SIZE, FrameSizeError, check_frame_size
+
+LOGGER = logging.getLogger(__name__)
+
+class FramedProtocol(asyncio.BufferedProtocol):
+    """A protocol, which receives and sends length prefixed frames.
+
+    The event loop receives the data of the connection directly into the
+    preallocated buffers of the header and the payload, so a frame is not
+    copied after it has been received. Every complete frame is passed to the
+    frame_received function of the owner.
+
+    Attributes:
+        transport (:obj:`asyncio.Transport`): The transport of the
+            connection.
+        max_size (:obj:`int`): The maximum accepted payload size.
+    """
+
+    def __init__(self, frame_received, max_size=MAX_FRAME_SIZE):
+        """The initialization function of the class FramedProtocol.
+
+        Args:
+            frame_received (:obj: function): The function to handle a
+                complete frame, called with the protocol and the payload as a
+                bytearray.
+            max_size (:obj:`int`, optional): The maximum accepted payload
+                size. Larger frames close the connection.
+        """
+
+        self.transport = None
+        self.max_size = max_size
+        self.cb_frame_received = frame_received
+        self.__header = bytearray(HEADER.size)
+        self.__buffer = self.__header
+        self.__received = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return memoryview(self.__buffer)[self.__received:]
+
+    def buffer_updated(self, nbytes):
+        self.__received += nbytes
+        while self.__received == len(self.__buffer):
+            if self.__buffer is self.__header:
+                length = HEADER.unpack(bytes(self.__header))[0]
+                try:
+                    check_frame_size(length, self.max_size)
+                except FrameSizeError as exc:
+                    LOGGER.error("Closing connection, Error=%s", exc)
+                    self.__received = 0
+                    self.transport.close()
+                    return
+                self.__buffer = bytearray(length)
+            else:
+                frame = self.__buffer
+                self.__buffer = self.__header
+                self.cb_frame_received(self, frame)
+            self.__received = 0
+
+    def send_frame(self, payload):
+        """Sends a payload as a length prefixed frame on the transport.
+
+        Args:
+            payload (:obj:`bytes`): The payload of the frame.
+
+        Raises:
+            FrameSizeError: If the payload exceeds the maximum size.
+        """
+
+        check_frame_size(len(payload), self.max_size)
+        self.transport.writelines([HEADER.pack(len(payload)), payload])
@@ -6,20 +6,21 @@ manager.
 """
 
 import logging
-import json
-import select
-import struct
 import socket
 import os
 
+import utils.framing as Framing
+import utils.status_codec as StatusCodec
+
 LOGGER = logging.getLogger(__name__)
 
 def recvall(sock, n, timeout=None):
     """Helper function to the recv_packet function.
 
     This functions receives n bytes on a socket or return None if EOF is hit.
-    The socket is nonblocking, but will throw an exception, if the timeout is
-    set.
+    The bytes are received into a preallocated buffer, see
+    utils.framing.recv_exactly, and the socket will throw an exception, if the
+    timeout is exceeded.
 
     Args:
         sock (:obj:`socket`): The socket to receive data.
@@ -32,35 +33,10 @@ def recvall(sock, n, timeout=None):
 
     """
 
-    try:
-        data = ''
-        sock.setblocking(0)
-        while len(data) < n:
-            read_ready = None
-            if timeout is not None:
-                read_ready, _, _ = select.select([sock], [], [], timeout)
-            else:
-                read_ready, _, _ = select.select([sock], [], [])
-
-            if read_ready:
-                packet = sock.recv(n - len(data))
-
-                if not packet:
-                    return None
-
-                data += packet
-            else:
-                raise socket.timeout("timed out")
-        return data
-    except socket.timeout as exc:
-        LOGGER.error("Timeout while receiving data, Timeout=%s, Error=%s",
-                     timeout, exc)
-        raise socket.timeout(exc)
-    except Exception as exc:
-        raise
-    finally:
-        sock.setblocking(1)
-        sock.settimeout(None)
+    data = Framing.recv_exactly(sock, n, timeout)
+    if data is None:
+        return None
+    return bytes(data)
 
 def send_packed(sock, msg, timeout=None):
     """Helper function to the send data with a socket.
@@ -78,28 +54,16 @@ def send_packed(sock, msg, timeout=None):
         The answer of the connected host.
     """
 
-    try:
-        # Prefix each message with a 4-byte length (network byte order)
-        msg = struct.pack('>I', len(msg)) + msg
-        sock.settimeout(timeout)
-        answer = sock.sendall(msg)
-        return answer
-    except socket.timeout as exc:
-        #LOGGER.error("Timeout while sending data, Timeout=%s, Error=%s",
-        #             timeout, exc)
-        raise socket.timeout(exc)
-    except Exception as exc:
-        raise
-    finally:
-        sock.settimeout(None)
-
+    # Prefix each message with a 4-byte length (network byte order)
+    Framing.send_frame(sock, msg, timeout)
     return None
 
 def recv_packed(sock, timeout=None):
     """Helper function to the receive data with a socket.
 
     This functions receives Messages over the given socket or throws a timeout
-    exception, if the host is not reachable.
+    exception, if the host is not reachable. The timeout covers the complete
+    message, not only its length prefix.
 
     Args:
         sock (:obj:`socket`): The socket to receive data.
@@ -110,16 +74,11 @@ def recv_packed(sock, timeout=None):
         The message of the connected host.
     """
 
-    try:
-        # Read message length and unpack it into an integer
-        raw_msglen = recvall(sock, 4, timeout)
-        if not raw_msglen:
-            return None
-        msglen = struct.unpack('>I', raw_msglen)[0]
-        # Read the message data
-        return recvall(sock, msglen)
-    except:
-        raise
+    # Read the message length and the message data into one buffer
+    frame = Framing.recv_frame(sock, timeout)
+    if frame is None:
+        return None
+    return bytes(frame)
 
 def translate_ip_addr_to_node_id(ip_addr):
     """Helper function to translate an IP address to the node ID.
@@ -160,13 +119,34 @@ def translate_node_id_to_ip_addr(node_id):
     else:
         return None
 
+def encode_service_status(node_id, service_name, event, counter=None,
+                          encoding=StatusCodec.JSON):
+    """Helper function to serialize a specific event from the service.
+
+    Args:
+        node_id (:obj:`int`): The node ID of this service manager instance.
+        service_name (:obj:`int`): The name of the service.
+        event (:obj:`int`): The event of this broadcast.
+        counter (:obj:`int`, optional): The network wide unique service
+            instance ID.
+        encoding (:obj:`str`, optional): The encoding of the event, 'json'
+            or 'binary', see utils.status_codec. Default is 'json'.
+
+    Returns:
+        The payload of the event to send to the clients.
+    """
+
+    return StatusCodec.encode(service_name, event, counter,
+                              translate_node_id_to_ip_addr(node_id), encoding)
+
 def broadcast_service_status(broadcast_addresses, node_id,
                              service_name, event, counter=None):
     """Helper function to broadcast a specific event from the service.
 
     This functions is a helper method to send a specific event to all
     listening clients in the network, e.g. the new service instance or the
-    stopping service instance.
+    stopping service instance. It opens a new socket for every call, the
+    StatusPublisher should be used for repeated events.
 
     Args:
         broadcast_addresses (:obj:`str`): The address to send the broadcast to.
@@ -177,25 +157,15 @@ def broadcast_service_status(broadcast_addresses, node_id,
             instance ID.
     """
 
+    client_broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
-        client_broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         client_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-        publish_options = {}
-        publish_options['service_name'] = str(service_name)
-        publish_options['event'] = event
-        publish_options['counter'] = counter
-
+        payload = encode_service_status(node_id, service_name, event, counter)
         for broadcast_addr in broadcast_addresses:
-            if node_id is not None:
-                publish_options['server_ip'] = translate_node_id_to_ip_addr(
-                    node_id)
-            else:
-                publish_options['server_ip'] = None
-            client_broadcast_socket.sendto(json.dumps(publish_options),
-                                           (broadcast_addr, 6500))
-    except Exception as exc:
-        raise
+            client_broadcast_socket.sendto(payload, (broadcast_addr, 6500))
+    finally:
+        client_broadcast_socket.close()
 
 def multicast_service_status(multicast_address, node_id,
                              service_name, event, counter=None):
@@ -203,7 +173,8 @@ def multicast_service_status(multicast_address, node_id,
 
     This functions is a helper method to send a specific event to all
     listening clients in the multicast group, e.g. the new service instance or
-    the stopping service instance.
+    the stopping service instance. It opens a new socket for every call, the
+    StatusPublisher should be used for repeated events.
 
     Args:
         multicast_address (:obj:`str`): The address to send the multicast to.
@@ -214,29 +185,21 @@ def multicast_service_status(multicast_address, node_id,
             instance ID.
     """
 
+    client_multicast_socket = socket.socket(
+        socket.AF_INET,
+        socket.SOCK_DGRAM,
+        socket.IPPROTO_UDP)
     try:
-        client_multicast_socket = socket.socket(
-            socket.AF_INET,
-            socket.SOCK_DGRAM,
-            socket.IPPROTO_UDP)
         client_multicast_socket.setsockopt(
             socket.IPPROTO_IP,
             socket.IP_MULTICAST_TTL,
             2)
 
-        publish_options = {}
-        publish_options['service_name'] = str(service_name)
-        publish_options['event'] = event
-        publish_options['counter'] = counter
-
-        if node_id is not None:
-            publish_options['server_ip'] = translate_node_id_to_ip_addr(node_id)
-        else:
-            publish_options['server_ip'] = None
-        client_multicast_socket.sendto(json.dumps(publish_options),
-                                       (multicast_address, 6500))
-    except Exception as exc:
-        raise
+        client_multicast_socket.sendto(
+            encode_service_status(node_id, service_name, event, counter),
+            (multicast_address, 6500))
+    finally:
+        client_multicast_socket.close()
 
 def get_all_interfaces():
     """Helper function to extract all network interfaces from the linux system.
@@ -0,0 +1,267 @@
+"""This module contains the binary result log of the performance client.
+
+The results of the requests are appended to the log as fixed-width records
+instead of text fragments. The file starts with a header, which names the
+format and the record size. Every record ends with a CRC32 of its fields, so a
+record torn by a crash or a damaged block is detected and skipped by the
+reader, and all records written before stay readable without any closing
+bracket or footer.
+
+Layout (little-endian):
+    header: magic (4s), version (H), record size (H), creation time (q, ns)
+    record: message ID (Q), latency (q, ns, -1 on error), sleeping time (d),
+            server node (i, -1 if unknown), hop count (i), attempts (i),
+            error code (i), CRC32 of the previous fields (I)
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b'MTRL'
+VERSION = 1
+HEADER_FORMAT = struct.Struct('<4sHHq')
+RECORD_FIELDS = struct.Struct('<Qqdiiii')
+RECORD_FORMAT = struct.Struct('<QqdiiiiI')
+
+ERROR_NONE = 0
+ERROR_TIMED_OUT = 1
+ERROR_MAX_ATTEMPTS = 2
+ERROR_CONN_RESET = 3
+ERROR_UNKNOWN = 4
+ERROR_DROPPED = 5
+
+# the NumPy layout of a record, the dtype is built when a log is loaded
+RECORD_DTYPE = [('message_id', '<u8'),
+                ('latency_ns', '<i8'),
+                ('sleeping_time', '<f8'),
+                ('server_node', '<i4'),
+                ('hop_count', '<i4'),
+                ('attempts', '<i4'),
+                ('error_code', '<i4'),
+                ('crc', '<u4')]
+
+def get_error_code(error):
+    """Returns the error code of an error message of the client.
+
+    Args:
+        error (:obj:`str`): The error message or None for a success.
+
+    Returns:
+        One of the ERROR_* codes.
+    """
+
+    if error is None:
+        return ERROR_NONE
+    if error == "timed out":
+        return ERROR_TIMED_OUT
+    if error == "reached max attempts":
+        return ERROR_MAX_ATTEMPTS
+    if "Connection reset by peer" in error:
+        return ERROR_CONN_RESET
+    if error == "dropped":
+        return ERROR_DROPPED
+    return ERROR_UNKNOWN
+
+def pack_record(message_id, server_node, hop_count, attempts, latency_ns, sleeping_time, error_code):
+    """Returns a record with its CRC32 as bytes."""
+
+    fields = RECORD_FIELDS.pack(message_id, latency_ns, sleeping_time,
+                                server_node, hop_count, attempts, error_code)
+    return fields + struct.pack('<I', zlib.crc32(fields) & 0xffffffff)
+
+def read_header(log_file):
+    """Reads and checks the header of a result log.
+
+    Args:
+        log_file (:obj:`file`): The log opened in binary mode.
+
+    Returns:
+        The creation time of the log in nanoseconds.
+
+    Raises:
+        ValueError: The file is no result log of this version.
+    """
+
+    header = log_file.read(HEADER_FORMAT.size)
+    if len(header) < HEADER_FORMAT.size:
+        raise ValueError("result log without header")
+    magic, version, record_size, created_ns = HEADER_FORMAT.unpack(header)
+    if magic != MAGIC or version != VERSION or record_size != RECORD_FORMAT.size:
+        raise ValueError("unknown result log format: {!r} version {} record size {}".format(
+            magic, version, record_size))
+    return created_ns
+
+def read_records(file_path):
+    """Yields the valid records of a result log as tuples.
+
+    The records are read one after another, a record with a wrong CRC32 and
+    a torn record at the end of the file are skipped.
+
+    Args:
+        file_path (:obj:`str`): The path of the result log.
+
+    Yields:
+        Tuples of message ID, server node, hop count, attempts, latency,
+        sleeping time and error code.
+    """
+
+    with open(file_path, 'rb') as log_file:
+        read_header(log_file)
+        while True:
+            record = log_file.read(RECORD_FORMAT.size)
+            if len(record) < RECORD_FORMAT.size:
+                return
+            if zlib.crc32(record[:RECORD_FIELDS.size]) & 0xffffffff != \
+               struct.unpack('<I', record[RECORD_FIELDS.size:])[0]:
+                LOGGER.error("Skipped damaged record in %s", file_path)
+                continue
+            message_id, latency_ns, sleeping_time, server_node, hop_count, attempts, error_code = \
+                RECORD_FIELDS.unpack(record[:RECORD_FIELDS.size])
+            yield message_id, server_node, hop_count, attempts, latency_ns, sleeping_time, error_code
+
+def load_result_log(file_path):
+    """Maps a result log into a NumPy structured array.
+
+    The file is memory-mapped, so only the pages of the used columns are
+    read. Records with a wrong CRC32 and a torn record at the end are left
+    out, the CRCs are checked vectorized.
+
+    Args:
+        file_path (:obj:`str`): The path of the result log.
+
+    Returns:
+        A structured array with one field per record column, e.g.
+        records['latency_ns'].
+    """
+
+    import numpy as np
+
+    with open(file_path, 'rb') as log_file:
+        read_header(log_file)
+
+    record_count = (os.path.getsize(file_path) - HEADER_FORMAT.size) // RECORD_FORMAT.size
+    dtype = np.dtype(RECORD_DTYPE)
+    if record_count <= 0:
+        return np.zeros(0, dtype=dtype)
+    records = np.memmap(file_path, dtype=dtype, mode='r',
+                        offset=HEADER_FORMAT.size, shape=(record_count,))
+
+    # zlib has no vectorized CRC, the check runs over the raw rows of the mapping
+    raw_records = records.view(np.uint8).reshape(record_count, RECORD_FORMAT.size)
+    crcs = np.fromiter((zlib.crc32(row[:RECORD_FIELDS.size].tobytes()) & 0xffffffff for row in raw_records),
+                       dtype=np.uint32, count=record_count)
+    valid = crcs == records['crc']
+    if not valid.all():
+        LOGGER.error("Skipped %s damaged records in %s", record_count - int(valid.sum()), file_path)
+        return records[valid]
+    return records
+
+class ResultLogWriter(object):
+    """This class appends the results of the client to a binary result log.
+
+    The records are collected in a buffer and written with one system call,
+    if the buffer is full, the flush interval has passed or the log is
+    flushed. A torn record at the end of an existing log, e.g. after a crash,
+    is cut off before appending, so the records stay aligned.
+
+    Attributes:
+        file_path (:obj:`str`): The path of the result log.
+        buffer_records (:obj:`int`): The number of records in the buffer,
+            which trigger a write.
+        flush_interval (:obj:`float`): The maximum age of the buffer in
+            seconds.
+    """
+
+    def __init__(self, file_path, buffer_records=256, flush_interval=1.0):
+        """The initialization function of the class ResultLogWriter.
+
+        Args:
+            file_path (:obj:`str`): The path of the result log.
+            buffer_records (:obj:`int`, optional): The number of buffered
+                records. Default is 256.
+            flush_interval (:obj:`float`, optional): The maximum age of the
+                buffer in seconds. Default is 1.0.
+        """
+
+        self.file_path = file_path
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()
+        self.buffer = bytearray()
+        self.buffered_records = 0
+        self.last_flush_time = time.time()
+
+        self.log_fd = os.open(file_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        file_size = os.fstat(self.log_fd).st_size
+        if file_size < HEADER_FORMAT.size:
+            os.ftruncate(self.log_fd, 0)
+            os.write(self.log_fd, HEADER_FORMAT.pack(MAGIC, VERSION, RECORD_FORMAT.size,
+                                                     int(time.time() * 1e9)))
+        else:
+            torn_bytes = (file_size - HEADER_FORMAT.size) % RECORD_FORMAT.size
+            if torn_bytes:
+                LOGGER.error("Cut off torn record at the end of %s", file_path)
+                os.ftruncate(self.log_fd, file_size - torn_bytes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # the exceptions of the with block are not swallowed
+        self.close()
+        return False
+
+    def append(self, message_id, server_node, hop_count, attempts, latency_ns, sleeping_time, error_code):
+        """Appends the result of one request.
+
+        Args:
+            message_id (:obj:`int`): The ID of the request.
+            server_node (:obj:`int`): The node ID of the server or -1.
+            hop_count (:obj:`int`): The hops to the server or -1.
+            attempts (:obj:`int`): The number of connection attempts.
+            latency_ns (:obj:`int`): The latency in nanoseconds or -1.
+            sleeping_time (:obj:`float`): The pause before the request.
+            error_code (:obj:`int`): One of the ERROR_* codes.
+        """
+
+        record = pack_record(message_id, server_node, hop_count, attempts,
+                             latency_ns, sleeping_time, error_code)
+        with self.lock:
+            self.buffer += record
+            self.buffered_records += 1
+            if self.buffered_records >= self.buffer_records or \
+               time.time() - self.last_flush_time >= self.flush_interval:
+                self.write_buffer()
+
+    def flush(self):
+        """Writes all buffered records to the log."""
+
+        with self.lock:
+            self.write_buffer()
+
+    def write_buffer(self):
+        # O_APPEND writes at the end of the file, a short write is continued
+        if self.buffer and self.log_fd is not None:
+            view = memoryview(self.buffer)
+            while view:
+                written = os.write(self.log_fd, view)
+                view = view[written:]
+        self.buffer = bytearray()
+        self.buffered_records = 0
+        self.last_flush_time = time.time()
+
+    def close(self):
+        """Writes the buffered records and closes the log."""
+
+        with self.lock:
+            self.write_buffer()
+            if self.log_fd is not None:
+                os.close(self.log_fd)
+                self.log_fd = None
@@ -0,0 +1,347 @@
+"""This module contains the ServiceConnector class.
+
+The service connector is the client side of a service, which moves between
+the hosts of the network. It keeps one persistent connection to the current
+server, follows the server to its new host after a migration and sends the
+requests of the client over this connection.
+"""
+
+import collections
+import errno
+import logging
+import socket
+import threading
+
+import utils.framing as Framing
+
+LOGGER = logging.getLogger(__name__)
+
+class PendingRequest(object):
+    """A request of the client, which waits for the answer of the server.
+
+    Attributes:
+        payload (:obj:`str`): The message to send to the server.
+        answer (:obj:`bytearray`): The answer of the server or None.
+        server_ip (:obj:`str`): The server, which answered the request.
+        attempts (:obj:`int`): The number of times the request was sent.
+        idempotent (bool): Flag, if the request may be sent again after the
+            connection broke before its answer.
+        cancelled (bool): Flag, if the client does not wait for the answer
+            anymore.
+        failed (bool): Flag, if the connection broke after sending a not
+            idempotent request.
+        answered_event (:obj:`threading.Event`): Event, which is set, if the
+            answer has been received or the request failed.
+    """
+
+    def __init__(self, payload, idempotent=False):
+        self.payload = payload
+        self.answer = None
+        self.server_ip = None
+        self.attempts = 0
+        self.idempotent = idempotent
+        self.cancelled = False
+        self.failed = False
+        self.answered_event = threading.Event()
+
+class ServiceConnector(object):
+    """A class for a persistent connection to a moving service.
+
+    The ServiceConnector connects to the current server of the service and
+    keeps the connection open. The requests are pipelined on the connection
+    and the answers are assigned in the order of the requests. If the
+    connection breaks or the server moves to another host, the connector
+    reconnects with an exponential backoff to the current server and sends
+    all unanswered idempotent and all meanwhile queued requests again, so a
+    migration is only a short stall for the client. An unanswered request,
+    which is not idempotent, fails instead, since the old server may have
+    processed it already.
+
+    The requests are sent outside of the condition, which guards the state
+    of the connection, so a stalled server can not block the receiving of
+    the answers. A send lock keeps the order of the requests on the
+    connection, and the send timeout bounds the sending of a request.
+
+    The owner of the connector informs it about a new server with
+    notify_server_change, e.g. after a started broadcast of the service.
+
+    Attributes:
+        server_port (:obj:`int`): The port of the service.
+        server_ip (:obj:`str`): The IP address of the current server.
+        counter (:obj:`int`): The network wide unique ID of the current
+            service instance.
+        connect_timeout (:obj:`float`): The timeout to connect to a server.
+        send_timeout (:obj:`float`): The timeout to send a request.
+        initial_backoff (:obj:`float`): The first waiting time in seconds
+            after a failed connection attempt.
+        max_backoff (:obj:`float`): The maximum waiting time in seconds
+            between two connection attempts.
+        resolve_attempts (:obj:`int`): The number of failed connection
+            attempts, after which the server is resolved again.
+    """
+
+    def __init__(self, server_port, server_ip=None, counter=None, resolve_server=None,
+                 connect_timeout=5.0, initial_backoff=0.05, max_backoff=2.0,
+                 resolve_attempts=3, send_timeout=5.0):
+        """The initialization function of the class ServiceConnector.
+
+        Args:
+            server_port (:obj:`int`): The port of the service.
+            server_ip (:obj:`str`, optional): The IP address of the first
+                server.
+            counter (:obj:`int`, optional): The ID of the first service
+                instance.
+            resolve_server (:obj: function, optional): A function without
+                arguments, which returns the server IP address and the counter
+                of the current service instance, e.g. from a location lookup.
+            connect_timeout (:obj:`float`, optional): The timeout to connect
+                to a server. Default is 5.0.
+            initial_backoff (:obj:`float`, optional): The first waiting time
+                after a failed connection attempt. Default is 0.05.
+            max_backoff (:obj:`float`, optional): The maximum waiting time
+                between two connection attempts. Default is 2.0.
+            resolve_attempts (:obj:`int`, optional): The number of failed
+                connection attempts, after which the server is resolved again.
+                Default is 3.
+            send_timeout (:obj:`float`, optional): The timeout to send a
+                request, the connection is closed after it. Default is 5.0.
+        """
+
+        self.server_port = server_port
+        self.server_ip = server_ip
+        self.counter = counter
+        self.cb_resolve_server = resolve_server
+        self.connect_timeout = connect_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.resolve_attempts = resolve_attempts
+        self.send_timeout = send_timeout
+
+        # the send lock is always acquired before the condition
+        self.__send_lock = threading.Lock()
+        self.__condition = threading.Condition()
+        self.__socket = None
+        self.__queued_requests = collections.deque()
+        self.__sent_requests = collections.deque()
+
+        self.stop_event = threading.Event()
+        self.connection_thread = threading.Thread(target=self.run, args=())
+        self.connection_thread.daemon = True
+        self.connection_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self
+
+    def close(self):
+        """Closes the connection and stops the connection thread."""
+
+        self.stop_event.set()
+        with self.__condition:
+            self.__close_socket()
+            self.__condition.notify_all()
+
+    def notify_server_change(self, server_ip, counter=None):
+        """Informs the connector about a new server of the service.
+
+        The current connection is closed, if the server has changed, and all
+        unanswered idempotent requests are sent again to the new server.
+
+        Args:
+            server_ip (:obj:`str`): The IP address of the new server.
+            counter (:obj:`int`, optional): The ID of the new service instance.
+                Older instances than the current one are ignored.
+        """
+
+        with self.__condition:
+            if server_ip is None or server_ip == self.server_ip:
+                if counter is not None and (self.counter is None or counter > self.counter):
+                    self.counter = counter
+                return
+            if counter is not None and self.counter is not None and counter < self.counter:
+                return
+
+            LOGGER.info("Server moved from %s to %s (counter=%s)", self.server_ip, server_ip, counter)
+            self.server_ip = server_ip
+            if counter is not None:
+                self.counter = counter
+            self.__close_socket()
+            self.__condition.notify_all()
+
+    def request(self, payload, timeout=None, idempotent=False):
+        """Sends a request to the current server and waits for the answer.
+
+        Args:
+            payload (:obj:`str`): The message to send to the server.
+            timeout (:obj:`float`, optional): The maximum time to wait for the
+                answer, including the time to reconnect.
+            idempotent (bool, optional): Flag, if the request may be sent
+                again to the next server, if the connection breaks before
+                the answer. Default is False.
+
+        Returns:
+            The answered PendingRequest with the answer, the answering server
+            and the number of sending attempts.
+
+        Raises:
+            socket.timeout: If the answer has not been received in time.
+            socket.error: If the connection broke after sending a request,
+                which is not idempotent.
+        """
+
+        pending_request = PendingRequest(payload, idempotent)
+        with self.__send_lock:
+            with self.__condition:
+                server_socket = self.__socket
+                if server_socket is not None:
+                    pending_request.attempts += 1
+                    self.__sent_requests.append(pending_request)
+                else:
+                    self.__queued_requests.append(pending_request)
+                    self.__condition.notify_all()
+            if server_socket is not None:
+                self.__send_requests(server_socket, [pending_request])
+
+        if not pending_request.answered_event.wait(timeout):
+            with self.__condition:
+                # a sent request keeps its place, so the answers stay in order
+                pending_request.cancelled = True
+                if pending_request in self.__queued_requests:
+                    self.__queued_requests.remove(pending_request)
+            raise socket.timeout("no answer from {} after {} attempts".format(
+                self.server_ip, pending_request.attempts))
+        if pending_request.failed:
+            raise socket.error(errno.ECONNRESET, "Connection reset by peer before the answer of {}".format(
+                self.server_ip))
+        return pending_request
+
+    def run(self):
+        """Main loop of the connection thread.
+
+        The thread connects to the current server, receives the answers of
+        the server and reconnects after errors or a server change.
+        """
+
+        backoff = self.initial_backoff
+        failed_attempts = 0
+        while self.stop_event.is_set() is False:
+            server_ip = self.server_ip
+            if server_ip is None or failed_attempts >= self.resolve_attempts:
+                self.__resolve_server()
+                failed_attempts = 0
+                server_ip = self.server_ip
+                if server_ip is None:
+                    self.__wait(backoff)
+                    backoff = min(2 * backoff, self.max_backoff)
+                    continue
+
+            try:
+                server_socket = socket.create_connection((server_ip, self.server_port),
+                                                         self.connect_timeout)
+                server_socket.settimeout(None)
+                server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except (socket.timeout, socket.error) as exc:
+                LOGGER.error("Error while connecting to host %s, Error=%s", server_ip, exc)
+                failed_attempts += 1
+                self.__wait(backoff)
+                backoff = min(2 * backoff, self.max_backoff)
+                continue
+
+            with self.__send_lock:
+                with self.__condition:
+                    if server_ip != self.server_ip or self.stop_event.is_set():
+                        # the server moved while connecting
+                        server_socket.close()
+                        continue
+                    self.__socket = server_socket
+                    # the requests of the last connection have been queued first
+                    requests = list(self.__queued_requests)
+                    self.__queued_requests.clear()
+                    for pending_request in requests:
+                        pending_request.attempts += 1
+                        self.__sent_requests.append(pending_request)
+                self.__send_requests(server_socket, requests)
+            backoff = self.initial_backoff
+            failed_attempts = 0
+
+            self.__receive_answers(server_socket, server_ip)
+
+    def __wait(self, seconds):
+        # a server change or the closing of the connector ends the waiting
+        with self.__condition:
+            if self.stop_event.is_set() is False:
+                self.__condition.wait(seconds)
+
+    def __resolve_server(self):
+        if self.cb_resolve_server is None:
+            return
+        try:
+            server_ip, counter = self.cb_resolve_server()
+        except Exception as exc:
+            LOGGER.error("Error while resolving the server, Error=%s", exc)
+            return
+        if server_ip is not None:
+            with self.__condition:
+                self.server_ip = server_ip
+                self.counter = counter
+
+    def __receive_answers(self, server_socket, server_ip):
+        while self.stop_event.is_set() is False:
+            try:
+                answer = Framing.recv_frame(server_socket)
+            except (socket.error, ValueError) as exc:
+                answer = None
+                if self.__socket is server_socket:
+                    LOGGER.error("Error while receiving from host %s, Error=%s", server_ip, exc)
+
+            with self.__condition:
+                if self.__socket is not server_socket:
+                    # the requests have been queued again for the next server
+                    return
+                if answer is None:
+                    self.__close_socket()
+                    return
+                if self.__sent_requests:
+                    pending_request = self.__sent_requests.popleft()
+                    pending_request.answer = answer
+                    pending_request.server_ip = server_ip
+                    pending_request.answered_event.set()
+
+    def __send_requests(self, server_socket, requests):
+        # called with the send lock, so the order of the requests is kept,
+        # a closed socket ends a stalled sending
+        try:
+            for pending_request in requests:
+                Framing.send_frame(server_socket, pending_request.payload, self.send_timeout)
+        except (socket.error, ValueError) as exc:
+            LOGGER.error("Error while sending to host %s, Error=%s", self.server_ip, exc)
+            with self.__condition:
+                if self.__socket is server_socket:
+                    self.__close_socket()
+
+    def __close_socket(self):
+        # called with the condition, the unanswered idempotent requests are
+        # sent again after the next connection, the other ones fail
+        if self.__socket is None:
+            return
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.__socket.close()
+        self.__socket = None
+
+        resent_requests = []
+        for pending_request in self.__sent_requests:
+            if pending_request.cancelled:
+                continue
+            if pending_request.idempotent:
+                resent_requests.append(pending_request)
+            else:
+                pending_request.failed = True
+                pending_request.answered_event.set()
+        self.__queued_requests.extendleft(reversed(resent_requests))
+        self.__sent_requests.clear()
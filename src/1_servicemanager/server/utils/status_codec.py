@@ -0,0 +1,140 @@
+"""The encodings of the service status events.
+
+The status events on the broadcast port are either JSON dictionaries or
+datagrams with a fixed binary layout. Both encodings carry the same fields
+(service_name, event, counter and server_ip), so every receiver accepts both
+and recognizes the encoding by the first byte of the datagram. A receiver
+answers a request in the encoding of the request.
+
+Example:
+    The binary layout (version 1, 16 bytes in network byte order):
+        magic 'SM' (2s), version (B), event code (B), counter (I),
+        server IPv4 address (I), hash of the service name (I)
+"""
+
+import json
+import socket
+import struct
+import zlib
+
+JSON = 'json'
+BINARY = 'binary'
+ENCODINGS = (JSON, BINARY)
+
+MAGIC = b'SM'
+VERSION = 1
+BINARY_LAYOUT = struct.Struct('>2sBBIII')
+
+EVENT_CODES = {'started': 1,
+               'stopped': 2,
+               'who_is': 3,
+               'who_is_answer': 4}
+EVENT_NAMES = dict((code, event) for event, code in EVENT_CODES.items())
+
+NO_COUNTER = 0xFFFFFFFF
+NO_SERVER_IP = 0
+
+SERVICE_NAMES = {}
+
+def get_service_id(service_name):
+    """Returns the 32-bit hash of a service name and remembers the name.
+
+    Args:
+        service_name (:obj:`str`): The name of the service.
+
+    Returns:
+        The unsigned CRC32 of the service name.
+    """
+
+    service_name = str(service_name)
+    service_id = zlib.crc32(service_name.encode('utf-8')) & 0xFFFFFFFF
+    SERVICE_NAMES[service_id] = service_name
+    return service_id
+
+def get_service_name(service_id):
+    """Returns the name of a service hash or the hash as hex string."""
+
+    return SERVICE_NAMES.get(service_id, '{:08x}'.format(service_id))
+
+# the name of the service in the testbed is known to all receivers
+get_service_id('service')
+
+def get_encoding(datagram):
+    """Returns the encoding of a received datagram.
+
+    Args:
+        datagram (:obj:`str`): The received datagram.
+
+    Returns:
+        The encoding of the datagram, 'json' or 'binary'.
+
+    Raises:
+        ValueError: If the datagram has an unknown encoding.
+    """
+
+    if datagram[:1] == b'{':
+        return JSON
+    if datagram[:2] == MAGIC:
+        return BINARY
+    raise ValueError("Unknown encoding of status event {!r}".format(datagram[:16]))
+
+def encode(service_name, event, counter=None, server_ip=None, encoding=JSON):
+    """Encodes a status event of the service.
+
+    Args:
+        service_name (:obj:`str`): The name of the service.
+        event (:obj:`str`): The event, one of EVENT_CODES.
+        counter (:obj:`int`, optional): The network wide unique service
+            instance ID.
+        server_ip (:obj:`str`, optional): The IP address of the service
+            running host.
+        encoding (:obj:`str`, optional): The encoding, 'json' or 'binary'.
+            Default is 'json'.
+
+    Returns:
+        The encoded datagram as bytes.
+    """
+
+    if encoding == BINARY:
+        return BINARY_LAYOUT.pack(
+            MAGIC, VERSION, EVENT_CODES[event],
+            NO_COUNTER if counter is None else int(counter),
+            NO_SERVER_IP if server_ip is None else
+            struct.unpack('>I', socket.inet_aton(str(server_ip)))[0],
+            get_service_id(service_name))
+
+    publish_options = {}
+    publish_options['service_name'] = str(service_name)
+    publish_options['event'] = event
+    publish_options['counter'] = counter
+    publish_options['server_ip'] = server_ip
+    return json.dumps(publish_options).encode('utf-8')
+
+def decode(datagram):
+    """Decodes a status event in one of the encodings.
+
+    Args:
+        datagram (:obj:`bytes`): The received datagram.
+
+    Returns:
+        A dictionary with the service_name, the event, the counter and the
+        server_ip of the event.
+
+    Raises:
+        ValueError: If the datagram has an unknown encoding or version.
+    """
+
+    if get_encoding(datagram) == JSON:
+        return json.loads(datagram.decode('utf-8'))
+
+    if len(datagram) != BINARY_LAYOUT.size:
+        raise ValueError("Wrong size of binary status event: {}".format(len(datagram)))
+    _, version, event_code, counter, server_ip, service_id = BINARY_LAYOUT.unpack(datagram)
+    if version != VERSION:
+        raise ValueError("Unsupported version of binary status event: {}".format(version))
+
+    return {'service_name': get_service_name(service_id),
+            'event': EVENT_NAMES.get(event_code, event_code),
+            'counter': None if counter == NO_COUNTER else counter,
+            'server_ip': None if server_ip == NO_SERVER_IP else
+                         socket.inet_ntoa(struct.pack('>I', server_ip))}
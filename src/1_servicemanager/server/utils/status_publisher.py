@@ -0,0 +1,179 @@
+"""This module contains the StatusPublisher class.
+
+The status publisher sends the events of the service to all listening clients
+in the network. It keeps its sockets open for the whole lifetime of the
+service manager, so an event costs only one sendto per subnet.
+"""
+
+import logging
+import socket
+import threading
+import time
+
+import utils.network_functions as Networking
+import utils.status_codec as StatusCodec
+
+LOGGER = logging.getLogger(__name__)
+
+class StatusPublisher(object):
+    """A class for publishing the status events of the service.
+
+    The StatusPublisher owns one connected UDP socket for every broadcast
+    address and an optional multicast socket. The payload of an event is
+    serialized once and sent on all sockets. The same event is sent only once
+    within the coalescing window, so a burst of identical events during a
+    migration does not flood the network.
+
+    Attributes:
+        port (:obj:`int`): The port of the listening clients.
+        coalescing_window (:obj:`float`): The time in seconds, in which
+            identical events are sent only once.
+        encoding (:obj:`str`): The encoding of the published events, see
+            utils.status_codec.
+        broadcast_sockets (:obj:`dict` of :obj:`socket`): The connected
+            sockets of the broadcast addresses.
+        multicast_socket (:obj:`socket`): The connected socket of the
+            multicast group or None.
+        unicast_socket (:obj:`socket`): The socket to answer single hosts.
+    """
+
+    def __init__(self, broadcast_addresses, port=6500, multicast_address=None,
+                 coalescing_window=0.5, encoding=StatusCodec.JSON):
+        """The initialization function of the class StatusPublisher.
+
+        Args:
+            broadcast_addresses (:obj:`list` of :obj:`str`): The addresses to
+                send the broadcasts to.
+            port (:obj:`int`, optional): The port of the listening clients.
+                Default is 6500.
+            multicast_address (:obj:`str`, optional): The address of the
+                multicast group to send the events to additionally.
+            coalescing_window (:obj:`float`, optional): The time in seconds,
+                in which identical events are sent only once. Default is 0.5.
+            encoding (:obj:`str`, optional): The encoding of the published
+                events, 'json' or 'binary'. Default is 'json'.
+        """
+
+        self.port = port
+        self.coalescing_window = coalescing_window
+        self.encoding = encoding
+        self.__lock = threading.Lock()
+        self.__last_payload = None
+        self.__last_publish_time = 0.0
+        self.__unconnected_addresses = set()
+        self.__last_unicast = {}
+
+        self.broadcast_sockets = {}
+        for broadcast_address in broadcast_addresses:
+            broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            try:
+                broadcast_socket.connect((broadcast_address, port))
+            except socket.error as exc:
+                # the interface of the subnet is not up yet, send without connection
+                LOGGER.error("Failed to connect to %s, Error=%s", broadcast_address, exc)
+                self.__unconnected_addresses.add(broadcast_address)
+            self.broadcast_sockets[broadcast_address] = broadcast_socket
+
+        self.multicast_socket = None
+        if multicast_address is not None:
+            self.multicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM,
+                                                  socket.IPPROTO_UDP)
+            self.multicast_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+            self.multicast_socket.connect((multicast_address, port))
+
+        self.unicast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self
+
+    def close(self):
+        """Closes all sockets of the publisher."""
+
+        for broadcast_socket in self.broadcast_sockets.itervalues():
+            broadcast_socket.close()
+        if self.multicast_socket is not None:
+            self.multicast_socket.close()
+        self.unicast_socket.close()
+
+    def publish(self, node_id, service_name, event, counter=None):
+        """Publishes an event of the service to all subnets.
+
+        Args:
+            node_id (:obj:`int`): The node ID of the service running host.
+            service_name (:obj:`str`): The name of the service.
+            event (:obj:`str`): The event to publish.
+            counter (:obj:`int`, optional): The network wide unique service
+                instance ID.
+
+        Returns:
+            True, if the event has been sent, or False, if an identical event
+            has been sent within the coalescing window.
+        """
+
+        payload = Networking.encode_service_status(node_id, service_name, event, counter,
+                                                   self.encoding)
+
+        with self.__lock:
+            now = time.time()
+            if payload == self.__last_payload and \
+               now - self.__last_publish_time < self.coalescing_window:
+                LOGGER.debug("Coalesced event %s of service %s", event, service_name)
+                return False
+            self.__last_payload = payload
+            self.__last_publish_time = now
+
+            for broadcast_address, broadcast_socket in self.broadcast_sockets.iteritems():
+                try:
+                    if broadcast_address in self.__unconnected_addresses:
+                        broadcast_socket.sendto(payload, (broadcast_address, self.port))
+                    else:
+                        broadcast_socket.send(payload)
+                except socket.error as exc:
+                    LOGGER.error("Failed to broadcast event to %s, Error=%s", broadcast_address, exc)
+            if self.multicast_socket is not None:
+                try:
+                    self.multicast_socket.send(payload)
+                except socket.error as exc:
+                    LOGGER.error("Failed to multicast event, Error=%s", exc)
+        return True
+
+    def send_to(self, address, node_id, service_name, event, counter=None, encoding=None):
+        """Sends an event of the service directly to a single host.
+
+        The same event is sent to a host only once within the coalescing
+        window, e.g. if the host repeats its who_is request.
+
+        Args:
+            address (:obj:`str`): The IP address of the host.
+            node_id (:obj:`int`): The node ID of the service running host.
+            service_name (:obj:`str`): The name of the service.
+            event (:obj:`str`): The event to send.
+            counter (:obj:`int`, optional): The network wide unique service
+                instance ID.
+            encoding (:obj:`str`, optional): The encoding of the event, e.g.
+                the encoding of the request. Default is the publisher's one.
+
+        Returns:
+            True, if the event has been sent, or False, if it has been sent
+            to the host within the coalescing window.
+        """
+
+        if encoding is None:
+            encoding = self.encoding
+        payload = Networking.encode_service_status(node_id, service_name, event, counter,
+                                                   encoding)
+
+        with self.__lock:
+            now = time.time()
+            last_payload, last_send_time = self.__last_unicast.get(address, (None, 0.0))
+            if payload == last_payload and now - last_send_time < self.coalescing_window:
+                return False
+            self.__last_unicast[address] = (payload, now)
+
+        self.unicast_socket.sendto(payload, (address, self.port))
+        return True
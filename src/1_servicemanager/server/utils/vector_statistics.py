@@ -0,0 +1,143 @@
+"""This module contains the statistics functions of the evaluation scripts.
+
+The functions work on NumPy arrays instead of Python lists: a sample is
+converted and sorted once, and the mean, the standard deviations, the
+percentiles, the boxplot whiskers and the outliers are taken from the sorted
+array. Breakdowns by a group key, e.g. the network interface or the server,
+are calculated from one sort of the keys.
+
+NumPy is only needed on the machine running the evaluation, so this module is
+not imported by the utils package and has to be imported directly.
+"""
+
+import numpy as np
+
+def to_array(values):
+    """Returns the values as a sorted float array.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+
+    Raises:
+        ValueError: The sample is empty.
+    """
+
+    values = np.sort(np.asarray(values, dtype=np.float64), kind='mergesort')
+    if values.size < 1:
+        raise ValueError('statistics require at least one data point')
+    return values
+
+def summarize(values, percentiles=(25, 50, 75)):
+    """Calculates the summary statistics of a sample.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+        percentiles (:obj:`tuple` of :obj:`float`, optional): The percentiles
+            to calculate. Default is the quartiles.
+
+    Returns:
+        A dictionary with count, mean, stdev (sample), pstdev (population),
+        min, max, range and the percentiles by their value. The standard
+        deviations are NaN for less than two data points.
+    """
+
+    values = to_array(values)
+    count = values.size
+    mean = values.mean()
+    sum_of_squares = np.dot(values - mean, values - mean)
+    summary = {'count': count,
+               'mean': float(mean),
+               'stdev': float(np.sqrt(sum_of_squares / (count - 1))) if count > 1 else float('nan'),
+               'pstdev': float(np.sqrt(sum_of_squares / count)) if count > 1 else float('nan'),
+               'min': float(values[0]),
+               'max': float(values[-1]),
+               'range': float(values[-1] - values[0]),
+               'percentiles': {}}
+    if percentiles:
+        for percentile, value in zip(percentiles, np.percentile(values, percentiles)):
+            summary['percentiles'][percentile] = float(value)
+    return summary
+
+def get_boxplot_statistics(values, whisker_factor=1.5):
+    """Calculates the values of a boxplot like matplotlib's boxplot.
+
+    The whiskers are the most extreme data points within whisker_factor times
+    the interquartile range from the quartiles, all other points are fliers.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+        whisker_factor (:obj:`float`, optional): The reach of the whiskers in
+            interquartile ranges. Default is 1.5.
+
+    Returns:
+        A dictionary with median, lower_quartile, upper_quartile, iqr,
+        lower_whisker, upper_whisker and the sorted array of the fliers.
+    """
+
+    values = to_array(values)
+    lower_quartile, median, upper_quartile = np.percentile(values, (25, 50, 75))
+    iqr = upper_quartile - lower_quartile
+
+    inside = (values >= lower_quartile - whisker_factor * iqr) & \
+             (values <= upper_quartile + whisker_factor * iqr)
+    lower_whisker = values[inside][0] if inside.any() else lower_quartile
+    upper_whisker = values[inside][-1] if inside.any() else upper_quartile
+
+    return {'median': float(median),
+            'lower_quartile': float(lower_quartile),
+            'upper_quartile': float(upper_quartile),
+            'iqr': float(iqr),
+            'lower_whisker': float(lower_whisker),
+            'upper_whisker': float(upper_whisker),
+            'fliers': values[(values < lower_whisker) | (values > upper_whisker)]}
+
+def trim_outliers(values, whisker_factor=1.5):
+    """Returns the sorted sample without the fliers of its boxplot.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+        whisker_factor (:obj:`float`, optional): The reach of the whiskers in
+            interquartile ranges. Default is 1.5.
+    """
+
+    values = to_array(values)
+    boxplot_statistics = get_boxplot_statistics(values, whisker_factor)
+    return values[(values >= boxplot_statistics['lower_whisker']) &
+                  (values <= boxplot_statistics['upper_whisker'])]
+
+def get_chunk_means(values, chunks):
+    """Returns the means of consecutive chunks of nearly equal size.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+        chunks (:obj:`int`): The number of chunks, empty ones are left out.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    return [float(chunk.mean()) for chunk in np.array_split(values, chunks) if chunk.size > 0]
+
+def summarize_groups(values, groups, percentiles=(25, 50, 75)):
+    """Calculates the summary statistics per group.
+
+    Args:
+        values (:obj:`list` or :obj:`numpy.ndarray`): The sample.
+        groups (:obj:`list` or :obj:`numpy.ndarray`): The group key of every
+            value, e.g. the interface of a link.
+        percentiles (:obj:`tuple` of :obj:`float`, optional): The percentiles
+            to calculate. Default is the quartiles.
+
+    Returns:
+        A dictionary of the summaries (see summarize) by group key.
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups)
+    if values.shape != groups.shape:
+        raise ValueError('every value needs a group')
+
+    order = np.argsort(groups, kind='mergesort')
+    group_keys, group_starts = np.unique(groups[order], return_index=True)
+    summaries = {}
+    for group_key, group_values in zip(group_keys, np.split(values[order], group_starts[1:])):
+        summaries[group_key.item()] = summarize(group_values, percentiles)
+    return summaries
@@ -0,0 +1,112 @@
+"""This module contains the WorkerPool class.
+
+The worker pool runs functions in a fixed number of threads. Instead of one
+new thread per connection or datagram, the work is put into a bounded queue
+and taken by the next free worker, so the number of threads and the amount of
+waiting work are limited under any request rate.
+"""
+
+import logging
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+LOGGER = logging.getLogger(__name__)
+
+class WorkerPool(object):
+    """A class for running functions in a bounded pool of threads.
+
+    The WorkerPool starts its worker threads once. Every submitted function is
+    put into the work queue and called by the next free worker. A finished
+    function leaves no thread or other reference behind. If the queue is full,
+    submit blocks until a worker is free or rejects the work.
+
+    Attributes:
+        workers (:obj:`int`): The number of worker threads.
+        backlog (:obj:`int`): The maximum number of waiting functions.
+        work_queue (:obj:`Queue.Queue`): The queue of the waiting functions.
+        worker_threads (:obj:`list` of :obj:`threading.Thread`): The worker
+            threads of the pool.
+    """
+
+    def __init__(self, workers=16, backlog=128, name="worker"):
+        """The initialization function of the class WorkerPool.
+
+        Args:
+            workers (:obj:`int`, optional): The number of worker threads.
+                Default is 16.
+            backlog (:obj:`int`, optional): The maximum number of waiting
+                functions. Default is 128.
+            name (:obj:`str`, optional): The prefix of the thread names.
+        """
+
+        self.workers = workers
+        self.backlog = backlog
+        self.work_queue = queue.Queue(backlog)
+
+        self.worker_threads = []
+        for i in range(workers):
+            worker_thread = threading.Thread(target=self.run, args=(),
+                                             name="{}-{}".format(name, i))
+            worker_thread.daemon = True
+            worker_thread.start()
+            self.worker_threads.append(worker_thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self
+
+    def submit(self, function, args=(), block=True):
+        """Submits a function to the next free worker.
+
+        Args:
+            function (:obj: function): The function to call.
+            args (:obj:`tuple`, optional): The arguments of the function.
+            block (bool, optional): Flag to wait for a free place in the
+                queue. Default is True.
+
+        Returns:
+            True, if the function has been queued, or False, if the queue is
+            full and block is False.
+        """
+
+        try:
+            self.work_queue.put((function, args), block)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self, wait=True):
+        """Stops the workers after all queued functions have been called.
+
+        Args:
+            wait (bool, optional): Flag to wait for the workers to finish.
+                Default is True.
+        """
+
+        for _ in self.worker_threads:
+            self.work_queue.put(None)
+        if wait:
+            for worker_thread in self.worker_threads:
+                worker_thread.join()
+
+    def run(self):
+        """Main loop of a worker thread."""
+
+        while True:
+            work = self.work_queue.get()
+            try:
+                if work is None:
+                    return
+                function, args = work
+                function(*args)
+            except Exception as exc:
+                LOGGER.error("Error in worker function, Error=%s", exc, exc_info=True)
+            finally:
+                self.work_queue.task_done()
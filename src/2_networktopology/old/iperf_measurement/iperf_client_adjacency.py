@@ -6,11 +6,12 @@ import logging
 import os
 import signal
 import subprocess
-import struct
 import socket
 import sys
 import time
 import threading
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+import utils.network_functions as Networking
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(format='%(asctime)s %(levelname)-6s: %(name)s (%(threadName)s) - %(message)s', level=logging.DEBUG)
@@ -64,11 +65,6 @@ class PerformanceClient(object):
         self.operator_info_event.set()
         return self
 
-    def send_msg(self, sock, msg):
-        # Prefix each message with a 4-byte length (network byte order)
-        msg = struct.pack('>I', len(msg)) + msg
-        sock.sendall(msg)
-
     def recv_operator_info(self):
         LOGGER.info("Start listening for operator's instructions to start")
         operator_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -133,7 +129,7 @@ class PerformanceClient(object):
                     except Exception as e:
                         LOGGER.error('Failed to start iperf service: ' + str(e), exc_info=True)
 
-                self.send_msg(conn, "OK")
+                Networking.send_packed(conn, "OK")
             except socket.error as e:
                 logging.error('Failed to accept socket (socket.error): ' + str(e), exc_info=True)
             except Exception as e:
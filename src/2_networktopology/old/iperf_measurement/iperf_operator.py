@@ -4,7 +4,8 @@ import socket
 import sys
 import time
 import json
-import struct
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+import utils.network_functions as Networking
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(format='%(asctime)s %(levelname)-6s: %(name)s (%(threadName)s) - %(message)s', level=logging.DEBUG)
@@ -22,30 +23,6 @@ ping_clients = ['10.5.202.6', '10.5.202.5', '10.5.202.4', '10.5.202.20', '10.5.2
                 '10.5.202.67', '10.5.202.68', '10.5.202.69', '10.5.202.70', '10.5.202.71',
                 '10.5.202.72', '10.5.202.73', '10.5.202.74', '10.5.202.75', '10.5.202.76']
 
-def recvall(sock, n):
-    # Helper function to recv n bytes or return None if EOF is hit
-    data = ''
-    while len(data) < n:
-        packet = sock.recv(n - len(data))
-        if not packet:
-            return None
-        data += packet
-    return data
-
-def send_msg(sock, msg):
-    # Prefix each message with a 4-byte length (network byte order)
-    msg = struct.pack('>I', len(msg)) + msg
-    sock.sendall(msg)
-
-def recv_msg(sock):
-    # Read message length and unpack it into an integer
-    raw_msglen = recvall(sock, 4)
-    if not raw_msglen:
-        return None
-    msglen = struct.unpack('>I', raw_msglen)[0]
-    # Read the message data
-    return recvall(sock, msglen)
-
 def start_iperf_on_client(index, host, port_number):
     try:
         client_socket = socket.socket()
@@ -53,7 +30,7 @@ def start_iperf_on_client(index, host, port_number):
         client_socket.connect((host, port_number))
         client_socket.settimeout(None)
 
-        answer = recv_msg(client_socket)
+        answer = Networking.recv_packed(client_socket)
         client_socket.close()
         #print "get_connectivity_list: " + answer
         return answer
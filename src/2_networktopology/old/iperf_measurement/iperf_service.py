@@ -3,7 +3,6 @@ import logging
 import signal
 import sys
 #import fcntl
-import struct
 #import array
 import subprocess
 #import netifaces
@@ -31,30 +30,6 @@ class IPerfService(object):
         LOGGER.debug('network topology service exit')
         return self
 
-    def recvall(self, sock, n):
-        # Helper function to recv n bytes or return None if EOF is hit
-        data = ''
-        while len(data) < n:
-            packet = sock.recv(n - len(data))
-            if not packet:
-                return None
-            data += packet
-        return data
-
-    def send_msg(self, sock, msg):
-        # Prefix each message with a 4-byte length (network byte order)
-        msg = struct.pack('>I', len(msg)) + msg
-        sock.sendall(msg)
-
-    def recv_msg(self, sock):
-        # Read message length and unpack it into an integer
-        raw_msglen = self.recvall(sock, 4)
-        if not raw_msglen:
-            return None
-        msglen = struct.unpack('>I', raw_msglen)[0]
-        # Read the message data
-        return self.recvall(sock, msglen)
-
     def startup_wlan_interfaces(self):
         LOGGER.debug("startup_wlan_interfaces")
         for interface in range(3):
@@ -4,13 +4,14 @@ import signal
 import socket
 import sys
 #import fcntl
-import struct
 #import array
 import subprocess
 import time
 import threading
 import json
 #import netifaces
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+import utils.network_functions as Networking
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(format='%(asctime)s %(levelname)-6s: %(name)s (%(threadName)s) - %(message)s', level=logging.DEBUG)
@@ -53,30 +54,6 @@ class NetworkTopologyService(object):
         LOGGER.debug('network topology service exit')
         return self
 
-    def recvall(self, sock, n):
-        # Helper function to recv n bytes or return None if EOF is hit
-        data = ''
-        while len(data) < n:
-            packet = sock.recv(n - len(data))
-            if not packet:
-                return None
-            data += packet
-        return data
-
-    def send_msg(self, sock, msg):
-        # Prefix each message with a 4-byte length (network byte order)
-        msg = struct.pack('>I', len(msg)) + msg
-        sock.sendall(msg)
-
-    def recv_msg(self, sock):
-        # Read message length and unpack it into an integer
-        raw_msglen = self.recvall(sock, 4)
-        if not raw_msglen:
-            return None
-        msglen = struct.unpack('>I', raw_msglen)[0]
-        # Read the message data
-        return self.recvall(sock, msglen)
-
     def startup_wlan_interfaces(self):
         LOGGER.debug("startup_wlan_interfaces")
         for interface in range(3):
@@ -163,7 +140,7 @@ class NetworkTopologyService(object):
         except Exception as exc:
             LOGGER.error("Exception while handle ping service request, Error="+str(exc))
         finally:
-            self.send_msg(conn, json.dumps(self.ping_flooding_results))
+            Networking.send_packed(conn, json.dumps(self.ping_flooding_results))
             conn.close()
 
     # def do_pings_on_broadcast(self, conn):
@@ -218,7 +195,7 @@ class NetworkTopologyService(object):
 
     #     LOGGER.info(self.ping_results)
 
-    #     self.send_msg(conn, json.dumps(self.ping_results))
+    #     Networking.send_packed(conn, json.dumps(self.ping_results))
     #     conn.close()
 
     def run_ping_service(self, tcp_socket, port, handle_function):
@@ -12,6 +12,7 @@ import xml.etree.ElementTree as ET
 
 sys.path.append('../1_servicemanager/server/')
 import migration.network_router as routing
+import utils.vector_statistics as Statistics
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(format='%(asctime)s %(levelname)-6s: %(filename)s:%(lineno)s (%(threadName)s) %(funcName)s\n%(message)s', level=logging.DEBUG)
@@ -449,37 +450,6 @@ class Evaluation(object):
         # with open(self.prefix_path+'final_adjacency_list.json', 'r') as adjacency_list_file:
         #     self.final_adjacency_list = json.load(adjacency_list_file)
 
-    def mean(self, data):
-        """Return the sample arithmetic mean of data."""
-        n = len(data)
-        if n < 1:
-            raise ValueError('mean requires at least one data point')
-        return sum(data)/n # in Python 2 use sum(data)/float(n)
-
-    def _ss(self, data):
-        """Return sum of square deviations of sequence data."""
-        c = self.mean(data)
-        ss = sum((x-c)**2 for x in data)
-        return ss
-
-    def pstdev(self, data):
-        """Calculates the population standard deviation."""
-        n = len(data)
-        if n < 2:
-            raise ValueError('variance requires at least two data points')
-        ss = self._ss(data)
-        pvar = ss/n # the population variance
-        return pvar**0.5
-
-    def stdev(self, data):
-        """Calculates the population standard deviation."""
-        n = len(data)
-        if n < 2:
-            raise ValueError('variance requires at least two data points')
-        ss = self._ss(data)
-        var = ss/(n-1) # the population variance
-        return var**0.5
-
     def calculate_seperate_interface_statistical_results(self, adjacency_list):
         '''
         1. mean of the RTT and its standard deviation
@@ -494,32 +464,21 @@ class Evaluation(object):
         LOGGER.info("adjacency_counter=%s, sum=%s", adjacency_counter, str(sum(adjacency_counter)))
 
         try:
-            rtt_lists = [[] for x in range(3)]
-            connectivity_lists = [[] for x in range(3)]
-            throughput_lists = [[] for x in range(3)]
+            # the values and the interface of their link, the statistics per interface are grouped by it
+            rtt_interfaces = []
+            connectivity_interfaces = []
+            throughput_interfaces = []
 
             global_rtt = []
             global_connectivity = []
             global_throughput = []
             global_nodes_connections = []
 
-            connectivity_minimum = 100000
-            connectivity_maximum = 0
-            throughput_minimum = 100000
-            throughput_maximum = 0
-
-            global_nodes_connections_mininum = 100000
-            global_nodes_connections_maximum = 0
-
             for index, source_list in enumerate(adjacency_list):
                 if index in UNREACHABLE_HOSTS or index == 0:
                     continue
 
                 global_nodes_connections.append(len(source_list))
-                if len(source_list) < global_nodes_connections_mininum:
-                    global_nodes_connections_mininum = len(source_list)
-                if len(source_list) > global_nodes_connections_maximum:
-                    global_nodes_connections_maximum = len(source_list)
 
                 for edge_object in source_list:
                     destination_node_edge = encode_edge(edge_object)
@@ -529,27 +488,17 @@ class Evaluation(object):
                         if destination_node_edge['etx']:
                             connectivity_percentage = (1 / destination_node_edge['etx']) * 100
 
-                            if connectivity_percentage < connectivity_minimum:
-                                connectivity_minimum = connectivity_percentage
-                            if connectivity_percentage > connectivity_maximum:
-                                connectivity_maximum = connectivity_percentage
-
-                            connectivity_lists[int(interface)].append(connectivity_percentage)
+                            connectivity_interfaces.append(int(interface))
                             global_connectivity.append(connectivity_percentage)
 
                         rtt_avg = destination_node_edge['rtt_avg']
                         if rtt_avg is not None:
-                            rtt_lists[int(interface)].append(rtt_avg)
+                            rtt_interfaces.append(int(interface))
                             global_rtt.append(rtt_avg)
 
                         throughput = destination_node_edge['throughput']
                         if throughput is not None:
-                            if throughput < throughput_minimum:
-                                throughput_minimum = throughput
-                            if throughput > throughput_maximum:
-                                throughput_maximum = throughput
-
-                            throughput_lists[int(interface)].append(throughput)
+                            throughput_interfaces.append(int(interface))
                             global_throughput.append(throughput)
 
                     except Exception as exc:
@@ -557,49 +506,33 @@ class Evaluation(object):
                         #pass
 
             if global_nodes_connections:
-                LOGGER.info('connections mean={mean}, sd={sd}, psd={psd}\nmin={min}, max={max}'.format(
-                            mean=self.mean(global_nodes_connections),
-                            sd=self.stdev(global_nodes_connections),
-                            psd=self.pstdev(global_nodes_connections),
-                            min=global_nodes_connections_mininum,
-                            max=global_nodes_connections_maximum))
+                connections_statistics = Statistics.summarize(global_nodes_connections, None)
+                LOGGER.info('connections mean={mean}, sd={stdev}, psd={pstdev}\nmin={min}, max={max}'.format(
+                            **connections_statistics))
+            if global_connectivity:
+                LOGGER.info('rtt  mean={mean}, sd={stdev}, psd={pstdev}'.format(
+                            **Statistics.summarize(global_rtt, None))+\
+                            '\nconn mean={mean}, sd={stdev}, psd={pstdev}\nmin={min}, max={max}'.format(
+                            **Statistics.summarize(global_connectivity, None)))
+            if global_throughput:
+                LOGGER.info('thro mean={mean}, sd={stdev}, psd={pstdev}\nmin={min}, max={max}'.format(
+                            **Statistics.summarize(global_throughput, None)))
+
             if global_connectivity:
-                LOGGER.info('rtt  mean={mean}, sd={sd}, psd={psd}'.format(
-                            mean=self.mean(global_rtt),
-                            sd=self.stdev(global_rtt),
-                            psd=self.pstdev(global_rtt))+\
-                            '\nconn mean={mean}, sd={sd}, psd={psd}\nmin={min}, max={max}'.format(
-                            mean=self.mean(global_connectivity),
-                            sd=self.stdev(global_connectivity),
-                            psd=self.pstdev(global_connectivity),
-                            min=connectivity_minimum,
-                            max=connectivity_maximum))
+                rtt_statistics = Statistics.summarize_groups(global_rtt, rtt_interfaces, None)
+                connectivity_statistics = Statistics.summarize_groups(global_connectivity, connectivity_interfaces, None)
+                for x in sorted(set(rtt_statistics) | set(connectivity_statistics)):
+                    if x in rtt_statistics:
+                        LOGGER.info('rtt  mean{interface}={mean}, sd{interface}={stdev}, psd{interface}={pstdev}'.format(
+                            interface=x, **rtt_statistics[x]))
+                    if x in connectivity_statistics:
+                        LOGGER.info('conn mean{interface}={mean}, sd{interface}={stdev}, psd{interface}={pstdev}'.format(
+                            interface=x, **connectivity_statistics[x]))
             if global_throughput:
-                LOGGER.info('thro mean={mean}, sd={sd}, psd={psd}\nmin={min}, max={max}'.format(
-                            mean=self.mean(global_throughput),
-                            sd=self.stdev(global_throughput),
-                            psd=self.pstdev(global_throughput),
-                            min=throughput_minimum,
-                            max=throughput_maximum))
-
-            for x in range(3):
-                if global_connectivity:
-                    LOGGER.info('rtt  mean{interface}={mean}, sd{interface}={sd}, psd{interface}={psd}'.format(
-                        interface=x,
-                        mean=self.mean(rtt_lists[x]),
-                        sd=self.stdev(rtt_lists[x]),
-                        psd=self.pstdev(rtt_lists[x]))+\
-                        '\nconn mean{interface}={mean}, sd{interface}={sd}, psd{interface}={psd}'.format(
-                            interface=x,
-                            mean=self.mean(connectivity_lists[x]),
-                            sd=self.stdev(connectivity_lists[x]),
-                            psd=self.pstdev(connectivity_lists[x])))
-                if global_throughput:
-                    LOGGER.info('thro mean{interface}={mean}, sd{interface}={sd}, psd{interface}={psd}'.format(
-                        interface=x,
-                        mean=self.mean(throughput_lists[x]),
-                        sd=self.stdev(throughput_lists[x]),
-                        psd=self.pstdev(throughput_lists[x])))
+                throughput_statistics = Statistics.summarize_groups(global_throughput, throughput_interfaces, None)
+                for x in sorted(throughput_statistics):
+                    LOGGER.info('thro mean{interface}={mean}, sd{interface}={stdev}, psd{interface}={pstdev}'.format(
+                        interface=x, **throughput_statistics[x]))
         except Exception as exc:
             LOGGER.error(exc, exc_info=True)
 
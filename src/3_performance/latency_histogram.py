@@ -0,0 +1,300 @@
+"""Latency recording of the performance client in HDR histograms.
+
+A LatencyHistogram counts the recorded values in buckets with a fixed number
+of significant figures (HDR histogram layout): every power of two range is
+split into the same number of linear sub buckets. Recording a value is one
+index calculation and one counter increment, and the percentiles are read
+from the counters without keeping the single values.
+
+The LatencyRecorder keeps the histograms of the successful requests in
+total, per server and per hop count, counts the failed requests per error
+kind and appends compact snapshots to a file in fixed intervals.
+"""
+
+import json
+import logging
+import math
+import sys
+import threading
+import time
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+from utils import RepeatedTimer
+
+LOGGER = logging.getLogger(__name__)
+
+class LatencyHistogram(object):
+    """A histogram of latencies in nanoseconds with a bounded relative error.
+
+    Attributes:
+        lowest_discernible_value (:obj:`int`): The smallest value, which is
+            distinguished from 0.
+        highest_trackable_value (:obj:`int`): The largest value, larger ones
+            are recorded as this value.
+        significant_figures (:obj:`int`): The number of significant decimal
+            figures of the recorded values.
+        counts (:obj:`list` of :obj:`int`): The counters of the buckets.
+        total_count (:obj:`int`): The number of recorded values.
+    """
+
+    PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+    def __init__(self, lowest_discernible_value=1000, highest_trackable_value=3600 * 10**9,
+                 significant_figures=2):
+        """The initialization function of the class LatencyHistogram.
+
+        Args:
+            lowest_discernible_value (:obj:`int`, optional): The smallest
+                value to distinguish from 0. Default is 1000 (1 us).
+            highest_trackable_value (:obj:`int`, optional): The largest value
+                to track. Default is one hour.
+            significant_figures (:obj:`int`, optional): The number of
+                significant decimal figures. Default is 2.
+        """
+
+        self.lowest_discernible_value = lowest_discernible_value
+        self.highest_trackable_value = highest_trackable_value
+        self.significant_figures = significant_figures
+
+        largest_value_with_single_unit_resolution = 2 * 10**significant_figures
+        sub_bucket_count_magnitude = int(math.ceil(math.log(largest_value_with_single_unit_resolution, 2)))
+        self.sub_bucket_half_count_magnitude = max(sub_bucket_count_magnitude, 1) - 1
+        self.sub_bucket_count = 2**(self.sub_bucket_half_count_magnitude + 1)
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.unit_magnitude = int(math.floor(math.log(lowest_discernible_value, 2)))
+        self.sub_bucket_mask = (self.sub_bucket_count - 1) << self.unit_magnitude
+
+        bucket_count = 1
+        smallest_untrackable_value = self.sub_bucket_count << self.unit_magnitude
+        while smallest_untrackable_value <= highest_trackable_value:
+            smallest_untrackable_value <<= 1
+            bucket_count += 1
+
+        self.counts = [0] * ((bucket_count + 1) * self.sub_bucket_half_count)
+        self.reset()
+
+    def reset(self):
+        """Removes all recorded values."""
+
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.total_count = 0
+        self.total_value = 0
+        self.min_value = None
+        self.max_value = None
+
+    def get_index(self, value):
+        """Returns the index of the bucket counting a value."""
+
+        bucket_index = (value | self.sub_bucket_mask).bit_length() - self.unit_magnitude - \
+                       (self.sub_bucket_half_count_magnitude + 1)
+        sub_bucket_index = value >> (bucket_index + self.unit_magnitude)
+        return ((bucket_index + 1) << self.sub_bucket_half_count_magnitude) + \
+               sub_bucket_index - self.sub_bucket_half_count
+
+    def get_highest_equivalent_value(self, index):
+        """Returns the largest value, which is counted in a bucket."""
+
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        shift = bucket_index + self.unit_magnitude
+        return (sub_bucket_index << shift) + (1 << shift) - 1
+
+    def record(self, value, count=1):
+        """Records a value.
+
+        Args:
+            value (:obj:`int`): The value to record, e.g. a latency in ns.
+            count (:obj:`int`, optional): The number of times to record it.
+        """
+
+        value = min(max(int(value), 0), self.highest_trackable_value)
+        self.counts[self.get_index(value)] += count
+        self.total_count += count
+        self.total_value += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if self.max_value is None or value > self.max_value:
+            self.max_value = value
+
+    def merge(self, other):
+        """Adds the recorded values of a histogram with the same layout."""
+
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_value += other.total_value
+        for value in (other.min_value, other.max_value):
+            if value is not None:
+                self.min_value = value if self.min_value is None else min(self.min_value, value)
+                self.max_value = value if self.max_value is None else max(self.max_value, value)
+
+    def get_value_at_percentile(self, percentile):
+        """Returns the value, below which the given percentage of values lie.
+
+        Args:
+            percentile (:obj:`float`): The percentile between 0 and 100.
+
+        Returns:
+            The largest equivalent value of the bucket of the percentile or
+            None, if nothing has been recorded.
+        """
+
+        if self.total_count == 0:
+            return None
+        target_count = max(int(math.ceil(percentile / 100.0 * self.total_count)), 1)
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            cumulative_count += count
+            if cumulative_count >= target_count:
+                return min(self.get_highest_equivalent_value(index), self.max_value)
+        return self.max_value
+
+    def get_mean(self):
+        """Returns the mean of the recorded values or None."""
+
+        if self.total_count == 0:
+            return None
+        return float(self.total_value) / self.total_count
+
+    def get_snapshot(self):
+        """Returns a compact dictionary of the histogram.
+
+        The snapshot contains the summary values and the non-empty buckets as
+        pairs of index and count, so snapshots can be merged again.
+        """
+
+        snapshot = {'count': self.total_count,
+                    'min': self.min_value,
+                    'max': self.max_value,
+                    'mean': self.get_mean(),
+                    'buckets': [[index, count] for index, count in enumerate(self.counts) if count]}
+        for percentile in self.PERCENTILES:
+            snapshot['p{:g}'.format(percentile)] = self.get_value_at_percentile(percentile)
+        return snapshot
+
+class LatencyRecorder(object):
+    """Records the results of the requests of the performance client.
+
+    The successful requests are recorded in a histogram in total, per server
+    IP address and per hop count. The failed requests are counted per error
+    kind in total and per server. A snapshot of all values is appended as one
+    JSON line to the snapshot file in every flush interval and on close.
+
+    Attributes:
+        snapshot_path (:obj:`str`): The file to append the snapshots to.
+        success_histogram (:obj:`LatencyHistogram`): The latencies of all
+            successful requests.
+        server_histograms (:obj:`dict`): The latencies per server.
+        hop_histograms (:obj:`dict`): The latencies per hop count.
+        error_counts (:obj:`dict`): The number of errors per kind.
+        server_error_counts (:obj:`dict`): The errors per server and kind.
+    """
+
+    ERROR_KINDS = ('timeout', 'max_attempts', 'reset', 'dropped', 'unknown')
+
+    def __init__(self, snapshot_path, flush_interval=10.0):
+        """The initialization function of the class LatencyRecorder.
+
+        Args:
+            snapshot_path (:obj:`str`): The file to append the snapshots to.
+            flush_interval (:obj:`float`, optional): The seconds between two
+                snapshots. Default is 10.0.
+        """
+
+        self.snapshot_path = snapshot_path
+        self.lock = threading.Lock()
+        self.success_histogram = LatencyHistogram()
+        self.server_histograms = {}
+        self.hop_histograms = {}
+        self.error_counts = dict((error_kind, 0) for error_kind in self.ERROR_KINDS)
+        self.server_error_counts = {}
+
+        self.flush_timer = RepeatedTimer(flush_interval, self.flush)
+        self.flush_timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return self
+
+    def close(self):
+        """Stops the periodic snapshots and writes the last one."""
+
+        self.flush_timer.cancel()
+        self.flush()
+
+    @staticmethod
+    def get_error_kind(error):
+        """Returns the error kind of an error message of the client."""
+
+        if error == "timed out":
+            return 'timeout'
+        if error == "reached max attempts":
+            return 'max_attempts'
+        if "Connection reset by peer" in error:
+            return 'reset'
+        if error == "dropped":
+            return 'dropped'
+        return 'unknown'
+
+    def record_success(self, latency_ns, server_ip, hop_count):
+        """Records the latency of a successful request.
+
+        Args:
+            latency_ns (:obj:`int`): The latency in nanoseconds.
+            server_ip (:obj:`str`): The IP address of the answering server.
+            hop_count (:obj:`int`): The hops between client and server.
+        """
+
+        with self.lock:
+            self.success_histogram.record(latency_ns)
+            if server_ip not in self.server_histograms:
+                self.server_histograms[server_ip] = LatencyHistogram()
+            self.server_histograms[server_ip].record(latency_ns)
+            if hop_count not in self.hop_histograms:
+                self.hop_histograms[hop_count] = LatencyHistogram()
+            self.hop_histograms[hop_count].record(latency_ns)
+
+    def record_error(self, error_kind, server_ip):
+        """Counts a failed request.
+
+        Args:
+            error_kind (:obj:`str`): The kind of the error, see ERROR_KINDS.
+            server_ip (:obj:`str`): The IP address of the requested server.
+        """
+
+        with self.lock:
+            self.error_counts[error_kind] += 1
+            server_errors = self.server_error_counts.setdefault(
+                server_ip, dict((kind, 0) for kind in self.ERROR_KINDS))
+            server_errors[error_kind] += 1
+
+    def get_snapshot(self):
+        """Returns a dictionary with the snapshots of all histograms."""
+
+        with self.lock:
+            return {'time': time.time(),
+                    'success': self.success_histogram.get_snapshot(),
+                    'servers': dict((str(server_ip), histogram.get_snapshot())
+                                    for server_ip, histogram in self.server_histograms.items()),
+                    'hops': dict((str(hop_count), histogram.get_snapshot())
+                                 for hop_count, histogram in self.hop_histograms.items()),
+                    'errors': dict(self.error_counts),
+                    'server_errors': dict((str(server_ip), dict(error_counts))
+                                          for server_ip, error_counts in self.server_error_counts.items())}
+
+    def flush(self):
+        """Appends the current snapshot to the snapshot file."""
+
+        snapshot = json.dumps(self.get_snapshot(), separators=(',', ':'), sort_keys=True)
+        try:
+            with open(self.snapshot_path, 'a') as snapshot_file:
+                snapshot_file.write(snapshot + "\n")
+        except IOError as exc:
+            LOGGER.error("Error while writing latency snapshot, Error=%s", exc)
@@ -0,0 +1,171 @@
+"""Open-loop load generator for the performance client.
+
+The arrival times of all requests are drawn from a Poisson process before the
+test starts. One scheduler thread releases the requests at these times to a
+bounded pool of sender threads, independent of the answers of the server
+(open loop), so a slow server does not lower the offered load. The payloads
+are taken from a pool of prepared buffers and all timestamps come from a
+monotonic nanosecond clock.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import random
+import sys
+import threading
+import time
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+from utils import WorkerPool
+
+LOGGER = logging.getLogger(__name__)
+
+def _get_clock_gettime_ns():
+    # Python 2 has no monotonic clock, so clock_gettime of the C library is used on Linux
+    CLOCK_MONOTONIC = 1
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'),
+                           use_errno=True)
+        clock_gettime = libc.clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    def clock_gettime_ns():
+        # the clock is read by all sender threads, so every call has its own timespec
+        now = timespec()
+        clock_gettime(CLOCK_MONOTONIC, ctypes.byref(now))
+        return now.tv_sec * 1000000000 + now.tv_nsec
+    return clock_gettime_ns
+
+if hasattr(time, 'perf_counter_ns'):
+    get_time_ns = time.perf_counter_ns
+else:
+    get_time_ns = _get_clock_gettime_ns() or (lambda: int(time.time() * 1e9))
+
+def get_poisson_arrival_times(requests_per_second, repetitions, seed=None):
+    """Returns the arrival times of a Poisson process in nanoseconds.
+
+    Args:
+        requests_per_second (:obj:`float`): The mean arrival rate.
+        repetitions (:obj:`int`): The number of arrivals.
+        seed (:obj:`int`, optional): The seed of the random generator.
+
+    Returns:
+        A list of the arrival times relative to the start of the test.
+    """
+
+    generator = random.Random(seed)
+    arrival_times = []
+    arrival_time = 0.0
+    for _ in range(repetitions):
+        arrival_time += generator.expovariate(requests_per_second)
+        arrival_times.append(int(arrival_time * 1e9))
+    return arrival_times
+
+class LoadGenerator(object):
+    """Releases requests at precomputed Poisson arrival times.
+
+    The send function is called in a sender thread with the message ID, the
+    payload, the scheduled time in nanoseconds and the gap to the previous
+    arrival in seconds. A latency measured from the scheduled time includes
+    the waiting time of a late request, so an overloaded client is visible in
+    the results. If all senders are busy and the queue is full, the request is
+    dropped instead of delaying the following ones and the drop function is
+    called with the message ID, the scheduled time and the gap.
+
+    Attributes:
+        arrival_times (:obj:`list` of :obj:`int`): The arrival times in
+            nanoseconds relative to the start.
+        payloads (:obj:`list` of :obj:`bytes`): The pool of payload buffers.
+        max_lag_ns (:obj:`int`): The largest delay of a release behind its
+            scheduled time.
+        dropped_requests (:obj:`int`): The number of requests, which could not
+            be released, because all senders were busy.
+    """
+
+    SPIN_THRESHOLD_NS = 200000
+
+    def __init__(self, send_function, requests_per_second, repetitions, message_size,
+                 senders=32, backlog=1024, payload_pool_size=64, seed=None, drop_function=None):
+        """The initialization function of the class LoadGenerator.
+
+        Args:
+            send_function (:obj: function): The function to send one request.
+            requests_per_second (:obj:`float`): The mean arrival rate.
+            repetitions (:obj:`int`): The number of requests.
+            message_size (:obj:`int`): The size of the payloads in bytes.
+            senders (:obj:`int`, optional): The number of sender threads.
+                Default is 32.
+            backlog (:obj:`int`, optional): The maximum number of released,
+                but not yet sent requests. Default is 1024.
+            payload_pool_size (:obj:`int`, optional): The number of prepared
+                payload buffers. Default is 64.
+            seed (:obj:`int`, optional): The seed of the arrival times.
+            drop_function (:obj: function, optional): The function to log a
+                dropped request.
+        """
+
+        self.send_function = send_function
+        self.drop_function = drop_function
+        self.senders = senders
+        self.backlog = backlog
+        self.arrival_times = get_poisson_arrival_times(requests_per_second, repetitions, seed)
+        self.payloads = [os.urandom(message_size) for _ in range(min(payload_pool_size, repetitions) or 1)]
+
+        self.max_lag_ns = 0
+        self.dropped_requests = 0
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        """Stops releasing further requests."""
+
+        self.stop_event.set()
+
+    def wait_until(self, deadline_ns):
+        # sleeps until shortly before the deadline and spins the rest for an accurate release
+        while True:
+            remaining_ns = deadline_ns - get_time_ns()
+            if remaining_ns <= 0:
+                return
+            if remaining_ns > self.SPIN_THRESHOLD_NS:
+                time.sleep((remaining_ns - self.SPIN_THRESHOLD_NS) / 1e9)
+
+    def run(self):
+        """Releases all requests and waits for the senders to finish.
+
+        Returns:
+            The number of released requests.
+        """
+
+        released_requests = 0
+        with WorkerPool(self.senders, self.backlog, "load-sender") as sender_pool:
+            start_ns = get_time_ns()
+            previous_arrival_ns = 0
+            for message_id, arrival_ns in enumerate(self.arrival_times, 1):
+                if self.stop_event.is_set():
+                    break
+
+                scheduled_ns = start_ns + arrival_ns
+                self.wait_until(scheduled_ns)
+                self.max_lag_ns = max(self.max_lag_ns, get_time_ns() - scheduled_ns)
+
+                payload = self.payloads[message_id % len(self.payloads)]
+                sleeping_time = (arrival_ns - previous_arrival_ns) / 1e9
+                previous_arrival_ns = arrival_ns
+                if sender_pool.submit(self.send_function,
+                                      (message_id, payload, scheduled_ns, sleeping_time), False):
+                    released_requests += 1
+                else:
+                    self.dropped_requests += 1
+                    if self.drop_function is not None:
+                        self.drop_function(message_id, scheduled_ns, sleeping_time)
+
+        LOGGER.info("Load generator released %s requests, dropped %s, max lag %.3f ms",
+                    released_requests, self.dropped_requests, self.max_lag_ns / 1e6)
+        return released_requests
@@ -1,20 +1,24 @@
 #!/usr/bin/python
-import datetime
 import imp
-import json
 import logging
 import logging.config
 import os
-import select
 import signal
 import socket
-import struct
 import sys
 import time
 import threading
 import random
 sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
 import migration.network_router as routing
+import utils.network_functions as Networking
+import utils.result_log as ResultLog
+import utils.status_codec as StatusCodec
+from utils import ResultLogWriter
+from utils import ServiceConnector
+from load_generator import LoadGenerator
+from load_generator import get_time_ns
+from latency_histogram import LatencyRecorder
 
 LOGGER = logging.getLogger(__name__)
 logging.config.fileConfig("/mnt/master-thesis/src/1_servicemanager/logging.conf", disable_existing_loggers=False)
@@ -30,7 +34,10 @@ class configuration(object):
 
 class PerformanceClient(object):
     def __init__(self, arguments):
-        # sequence of arguments: adjacency_list, unreachable_hosts, repetitions, start_delay, message_size, requests_p_minute
+        # sequence of arguments: adjacency_list, unreachable_hosts, repetitions, start_delay, message_size, requests_p_minute,
+        # first server and optionally the encoding of the status events (json or binary) and the
+        # connection mode (oneshot: one connection per request, persistent: one connection following the server) and the
+        # load mode (timer: requests with pauses, openloop: Poisson arrivals independent of the answers)
         LOGGER.info(arguments)
         self.global_connection_timeout = 60.0
 
@@ -59,6 +66,9 @@ class PerformanceClient(object):
                                        }   
         #LOGGER.debug("performance client init")
         self.current_server = arguments[6]
+        self.status_encoding = arguments[7] if len(arguments) > 7 else StatusCodec.JSON
+        self.connection_mode = arguments[8] if len(arguments) > 8 else 'oneshot'
+        self.load_mode = arguments[9] if len(arguments) > 9 else 'timer'
         self.current_server_id = 1
 
         LOGGER.info("The first server runs on host %s", self.current_server)
@@ -66,8 +76,18 @@ class PerformanceClient(object):
         self.SERVER_PORT = 5000
         self.BROADCAST_PORT = 6500
         self.OPERATOR_PORT = 7000
+        self.LOCATION_PORT = 6501
+        # the location of the server is looked up again at the local service manager after the TTL
+        self.location_ttl = 30.0
+        self.current_server_expiry_time = time.time() + self.location_ttl
         self.current_server_lock = threading.Lock()
 
+        self.service_connector = None
+        if self.connection_mode == 'persistent':
+            self.service_connector = ServiceConnector(self.SERVER_PORT, self.current_server,
+                                                      self.current_server_id,
+                                                      resolve_server=self.resolve_server_location)
+
         self.server_broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.server_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
@@ -88,6 +108,10 @@ class PerformanceClient(object):
         self.stop_running_performance_event = threading.Event()
         
         self.current_performance_test_results = {}
+        # the latencies are kept in histograms, a snapshot is appended every 10 seconds
+        self.latency_recorder = LatencyRecorder('./client_latency_histogram.log')
+        # one fixed-width record per request, readable up to the last complete record after a crash
+        self.result_log = ResultLogWriter('./client_results_output.bin')
 
         self.pausing_probability = 1.0 / (2*self.current_performance_set['requests_p_minute'])
         self.message_sending_time_slot = 45.0
@@ -101,6 +125,10 @@ class PerformanceClient(object):
     def __exit__(self, exc_type, exc_value, traceback):
         LOGGER.debug("performance client exit")
         self.server_broadcast_event.set()
+        if self.service_connector is not None:
+            self.service_connector.close()
+        self.latency_recorder.close()
+        self.result_log.close()
         #self.operator_info_event.set()
         self.running_performance_event.clear()
         return self
@@ -120,81 +148,17 @@ class PerformanceClient(object):
         else:
             return None
 
-    @staticmethod
-    def recvall(sock, n, timeout=None):
-        try:
-            # Helper function to recv n bytes or return None if EOF is hit
-            data = ''
-            sock.setblocking(0)
-            while len(data) < n:
-                read_ready = None
-                if timeout is not None:
-                    read_ready, _, _ = select.select([sock], [], [], timeout)
-                else:
-                    read_ready, _, _ = select.select([sock], [], [])
-
-                if read_ready:
-                    packet = sock.recv(n - len(data))
-
-                    if not packet:
-                        return None
-
-                    data += packet
-                else:
-                    raise socket.timeout("timed out")
-            return data
-        except socket.timeout as exc:
-            #LOGGER.error("Timeout while receiving data, Timeout={}, Error={}".format(timeout, exc))
-            raise socket.timeout(exc)
-        finally:
-            sock.setblocking(1)
-            sock.settimeout(None)
-
-    @staticmethod
-    def send_packed(sock, msg, timeout=None):
-        try:
-            # Prefix each message with a 4-byte length (network byte order)
-            msg = struct.pack('>I', len(msg)) + msg
-            sock.settimeout(timeout)
-            answer = sock.sendall(msg)
-            return answer
-        except socket.timeout as exc:
-            #LOGGER.error("Timeout while sending data, Timeout={}, Error={}".format(timeout, exc))
-            raise socket.timeout(exc)
-        finally:
-            sock.settimeout(None)
-
-        return None
-
-    def recv_packed(self, sock, timeout=None):
-        try:
-            # Read message length and unpack it into an integer
-            raw_msglen = self.recvall(sock, 4, timeout)
-            if not raw_msglen:
-                return None
-            msglen = struct.unpack('>I', raw_msglen)[0]
-            # Read the message data
-            return self.recvall(sock, msglen)
-        except:
-            raise
-
     def broadcast_service_status(self, broadcast_addresses, node_id, service_name, event, counter=None):
         try:
             client_broadcast_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             client_broadcast_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
 
-            publish_options = {}
-            publish_options['service_name'] = str(service_name)
-            publish_options['event'] = event
-            publish_options['counter'] = counter
+            payload = StatusCodec.encode(service_name, event, counter,
+                                         self.translate_node_id_to_ip_addr(node_id),
+                                         self.status_encoding)
 
             for broadcast_addr in broadcast_addresses:
-                if node_id is not None:
-                    publish_options['server_ip'] = self.translate_node_id_to_ip_addr(node_id)
-                else:
-                    publish_options['server_ip'] = None
-                client_broadcast_socket.sendto(json.dumps(publish_options),
-                                               (broadcast_addr, 6500))
+                client_broadcast_socket.sendto(payload, (broadcast_addr, 6500))
         except Exception as e:
             raise
 
@@ -218,8 +182,8 @@ class PerformanceClient(object):
         #LOGGER.info("Start listening for broadcast messages about server changes")
         while self.server_broadcast_event.is_set() is False:
             try:
-                new_message, address = self.server_broadcast_socket.recvfrom(16384)
-                new_message = json.loads(new_message)
+                datagram, address = self.server_broadcast_socket.recvfrom(16384)
+                new_message = StatusCodec.decode(datagram)
                 LOGGER.info("Broadcast message from {} = {}".format(address, new_message))
                 self.current_server_lock.acquire()
 
@@ -230,6 +194,9 @@ class PerformanceClient(object):
                    new_server_node_id != current_server_node_id and \
                    new_message['counter'] > self.current_server_id:
                     self.current_server = new_message['server_ip']
+                    self.current_server_id = new_message['counter']
+                    self.current_server_expiry_time = time.time() + self.location_ttl
+                    self.notify_service_connector()
 
                 if new_message['event'] == "stopped" and \
                    new_server_node_id == current_server_node_id and \
@@ -238,22 +205,20 @@ class PerformanceClient(object):
 
                 if new_message['event'] == "who_is" and self.current_server is not None:
                     #LOGGER.info("Broadcast message from {} (who_is)={}".format(address, new_message))
-                    publish_options = {}
-                    publish_options['service_name'] = "service"
-                    publish_options['event'] = "who_is_answer"
-                    publish_options['server_ip'] = self.current_server
-                    publish_options['counter'] = self.current_server_id
-                    
+                    # answer in the encoding of the request
+                    payload = StatusCodec.encode("service", "who_is_answer",
+                                                 self.current_server_id, self.current_server,
+                                                 StatusCodec.get_encoding(datagram))
                     try:
-                        who_is_answer_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                        who_is_answer_socket.sendto(json.dumps(publish_options), (address[0], self.BROADCAST_PORT))
-                        who_is_answer_socket.close()
+                        self.server_broadcast_socket.sendto(payload, (address[0], self.BROADCAST_PORT))
                     except socket.error as exc:
                         LOGGER.error('Failed to answer who_is (socket.error): ' + str(exc), exc_info=True)
 
                 if new_message['event'] == "who_is_answer" and self.current_server is None:
                     self.current_server = new_message['server_ip']
                     self.current_server_id = new_message['counter']
+                    self.current_server_expiry_time = time.time() + self.location_ttl
+                    self.notify_service_connector()
                     self.wait_for_who_is_answer_event.set()
 
             except Exception as exc:
@@ -265,7 +230,58 @@ class PerformanceClient(object):
 
         self.server_broadcast_socket.close()
 
-    def log_output_in_file(self, iterate_id, act_server_address, results_connection_attempts, result_time_diff, sleeping_time):
+    def lookup_server_location(self):
+        """Resolves the current server with one lookup at the local service manager.
+
+        The location directory of the local service manager answers the
+        who_is lookup with the counter and the IP address of the current
+        server instance. The answer is cached for the location TTL.
+
+        Returns:
+            True, if the location directory knows the current server.
+        """
+
+        lookup_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            lookup_socket.settimeout(1.0)
+            lookup_socket.sendto(StatusCodec.encode("service", "who_is", encoding=self.status_encoding),
+                                 ('127.0.0.1', self.LOCATION_PORT))
+            answer = StatusCodec.decode(lookup_socket.recv(1024))
+        except (socket.timeout, socket.error, ValueError) as exc:
+            LOGGER.error("Error while looking up the server location, Error={}".format(exc))
+            return False
+        finally:
+            lookup_socket.close()
+
+        if answer.get('server_ip') is None:
+            return False
+
+        self.current_server_lock.acquire()
+        try:
+            if answer['server_ip'] != self.current_server:
+                LOGGER.info("Location directory answer={}".format(answer))
+            self.current_server = answer['server_ip']
+            self.current_server_id = answer['counter']
+            self.current_server_expiry_time = time.time() + self.location_ttl
+        finally:
+            self.current_server_lock.release()
+        return True
+
+    def resolve_server_location(self):
+        """Returns the current server and its counter for the service connector."""
+
+        self.lookup_server_location()
+        return self.current_server, self.current_server_id
+
+    def notify_service_connector(self):
+        """Moves the persistent connection to the current server."""
+
+        if self.service_connector is not None:
+            self.service_connector.notify_server_change(self.current_server, self.current_server_id)
+
+    def log_output_in_file(self, iterate_id, act_server_address, results_connection_attempts, result_error, sleeping_time,
+                           latency_ns=None):
+        # result_error is None for a successful request with its latency_ns, otherwise the error message
 
         server_node_id = self.translate_ip_addr_to_node_id(act_server_address)
 
@@ -274,16 +290,53 @@ class PerformanceClient(object):
         else:
             hop_count = -1
 
-        test_results = {'server_ip': act_server_address,
-                        'hop_counter': hop_count,
-                        'connection_attempts': results_connection_attempts,
-                        'time_diff': result_time_diff,
-                        'sleeping_time': sleeping_time}
+        if result_error is None:
+            self.latency_recorder.record_success(latency_ns, act_server_address, hop_count)
+        else:
+            self.latency_recorder.record_error(LatencyRecorder.get_error_kind(result_error), act_server_address)
+
+        self.result_log.append(iterate_id,
+                               server_node_id if server_node_id is not None else -1,
+                               hop_count,
+                               results_connection_attempts,
+                               latency_ns if result_error is None else -1,
+                               sleeping_time,
+                               ResultLog.get_error_code(result_error))
+
+    def send_message_over_connector(self, message_id, prev_sleeping_time, message, start_ns=None):
+        try:
+            if start_ns is None:
+                start_ns = get_time_ns()
+            # the performance service only echoes the message, so a request can be sent to the next server again
+            request = self.service_connector.request(message, self.global_connection_timeout, idempotent=True)
+            latency_ns = get_time_ns() - start_ns
+
+            # a request sent once has needed no reconnection
+            self.log_output_in_file(
+                message_id, request.server_ip,
+                request.attempts - 1, None,
+                prev_sleeping_time, latency_ns)
+        except socket.timeout as exc:
+            LOGGER.error("Error while sending/receiving to/from host {}, Error={}".format(
+                self.service_connector.server_ip, exc))
+            self.log_output_in_file(
+                message_id, self.service_connector.server_ip,
+                0, "timed out",
+                prev_sleeping_time)
+        except socket.error as exc:
+            LOGGER.error("Error while sending/receiving to/from host {}, Error={}".format(
+                self.service_connector.server_ip, exc))
+            self.log_output_in_file(
+                message_id, self.service_connector.server_ip,
+                0, str(exc),
+                prev_sleeping_time)
 
-        with open('./client_results_output.log', 'a') as client_output_file:
-            client_output_file.write("{}:{},".format(iterate_id, test_results))
+    def send_message_to_server(self, message_id, prev_sleeping_time, message, start_ns=None):
+        # start_ns is the scheduled time of an open-loop request, the latency includes its connection setup
+        if self.service_connector is not None:
+            self.send_message_over_connector(message_id, prev_sleeping_time, message, start_ns)
+            return
 
-    def send_message_to_server(self, message_id, prev_sleeping_time, message):
         try:
             #LOGGER.info("send_message_to_server: start sending")
             client_socket = None
@@ -293,6 +346,12 @@ class PerformanceClient(object):
 
             while connection_attempts < connection_attempts_max:
                 current_connection_server = self.current_server
+                if current_connection_server is None or \
+                   self.current_server_expiry_time < time.time():
+                    # resolve the server at the local location directory first
+                    if self.lookup_server_location() is True:
+                        current_connection_server = self.current_server
+
                 if current_connection_server is None:
                     if self.whois_broadcast_sent.is_set() is False:
                         self.broadcast_service_status(["10.0.0.255"], None, "service", "who_is")
@@ -330,21 +389,20 @@ class PerformanceClient(object):
                     connected = False
 
             if connected is True:
-                time_diff = None
                 try:
                     #self.current_server_lock.acquire()                    
                     #LOGGER.info("Sending random message with length {} to server {}".format(len(message), self.current_server))
-                    start_time = datetime.datetime.now()
-                    self.send_packed(client_socket, message, self.global_connection_timeout)
-                    answer = self.recv_packed(client_socket, self.global_connection_timeout)
-                    finish_time = datetime.datetime.now()
+                    if start_ns is None:
+                        start_ns = get_time_ns()
+                    Networking.send_packed(client_socket, message, self.global_connection_timeout)
+                    answer = Networking.recv_packed(client_socket, self.global_connection_timeout)
                     #LOGGER.info("Answer from server=" + str(answer))
-                    time_diff = finish_time - start_time
+                    latency_ns = get_time_ns() - start_ns
 
                     self.log_output_in_file(
                         message_id, current_connection_server,
-                        connection_attempts, "{}".format(time_diff),
-                        prev_sleeping_time)
+                        connection_attempts, None,
+                        prev_sleeping_time, latency_ns)
                     #eturn current_connection_server, connection_attempts, "{}".format(time_diff)
                 except (socket.timeout, socket.error) as exc:
                     LOGGER.error("Error while sending/receiving to/from host {}, Error={}".format(current_connection_server, exc))
@@ -407,22 +465,38 @@ class PerformanceClient(object):
 
         if message_id == max_repetitions:
             time.sleep(80) # wait for other threads to finish their activity
-            with open('./client_results_output.log', 'a') as client_output_file:
-                client_output_file.write("}")
+            self.result_log.flush()
             sys.exit(0)
 
+    def send_scheduled_message(self, message_id, message, scheduled_ns, sleeping_time):
+        self.send_message_to_server(message_id, sleeping_time, message, scheduled_ns)
+
+    def log_dropped_message(self, message_id, scheduled_ns, sleeping_time):
+        # the request has not been sent, because all senders were busy
+        self.log_output_in_file(message_id, self.current_server, 0, "dropped", sleeping_time)
+
+    def send_open_loop(self, max_repetitions):
+        load_generator = LoadGenerator(self.send_scheduled_message,
+                                       self.current_performance_set['requests_p_minute'] / 60.0,
+                                       max_repetitions,
+                                       self.current_performance_set['message_size'],
+                                       drop_function=self.log_dropped_message)
+        load_generator.run()
+        self.result_log.flush()
+
     def run(self):
         while True:
             try:
                 if self.running_performance_event.is_set() is True:
                     #LOGGER.info("run: starting performance test")
                     self.stop_running_performance_event.clear()
-                    with open('./client_results_output.log', 'a') as client_output_file:
-                        client_output_file.write("{")
                     time.sleep(self.current_performance_set['start_delay'])
 
                     max_repetitions = self.current_performance_set['repetitions']
-                    self.send_recursive(0, 0, max_repetitions)
+                    if self.load_mode == 'openloop':
+                        self.send_open_loop(max_repetitions)
+                    else:
+                        self.send_recursive(0, 0, max_repetitions)
                     self.running_performance_event.clear()
                     # for i in range(0, max_repetitions):
                     #     #LOGGER.info("run: performance test iteration")
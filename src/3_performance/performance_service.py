@@ -1,12 +1,18 @@
+import errno
 import imp
 import logging
 import logging.config
+from optparse import OptionParser
+import os
+import select
 import signal
 import socket
-import struct
 import sys
 import threading
 import time
+sys.path.append('/mnt/master-thesis/src/1_servicemanager/server/')
+import utils.framing as Framing
+from utils import WorkerPool
 
 LOGGER = logging.getLogger(__name__)
 logging.config.fileConfig("/mnt/master-thesis/src/1_servicemanager/logging.conf", disable_existing_loggers=False)
@@ -17,22 +23,29 @@ def signal_handler(signal, frame):
 
 class PerformanceService(object):
 
-    def __init__(self):
+    def __init__(self, workers=16, backlog=128):
         LOGGER.debug("performance service init")
         self.global_connection_timeout = 60.0
+        self.backlog = backlog
 
         self.stop_service_event = threading.Event()
 
+        # the requests and datagrams are handled by a fixed number of workers
+        self.worker_pool = WorkerPool(workers, backlog, "performance-worker")
+
         self.tcp_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.tcp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 
-        self.client_threads = []
-        tcp_service_thread = threading.Thread(target=self.run_tcp_service_port,
-                                              args=(self.tcp_socket,
-                                                    5000, self.handle_tcp_packets,))
-        tcp_service_thread.daemon = True
-        tcp_service_thread.start()
+        # the open client connections by file descriptor: [connection, busy flag, time of the last request]
+        self.client_connections = {}
+        self.client_connections_lock = threading.Lock()
+        self.tcp_poller = select.epoll()
+        self.tcp_service_thread = threading.Thread(target=self.run_tcp_service_port,
+                                                   args=(self.tcp_socket,
+                                                         5000, self.handle_tcp_packets,))
+        self.tcp_service_thread.daemon = True
+        self.tcp_service_thread.start()
 
 
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -50,59 +63,27 @@ class PerformanceService(object):
 
     def __exit__(self, exc_type, exc_value, traceback):
         LOGGER.debug('performance service exit')
-        self.stop_service_event.set()        
+        self.stop_service_event.set()
+        self.tcp_service_thread.join(1.0)
         self.tcp_socket.close()
 
-        for thread in self.client_threads:
-            LOGGER.info("wait for thread")
-            thread.join()
+        LOGGER.info("wait for workers")
+        self.worker_pool.close()
 
         LOGGER.debug('performance service stops now')
         return self
 
-    def recvall(self, sock, n, timeout=None):
-        try:
-            # Helper function to recv n bytes or return None if EOF is hit
-            data = ''
-            while len(data) < n:
-                sock.settimeout(timeout)
-                packet = sock.recv(n - len(data))
-                if not packet:
-                    return None
-                data += packet
-            return data
-        except socket.timeout as exc:
-            #LOGGER.error("Timeout while receiving data, Timeout={}, Error={}".format(timeout, exc))
-            raise socket.timeout(exc)
-        finally:
-            sock.settimeout(None)
+    def drain_signal_handler(self, signum, frame):
+        LOGGER.info("got drain signal from service handler")
+        self.drain()
 
-    def send_packed(self, sock, msg, timeout=None):
+    def drain(self):
+        # stop accepting, the idle connections are closed by the TCP thread and the busy ones finish their request
+        self.stop_service_event.set()
         try:
-            # Prefix each message with a 4-byte length (network byte order)
-            msg = struct.pack('>I', len(msg)) + msg
-            sock.settimeout(timeout)
-            answer = sock.sendall(msg)
-            return answer
-        except socket.timeout as exc:
-            #LOGGER.error("Timeout while sending data, Timeout={}, Error={}".format(timeout, exc))
-            raise socket.timeout(exc)
-        finally:
-            sock.settimeout(None)
-
-        return None
-
-    def recv_packed(self, sock, timeout=None):
-        try:
-            # Read message length and unpack it into an integer
-            raw_msglen = self.recvall(sock, 4, timeout)
-            if not raw_msglen:
-                return None
-            msglen = struct.unpack('>I', raw_msglen)[0]
-            # Read the message data
-            return self.recvall(sock, msglen)
-        except:
-            raise
+            self.tcp_socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
 
     def handle_udp_packets(self, udp_socket, msg, addr):
         LOGGER.info('UDP connection on port 5001')
@@ -122,11 +103,10 @@ class PerformanceService(object):
         while self.stop_service_event.is_set() is False:
             try:
                 msg, addr = udp_socket.recvfrom(1024)
-                LOGGER.info('Message from ' + addr + '=' + str(msg))
-                connected_client_thread = threading.Thread(target=handle_function, args=(udp_socket, msg, addr,))
-                connected_client_thread.start()
-
-                self.client_threads.append(connected_client_thread)
+                LOGGER.info('Message from %s=%s', addr, msg)
+                # a datagram is dropped instead of blocking the port, if all workers are busy
+                if not self.worker_pool.submit(handle_function, (udp_socket, msg, addr,), False):
+                    LOGGER.error('Dropped message from %s, all workers are busy', addr)
             except socket.error as e:
                 LOGGER.error('Failed to get message (socket.error): ' + str(e))
             except Exception as e:
@@ -136,22 +116,53 @@ class PerformanceService(object):
 
     def handle_tcp_packets(self, conn):
         #LOGGER.info('TCP connection on port 5000')
+        # handles one request, a persistent client sends the next one over the same connection
+        message = None
         try:
-            message = self.recv_packed(conn, self.global_connection_timeout)
-
-            self.send_packed(conn, "OK", self.global_connection_timeout)
+            message = Framing.recv_frame(conn, self.global_connection_timeout)
+            if message is not None:
+                Framing.send_frame(conn, "OK", self.global_connection_timeout)
         except socket.timeout as exc:
             LOGGER.error("Timeout while handle tcp data, Error={}".format(exc))
-        finally:
-            conn.close()
+            message = None
+        except socket.error as exc:
+            LOGGER.error("Error while handle tcp data, Error={}".format(exc))
+            message = None
+
+        if message is None or self.stop_service_event.is_set() is True:
+            self.close_connection(conn)
+            return
+
+        with self.client_connections_lock:
+            self.client_connections[conn.fileno()][1:] = [False, time.time()]
+        try:
+            self.tcp_poller.modify(conn.fileno(), select.EPOLLIN | select.EPOLLONESHOT)
+        except (IOError, ValueError) as exc:
+            LOGGER.error("Error while waiting for the next request, Error={}".format(exc))
+            self.close_connection(conn)
+
+    def close_connection(self, conn):
+        with self.client_connections_lock:
+            self.client_connections.pop(conn.fileno(), None)
+        try:
+            self.tcp_poller.unregister(conn.fileno())
+        except (IOError, ValueError):
+            pass
+        conn.close()
+
+    def close_idle_connections(self, idle_since=None):
+        with self.client_connections_lock:
+            idle_connections = [conn for conn, busy, last_request_time in self.client_connections.values()
+                                if busy is False and (idle_since is None or last_request_time < idle_since)]
+        for conn in idle_connections:
+            self.close_connection(conn)
 
     def run_tcp_service_port(self, tcp_socket, port, handle_function):
         #LOGGER.debug('service handler run_service_port: ' + str(port))
 
         try:
             tcp_socket.bind(('', port))
-            #backlog is set to default value. defined in /proc/sys/net/core/somaxconn
-            tcp_socket.listen(128)
+            tcp_socket.listen(self.backlog)
         except socket.error as e:
             LOGGER.error('Failed to bind service sockets (socket.error): ' + str(e))
             sys.exit(1)
@@ -159,27 +170,144 @@ class PerformanceService(object):
             LOGGER.error('Failed to bind service sockets: ' + str(e))
             sys.exit(1)
 
+        # the thread only waits for new connections and requests, the workers handle the requests
+        self.tcp_poller.register(tcp_socket.fileno(), select.EPOLLIN)
         while self.stop_service_event.is_set() is False:
             try:
-                conn, addr = tcp_socket.accept()
-                #LOGGER.info('Connected with ' + addr[0] + ':' + str(addr[1]))
-                connected_client_thread = threading.Thread(target=handle_function, args=(conn,))
-                connected_client_thread.start()
-                
-                self.client_threads.append(connected_client_thread)
-            except socket.error as e:
-                LOGGER.error('Failed to accept socket (socket.error): %s %s', str(e), addr)
-            except Exception as e:
-                LOGGER.error('Failed to accept socket: ' + str(e))
+                events = self.tcp_poller.poll(0.5)
+            except IOError as e:
+                # interrupted by a signal
+                continue
+
+            for fileno, event in events:
+                if fileno == tcp_socket.fileno():
+                    try:
+                        conn, addr = tcp_socket.accept()
+                        #LOGGER.info('Connected with ' + addr[0] + ':' + str(addr[1]))
+                        with self.client_connections_lock:
+                            self.client_connections[conn.fileno()] = [conn, False, time.time()]
+                        self.tcp_poller.register(conn.fileno(), select.EPOLLIN | select.EPOLLONESHOT)
+                    except socket.error as e:
+                        if self.stop_service_event.is_set() is True:
+                            break
+                        LOGGER.error('Failed to accept socket (socket.error): %s', str(e))
+                    continue
+
+                with self.client_connections_lock:
+                    client_connection = self.client_connections.get(fileno)
+                    if client_connection is None:
+                        continue
+                    client_connection[1] = True
+                self.worker_pool.submit(handle_function, (client_connection[0],))
+
+            self.close_idle_connections(time.time() - self.global_connection_timeout)
+
+        self.close_idle_connections()
         return
 
     def run(self):
-        while True:
+        while self.stop_service_event.is_set() is False:
             time.sleep(0.001)
 
-if __name__ == "__main__":
+def run_service_process(workers, backlog):
     signal.signal(signal.SIGINT, signal_handler)
 
-    with PerformanceService() as performance_service:
+    with PerformanceService(workers, backlog) as performance_service:
+        signal.signal(signal.SIGTERM, performance_service.drain_signal_handler)
         performance_service.run()
-        
\ No newline at end of file
+
+class PerformanceServiceSupervisor(object):
+    # prefork mode: every process binds its own SO_REUSEPORT sockets and the kernel distributes the clients
+
+    def __init__(self, processes, workers, backlog):
+        LOGGER.debug("performance service supervisor init")
+        self.processes = processes
+        self.workers = workers
+        self.backlog = backlog
+        self.service_pids = []
+        self.stopping = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        LOGGER.debug('performance service supervisor exit')
+        self.forward_signal(signal.SIGINT, None)
+        return self
+
+    def start_service_process(self):
+        pid = os.fork()
+        if pid == 0:
+            # the signals are handled by the service itself, not forwarded again
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_service_process(self.workers, self.backlog)
+            except SystemExit:
+                pass
+            except Exception as exc:
+                LOGGER.error("Error in service process, Error={}".format(exc), exc_info=True)
+            finally:
+                os._exit(0)
+        self.service_pids.append(pid)
+        LOGGER.info("Started service process with pid=%s", pid)
+
+    def forward_signal(self, signum, frame):
+        # the service handler only knows the pid of the supervisor
+        self.stopping = True
+        for pid in self.service_pids:
+            try:
+                os.kill(pid, signum)
+            except OSError as exc:
+                LOGGER.error("Failed to forward signal to pid %s, Error=%s", pid, exc)
+
+    def run(self):
+        for _ in range(self.processes):
+            self.start_service_process()
+
+        while self.service_pids:
+            try:
+                pid, status = os.wait()
+            except OSError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise
+
+            if pid in self.service_pids:
+                self.service_pids.remove(pid)
+            if self.stopping is False:
+                LOGGER.error("Service process %s exited with status %s, restarting it", pid, status)
+                time.sleep(1.0)
+                self.start_service_process()
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="usage: %prog [options]")
+    parser.add_option('-w', '--workers',
+                      action='store',
+                      type='int',
+                      default=16,
+                      dest='workers',
+                      help="number of worker threads for the requests. Default is 16.")
+    parser.add_option('-b', '--backlog',
+                      action='store',
+                      type='int',
+                      default=128,
+                      dest='backlog',
+                      help="backlog of the listening socket and maximum number"+ \
+                           "of waiting requests. Default is 128.")
+    parser.add_option('-p', '--processes',
+                      action='store',
+                      type='int',
+                      default=1,
+                      dest='processes',
+                      help="number of service processes sharing the ports with"+ \
+                           "SO_REUSEPORT. More than one starts a supervising"+ \
+                           "parent process. Default is 1.")
+    options, _ = parser.parse_args()
+
+    if options.processes > 1:
+        with PerformanceServiceSupervisor(options.processes, options.workers, options.backlog) as supervisor:
+            signal.signal(signal.SIGINT, supervisor.forward_signal)
+            signal.signal(signal.SIGTERM, supervisor.forward_signal)
+            supervisor.run()
+    else:
+        run_service_process(options.workers, options.backlog)
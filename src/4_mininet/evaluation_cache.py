@@ -0,0 +1,84 @@
+"""Cache of the imported results of the test directories.
+
+The attributes of a FinalResult or FinalServerResult are stored per test
+directory together with the fingerprint of its log files: the relative path,
+the size and the modification time of every file. A later evaluation takes
+the cached results, as long as the fingerprint is unchanged, and only parses
+the logs of new or changed test runs.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+LOGGER = logging.getLogger(__name__)
+
+# increase to invalidate all cached results after a change of the import
+CACHE_VERSION = 2
+
+def get_fingerprint(test_path, file_paths):
+    """Returns the sorted relative paths, sizes and modification times of the files."""
+    fingerprint = []
+    for file_path in file_paths:
+        file_stat = os.stat(file_path)
+        fingerprint.append((os.path.relpath(file_path, test_path), file_stat.st_size,
+                            getattr(file_stat, 'st_mtime_ns', int(file_stat.st_mtime * 1e9))))
+    return sorted(fingerprint)
+
+class EvaluationCache(object):
+    """Stores the imported results per test directory and kind of result.
+
+    Attributes:
+        cache_path (:obj:`str`): The directory of the cache files.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        if not os.path.isdir(cache_path):
+            os.makedirs(cache_path)
+
+    def get_cache_file_path(self, test_path, kind, options):
+        key = "{}|{}|{}".format(os.path.abspath(test_path), kind, options)
+        return os.path.join(self.cache_path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+    def load(self, result, kind, fingerprint, options=None):
+        """Fills a new result object with the cached attributes.
+
+        Args:
+            result (:obj:`object`): The new FinalResult or FinalServerResult
+                of the test directory.
+            kind (:obj:`str`): The kind of the result, e.g. client or server.
+            fingerprint (:obj:`list`): The current fingerprint of the logs.
+            options (:obj:`object`, optional): Further options of the import,
+                which change the result.
+
+        Returns:
+            True, if the result has been loaded from the cache.
+        """
+        cache_file_path = self.get_cache_file_path(result.test_path, kind, options)
+        try:
+            with open(cache_file_path, 'rb') as cache_file:
+                cache_entry = pickle.load(cache_file)
+        except (IOError, OSError):
+            return False
+        except Exception as exc:
+            LOGGER.error("Invalid cache file %s, Error=%s", cache_file_path, exc)
+            return False
+
+        if cache_entry.get('version') != CACHE_VERSION or cache_entry.get('fingerprint') != fingerprint:
+            return False
+        result.__dict__.update(cache_entry['attributes'])
+        LOGGER.info("cached %s results of %s", kind, result.test_path)
+        return True
+
+    def store(self, result, kind, fingerprint, options=None):
+        """Stores the attributes of an imported result."""
+        cache_file_path = self.get_cache_file_path(result.test_path, kind, options)
+        cache_entry = {'version': CACHE_VERSION,
+                       'fingerprint': fingerprint,
+                       'attributes': result.__dict__}
+        # a partly written cache file must not replace a complete one
+        with open(cache_file_path + '.tmp', 'wb') as cache_file:
+            pickle.dump(cache_entry, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_file_path + '.tmp', cache_file_path)
@@ -0,0 +1,159 @@
+#!/usr/bin/python
+"""Runs a sweep of mininet experiments and collects their results.
+
+The sweep is a JSON file with a list of values per test parameter, e.g.
+
+    {"message_size": [1460, 14600],
+     "repetitions_p_minute": [10, 60],
+     "migration_time": [30],
+     "repetitions": [2000],
+     "start_delay": [0.0],
+     "scenario": ["iot_a_etx", "iot_b_etx"]}
+
+Every combination is one experiment: the network is started, the routes and
+the service managers are probed instead of waiting a fixed time, the test
+runs until every client has written its results, and the test directory is
+ingested into the result store. With --concurrent the experiments are run
+by several worker processes, each with its own network slot.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import traceback
+from optparse import OptionParser
+
+import mesh_topo as MeshTopo
+from mininet.log import setLogLevel, info, error
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '1_servicemanager', 'server'))
+from utils.result_log import HEADER_FORMAT, RECORD_FORMAT
+
+PARAMETERS = ('repetitions', 'start_delay', 'message_size', 'repetitions_p_minute', 'migration_time', 'scenario')
+DEFAULTS = {'repetitions': 2000,
+            'start_delay': 0.0,
+            'message_size': 14600,
+            'repetitions_p_minute': 10,
+            'migration_time': 30,
+            'scenario': 'iot_a_etx'}
+
+def expand_sweep(sweep):
+    """Yields the configurations of all combinations of the sweep values."""
+    unknown_keys = set(sweep) - set(PARAMETERS)
+    if unknown_keys:
+        raise ValueError("unknown sweep parameters: {}".format(sorted(unknown_keys)))
+
+    values = []
+    for parameter in PARAMETERS:
+        value = sweep.get(parameter, DEFAULTS[parameter])
+        values.append(value if isinstance(value, list) else [value])
+    for config in itertools.product(*values):
+        config = dict(zip(PARAMETERS, config))
+        if config['scenario'] not in MeshTopo.SCENARIOS:
+            raise ValueError("unknown scenario: {}".format(config['scenario']))
+        yield config
+
+def get_result_count(test_path, host_name):
+    result_log_path = os.path.join(test_path, host_name, 'client_results_output.bin')
+    try:
+        return max(0, (os.path.getsize(result_log_path) - HEADER_FORMAT.size) // RECORD_FORMAT.size)
+    except OSError:
+        return 0
+
+def wait_for_results(test_path, client_hosts, config):
+    """Waits until every client has written a result per repetition or the test timed out."""
+    # the requests are paced by the requests per minute, the rest covers timeouts and retries
+    timeout = config['repetitions'] * 60.0 / config['repetitions_p_minute'] * 1.5 + 300
+    return MeshTopo.wait_until(
+        lambda: all(get_result_count(test_path, host_name) >= config['repetitions'] for host_name in client_hosts),
+        timeout, interval=10.0, description="results of {}".format(test_path))
+
+def collect_results(test_path, store_path):
+    """Ingests the test directory into the result store, the evaluation runs with python3."""
+    evaluation_path = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.call(['python3', os.path.join(evaluation_path, 'result_store.py'),
+                            '-s', store_path, test_path], cwd=evaluation_path) == 0
+
+def run_experiment(config, store_path, slot=0):
+    """Runs one experiment and returns its test directory or None."""
+    server_hosts, client_hosts, first_server = MeshTopo.SCENARIOS[config['scenario']]
+    info("*** slot {} starts {}\n".format(slot, config))
+
+    test_path = None
+    try:
+        if not MeshTopo.initNetwork(client_hosts, slot=slot) or \
+           not MeshTopo.wait_for_routes(client_hosts, first_server, slot=slot):
+            return None
+        test_path = MeshTopo.startOperations(config['repetitions'], config['start_delay'], config['message_size'],
+                                             config['repetitions_p_minute'], config['migration_time'],
+                                             server_hosts, first_server, client_hosts, slot=slot)
+        wait_for_results(test_path, client_hosts, config)
+    finally:
+        MeshTopo.stopOperations()
+        MeshTopo.stopNetwork()
+
+    if store_path and not collect_results(test_path, store_path):
+        error("*** results of {} not collected\n".format(test_path))
+    return test_path
+
+def run_logged_experiment(config, store_path, slot=0):
+    """Runs one experiment, a failed experiment is logged and the sweep continues."""
+    try:
+        return run_experiment(config, store_path, slot)
+    except Exception:
+        error("*** experiment {} failed:\n{}".format(config, traceback.format_exc()))
+        return None
+
+def run_worker(slot, config_queue, store_path):
+    setLogLevel('info')
+    while True:
+        config = config_queue.get()
+        if config is None:
+            return
+        run_logged_experiment(config, store_path, slot)
+
+def run_sweep(configs, store_path, concurrent=1):
+    """Runs the experiments one after another or in concurrent worker processes."""
+    if concurrent <= 1:
+        for config in configs:
+            run_logged_experiment(config, store_path)
+        return
+
+    config_queue = multiprocessing.Queue()
+    for config in configs:
+        config_queue.put(config)
+    workers = [multiprocessing.Process(target=run_worker, args=(slot, config_queue, store_path))
+               for slot in range(1, concurrent + 1)]
+    for worker in workers:
+        config_queue.put(None)
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+if __name__ == '__main__':
+    parser = OptionParser(usage="usage: %prog [options] sweep_file")
+    parser.add_option('-c', '--concurrent',
+                      action='store',
+                      type='int',
+                      default=1,
+                      dest='concurrent',
+                      help="number of experiments running at the same time, default is 1.")
+    parser.add_option('-s', '--store',
+                      action='store',
+                      default='/mnt/master-thesis/Results/result_store',
+                      dest='store',
+                      help="root directory of the result store, empty to skip the collection.")
+    options, args = parser.parse_args()
+    if len(args) != 1:
+        parser.error("a sweep file is required")
+
+    with open(args[0], 'r') as sweep_file:
+        configs = list(expand_sweep(json.load(sweep_file)))
+
+    setLogLevel('info')
+    start_time = time.time()
+    run_sweep(configs, options.store, options.concurrent)
+    info("*** {} experiments done in {:.0f} s\n".format(len(configs), time.time() - start_time))
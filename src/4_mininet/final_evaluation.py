@@ -1,15 +1,62 @@
+import ast
 import logging
 import json
+import multiprocessing
 import re
 import os
 import sys
 from datetime import datetime
 import matplotlib.pyplot as plt
 import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '1_servicemanager', 'server'))
+import utils.result_log as ResultLog
+import utils.vector_statistics as Statistics
+import server_log_analyzer as ServerLog
+from evaluation_cache import EvaluationCache, get_fingerprint
+from server_log_analyzer import ServerLogAnalyzer
 
 
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(format='%(asctime)s %(levelname)-6s: %(filename)s:%(lineno)s (%(threadName)s) %(funcName)s\n%(message)s', level=logging.DEBUG)
+
+# one entry of a client log: ID:{'server_ip': ..., 'time_diff': ..., ...}, the quoted strings may contain braces
+CLIENT_RESULT_PATTERN = re.compile(r"""(\d+):(\{(?:[^{}'"]|'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")*\})""")
+
+def read_client_test_file(file_path, chunk_size=1 << 20):
+    """Yields the ID and the result dictionary of every entry of a client log.
+
+    The log is read in chunks and every entry is parsed on its own with
+    ast.literal_eval, so the file is never loaded as a whole and no code of
+    the log is executed. A missing closing bracket of a crashed client is
+    ignored.
+    """
+    with open(file_path, 'r') as test_file:
+        buffer = ''
+        while True:
+            chunk = test_file.read(chunk_size)
+            buffer += chunk
+            parsed_until = 0
+            for match in CLIENT_RESULT_PATTERN.finditer(buffer):
+                parsed_until = match.end()
+                yield int(match.group(1)), ast.literal_eval(match.group(2))
+            buffer = buffer[parsed_until:]
+            if not chunk:
+                return
+
+def get_node_number(subdir):
+    """Returns the host number of a host directory like .../h16 on Windows and Linux."""
+    return re.split(r'[\\/]h', subdir)[-1]
+
+def import_client_test_file(job):
+    """Reads one client log into a partial FinalResult in a worker process."""
+    test_index, test_path, file_path, node_number, remove_results_same_host = job
+    partial_results = FinalResult(test_path)
+    if file_path.endswith('.bin'):
+        FinalEvaluation.open_client_result_log(file_path, partial_results, node_number, remove_results_same_host)
+    else:
+        FinalEvaluation.open_client_test_file(file_path, partial_results, node_number, remove_results_same_host)
+    return test_index, partial_results
+
 #sleeping_time_list, time_diff_list, connection_attempts_list, hop_counter_list, server_list
 class FinalResult(object):
     def __init__(self, test_path):
@@ -33,10 +80,26 @@ class FinalResult(object):
         self.error_max_attempts = 0
         self.error_conn_reset = 0
         self.error_unknown = 0
+        self.error_dropped = 0
 
     def default(self, obj):
         return obj.__dict__
 
+    def merge(self, other):
+        # adds the partial results of one client log
+        self.sleeping_time_list.extend(other.sleeping_time_list)
+        self.time_diff_list.extend(other.time_diff_list)
+        self.connection_attempts_list.extend(other.connection_attempts_list)
+        self.hop_counter_list.extend(other.hop_counter_list)
+        for server, count in other.server_list.items():
+            self.server_list[server] = self.server_list.get(server, 0) + count
+
+        self.error_timed_out += other.error_timed_out
+        self.error_max_attempts += other.error_max_attempts
+        self.error_conn_reset += other.error_conn_reset
+        self.error_unknown += other.error_unknown
+        self.error_dropped += other.error_dropped
+
     def __repr__(self):
         return "{}".format(self.config)
 
@@ -54,18 +117,25 @@ class FinalServerResult(object):
         self.migrations_done_count = 0
         self.migration_rejected_mig_tresh_count = 0
         self.migration_rejected_num1_count = 0
+        self.migration_rejected_cost_count = 0
         self.migrations_error_count = 0
 
         self.migration_rejected_only_one_server = 0
+
+        # one dictionary per migration decision: start_time, time, from, to, result
+        self.migration_events = []
     def default(self, obj):
         return obj.__dict__
 
 class FinalEvaluation(object):
-    def __init__(self):
+    def __init__(self, cache_path=None):
         LOGGER.debug('evaluation init')
 
         self.final_result_list = []
         self.final_server_result_list = []
+
+        # the imported results of unchanged test directories are taken from the cache
+        self.evaluation_cache = EvaluationCache(cache_path) if cache_path is not None else None
         
     def __enter__(self):
         return self
@@ -74,7 +144,8 @@ class FinalEvaluation(object):
         LOGGER.debug('evaluation exit')
         return self
 
-    def extract_test_result(self, iteration, test_iteration_results):
+    @staticmethod
+    def extract_test_result(iteration, test_iteration_results):
         sleeping_time = float(test_iteration_results['sleeping_time'])
         connection_attempts = int(test_iteration_results['connection_attempts'])
         hop_counter = int(test_iteration_results['hop_counter'])
@@ -101,144 +172,171 @@ class FinalEvaluation(object):
         return sleeping_time, time_difference, connection_attempts, hop_counter, server, \
             error_timed_out, error_max_attempts, error_conn_reset, error_unknown
 
-    def open_client_test_file(self, file_path, final_results, node_number, remove_results_same_host):
-        test_results = None
-        try:
-            #LOGGER.info(file_path)
-            with open(file_path, 'r') as test_file:
-                #LOGGER.info(test_file.read())
-                test_results = eval(test_file.read())
-                for key, values in test_results.items():
-                    sleeping_time, time_difference, connection_attempts, hop_counter, server, error_timed_out, error_max_attempts, error_conn_reset, error_unknown = \
-                        self.extract_test_result(key, values)
-
-                    if remove_results_same_host is True and node_number == server.split('.')[3]:
-                        LOGGER.info("node_number and server are equal: {}->{}".format(node_number, server))
-                    else:
-                        #LOGGER.info("added entry: {}->{}".format(node_number, server))
-                        final_results.sleeping_time_list.append(sleeping_time)
-                        if time_difference is not None:
-                            final_results.time_diff_list.append(time_difference)
-                        final_results.connection_attempts_list.append(connection_attempts)
-                        final_results.hop_counter_list.append(hop_counter)
-
-                        if server in final_results.server_list:
-                            final_results.server_list[server] += 1
-                        else:
-                            final_results.server_list[server] = 1
-
-                        final_results.error_timed_out += error_timed_out
-                        final_results.error_max_attempts += error_max_attempts
-                        final_results.error_conn_reset += error_conn_reset
-                        final_results.error_unknown += error_unknown
-        except Exception as exc:
-            LOGGER.error(exc)
-            sys.exit(0)
+    @staticmethod
+    def open_client_test_file(file_path, final_results, node_number, remove_results_same_host):
+        #LOGGER.info(file_path)
+        for key, values in read_client_test_file(file_path):
+            sleeping_time, time_difference, connection_attempts, hop_counter, server, error_timed_out, error_max_attempts, error_conn_reset, error_unknown = \
+                FinalEvaluation.extract_test_result(key, values)
+
+            if remove_results_same_host is True and node_number == server.split('.')[3]:
+                LOGGER.info("node_number and server are equal: {}->{}".format(node_number, server))
+            else:
+                #LOGGER.info("added entry: {}->{}".format(node_number, server))
+                final_results.sleeping_time_list.append(sleeping_time)
+                if time_difference is not None:
+                    final_results.time_diff_list.append(time_difference)
+                final_results.connection_attempts_list.append(connection_attempts)
+                final_results.hop_counter_list.append(hop_counter)
+
+                if server in final_results.server_list:
+                    final_results.server_list[server] += 1
+                else:
+                    final_results.server_list[server] = 1
+
+                final_results.error_timed_out += error_timed_out
+                final_results.error_max_attempts += error_max_attempts
+                final_results.error_conn_reset += error_conn_reset
+                final_results.error_unknown += error_unknown
 
         return final_results
 
-    def import_client_test_files(self, test_path_list, remove_results_same_host):
-        for test_path in test_path_list:
+    @staticmethod
+    def open_client_result_log(file_path, final_results, node_number, remove_results_same_host):
+        # binary result log of the client, the columns are added as a whole
+        records = ResultLog.load_result_log(file_path)
+        if remove_results_same_host is True:
+            same_host = records['server_node'] == int(node_number)
+            if same_host.any():
+                LOGGER.info("removed %s entries of node %s", int(same_host.sum()), node_number)
+            records = records[~same_host]
+
+        error_codes = records['error_code']
+        successful = error_codes == ResultLog.ERROR_NONE
+
+        final_results.sleeping_time_list.extend(records['sleeping_time'].tolist())
+        final_results.time_diff_list.extend((records['latency_ns'][successful] / 1e9).tolist())
+        final_results.connection_attempts_list.extend(records['attempts'].tolist())
+        final_results.hop_counter_list.extend(records['hop_count'].tolist())
+
+        server_nodes, server_counts = np.unique(records['server_node'], return_counts=True)
+        for server_node, server_count in zip(server_nodes, server_counts):
+            server = "10.0.0.{}".format(server_node) if server_node >= 0 else None
+            final_results.server_list[server] = final_results.server_list.get(server, 0) + int(server_count)
+
+        final_results.error_timed_out += int(np.count_nonzero(error_codes == ResultLog.ERROR_TIMED_OUT))
+        final_results.error_max_attempts += int(np.count_nonzero(error_codes == ResultLog.ERROR_MAX_ATTEMPTS))
+        final_results.error_conn_reset += int(np.count_nonzero(error_codes == ResultLog.ERROR_CONN_RESET))
+        final_results.error_unknown += int(np.count_nonzero(error_codes == ResultLog.ERROR_UNKNOWN))
+        final_results.error_dropped += int(np.count_nonzero(error_codes == ResultLog.ERROR_DROPPED))
+
+        return final_results
+
+    def import_client_test_files(self, test_path_list, remove_results_same_host, processes=None):
+        # the client logs of all tests are parsed in a pool of processes, one log per job,
+        # and the partial results are added to the FinalResult of their test
+        jobs = []
+        final_results_list = []
+        fingerprints = {}
+        for test_index, test_path in enumerate(test_path_list):
             #LOGGER.info(test_path)
-            #sys.exit(0)
             final_results = FinalResult(test_path)
-            client_count = 0
+            final_results_list.append(final_results)
+            test_jobs = []
             for subdir, _, files in os.walk(test_path):
                 for file in files:
                     file_path = os.path.join(subdir, file)
-                    if 'client_results_output.log' in file_path:
-                        client_count += 1
-                        node_number = subdir.split('\h')[1]
+                    if file == 'client_results_output.bin' or 'client_results_output.log' in file_path:
+                        node_number = get_node_number(subdir)
                         #LOGGER.info("logfile found from host {}".format(node_number))
-                        final_results = self.open_client_test_file(
-                            file_path, final_results,
-                            node_number, remove_results_same_host)
-                        final_results.client_count = client_count
+                        test_jobs.append((test_index, test_path, file_path, node_number, remove_results_same_host))
 
-            self.final_result_list.append(final_results)
+            if self.evaluation_cache is not None:
+                fingerprints[test_index] = get_fingerprint(test_path, [job[2] for job in test_jobs])
+                if self.evaluation_cache.load(final_results, 'client', fingerprints[test_index],
+                                              remove_results_same_host):
+                    continue
+            jobs.extend(test_jobs)
 
-    def open_server_test_file(self, file_path, final_results, node_number, remove_results_same_host):
-        test_results = None
         try:
-            #LOGGER.info(file_path)
-            with open(file_path, 'r') as server_log_file:
-                #LOGGER.info(test_file.read())
-                server_log = server_log_file.read()
-                
-                regex_migrations_possible = "check_recent_connections_for_best_server: check_recent_connections_for_best_server enter"
-
-                regex_migrations_done = "send_service: service status code by other server: 200"
-                regex_migrations_done2 = "send_service: service status code by other server: OKAY"
-
-                regex_migration_rejected_mig_tresh = "check_recent_connections_for_best_server: The new server wouldn't be really better as a server. Migration rejected."
-
-                regex_migration_rejected_num1 = "check_recent_connections_for_best_server: No node as best server found!"
-
-                regex_migration_error_timed = "run: Service could not be migrated: timed out"
-                regex_migration_error_conflict = "run: Service could not be migrated: CONFLICT"
-
-                regex_migration_rejected_only_one_server = r"check_recent_connections_for_best_server: Best Nodes: \[\([0-9]*, [0-9]*.[0-9]*\)\].*"
-
-                regex_migration_rejected_num1_correction = r"migration_checker\.py:21[0-9] \(Thread-\d*\) check_recent_connections_for_best_server: Me=\(([0-9]*), [0-9]*.[0-9]*\), Other=\((\1), [0-9]*.[0-9]*\)"
-
-
-
-                #regex_test_already_over = r"migration_checker\.py:21[0-9] \(Thread-\d*\) check_recent_connections_for_best_server: Me=\([0-9]*, [0-9]*.[0-9]*\), Other=\([0-9]*, 0\.0\)"
-
-
-
-                migrations_possible = [m.start() for m in re.finditer(regex_migrations_possible, server_log)]
-                migrations_done = [m.start() for m in re.finditer(regex_migrations_done, server_log)]
-                migrations_done2 = [m.start() for m in re.finditer(regex_migrations_done2, server_log)]
-                migration_rejected_mig_tresh = [m.start() for m in re.finditer(regex_migration_rejected_mig_tresh, server_log)]
-                migration_rejected_num1 = [m.start() for m in re.finditer(regex_migration_rejected_num1, server_log)]
-                migration_rejected_num1_correction = [m.start() for m in re.finditer(regex_migration_rejected_num1_correction, server_log)]
-                migration_errors = [m.start() for m in re.finditer(regex_migration_error_timed, server_log)]
-                migration_conflict = [m.start() for m in re.finditer(regex_migration_error_conflict, server_log)]
-                #test_already_over = [m.start() for m in re.finditer(regex_test_already_over, server_log)]
-
-                migration_rejected_only_one_server = [m.start() for m in re.finditer(regex_migration_rejected_only_one_server, server_log)]
-                #if len(test_already_over) > 0:
-                #    LOGGER.info("%s, %s  %s", len(test_already_over), test_already_over, file_path)
+            pool = multiprocessing.Pool(processes)
+            try:
+                for test_index, partial_results in pool.imap_unordered(import_client_test_file, jobs):
+                    final_results_list[test_index].merge(partial_results)
+                    final_results_list[test_index].client_count += 1
+            finally:
+                pool.close()
+                pool.join()
+        except Exception as exc:
+            LOGGER.error(exc, exc_info=True)
+            sys.exit(0)
 
-                if len(migrations_done) > 0 and len(migrations_done2) > 0:
-                    LOGGER.info("There cant be two server versions")
-                    sys.exit(0)
+        if self.evaluation_cache is not None:
+            for test_index in set(job[0] for job in jobs):
+                self.evaluation_cache.store(final_results_list[test_index], 'client', fingerprints[test_index],
+                                            remove_results_same_host)
 
-                final_results.migrations_done_count += len(migrations_done) + len(migrations_done2) + len(migration_conflict)
-                final_results.migration_rejected_mig_tresh_count += len(migration_rejected_mig_tresh) - len(migration_rejected_num1_correction)
+        self.final_result_list.extend(final_results_list)
 
-                final_results.migration_rejected_num1_count += len(migration_rejected_num1) + len(migration_rejected_num1_correction)
-                final_results.migrations_error_count += len(migration_errors)
+    def open_server_test_file(self, file_path, final_results, node_number, remove_results_same_host):
+        try:
+            #LOGGER.info(file_path)
+            server_log_analyzer = ServerLogAnalyzer(node_number)
+            final_results.migration_events.extend(server_log_analyzer.read_events(file_path))
+            counters = server_log_analyzer.counters
 
-                final_results.migrations_possible_count = final_results.migrations_done_count + final_results.migration_rejected_mig_tresh_count+final_results.migration_rejected_num1_count+final_results.migrations_error_count
+            if counters[ServerLog.DONE] > 0 and counters[ServerLog.DONE_OKAY] > 0:
+                LOGGER.info("There cant be two server versions")
+                sys.exit(0)
 
-                final_results.migration_rejected_only_one_server += len(migration_rejected_only_one_server)
+            final_results.migrations_done_count += counters[ServerLog.DONE] + counters[ServerLog.DONE_OKAY] + \
+                counters[ServerLog.ERROR_CONFLICT]
+            final_results.migration_rejected_mig_tresh_count += counters[ServerLog.REJECTED_THRESHOLD] - \
+                counters[ServerLog.REJECTED_NO_NODE_CORRECTION]
 
+            final_results.migration_rejected_num1_count += counters[ServerLog.REJECTED_NO_NODE] + \
+                counters[ServerLog.REJECTED_NO_NODE_CORRECTION]
+            final_results.migration_rejected_cost_count += counters[ServerLog.REJECTED_COST]
+            final_results.migrations_error_count += counters[ServerLog.ERROR_TIMED_OUT]
 
-                return final_results
+            final_results.migrations_possible_count = final_results.migrations_done_count + final_results.migration_rejected_mig_tresh_count+final_results.migration_rejected_num1_count+final_results.migration_rejected_cost_count+final_results.migrations_error_count
 
+            final_results.migration_rejected_only_one_server += counters[ServerLog.REJECTED_ONLY_ONE_SERVER]
         except Exception as exc:
             LOGGER.error(exc, exc_info=True)
             sys.exit(0)
 
         return final_results
 
-    def import_server_test_files(self, test_path_list):
+    def import_server_test_files(self, test_path_list, remove_results_same_host=False):
         for test_path in test_path_list:
             #LOGGER.info(test_path)
             #sys.exit(0)
             final_results = FinalServerResult(test_path)
 
+            server_log_files = []
             for subdir, dirs, files in os.walk(test_path):
                 for file in files:
                     file_path = os.path.join(subdir, file)
                     if 'performance_server.log' in file_path:
-                        node_number = subdir.split('\h')[1]
-                        #LOGGER.info("logfile found from host {}".format(node_number))
-                        final_results = self.open_server_test_file(
-                            file_path, final_results,
-                            node_number, remove_results_same_host)
+                        server_log_files.append((subdir, file_path))
+
+            fingerprint = None
+            if self.evaluation_cache is not None:
+                fingerprint = get_fingerprint(test_path, [log_path for _, log_path in server_log_files])
+                if self.evaluation_cache.load(final_results, 'server', fingerprint, remove_results_same_host):
+                    self.final_server_result_list.append(final_results)
+                    continue
+
+            for subdir, file_path in server_log_files:
+                node_number = get_node_number(subdir)
+                #LOGGER.info("logfile found from host {}".format(node_number))
+                final_results = self.open_server_test_file(
+                    file_path, final_results,
+                    node_number, remove_results_same_host)
+
+            if self.evaluation_cache is not None:
+                self.evaluation_cache.store(final_results, 'server', fingerprint, remove_results_same_host)
 
             # LOGGER.info("1=%s", final_results.migrations_possible_count)
             # LOGGER.info("2=%s", final_results.migrations_done_count)
@@ -248,45 +346,12 @@ class FinalEvaluation(object):
             # LOGGER.info("6=%s", final_results.migration_rejected_only_one_server)
 
             self.final_server_result_list.append(final_results)
-    def mean(self, data):
-        """Return the sample arithmetic mean of data."""
-        n = len(data)
-        if n < 1:
-            raise ValueError('mean requires at least one data point')
-        return sum(data)/n # in Python 2 use sum(data)/float(n)
-
-    def _ss(self, data):
-        """Return sum of square deviations of sequence data."""
-        c = self.mean(data)
-        ss = sum((x-c)**2 for x in data)
-        return ss
-
-    def pstdev(self, data):
-        """Calculates the population standard deviation."""
-        n = len(data)
-        if n < 2:
-            raise ValueError('variance requires at least two data points')
-        ss = self._ss(data)
-        pvar = ss/n # the population variance
-        return pvar**0.5
-
-    def stdev(self, data):
-        """Calculates the population standard deviation."""
-        n = len(data)
-        if n < 2:
-            raise ValueError('variance requires at least two data points')
-        ss = self._ss(data)
-        var = ss/(n-1) # the population variance
-        return var**0.5
-
     def calculate_statistics_of_sorted_list(self, final_results, normalize):
         try:
-            sorted_list = []
             outliers_counter = 5
 
             #transform the values from seconds to milliseconds
-            for val in final_results.time_diff_list:
-                sorted_list.append(val * 1000)
+            sorted_list = np.asarray(final_results.time_diff_list, dtype=np.float64) * 1000
 
 
             #normalize sorted list by package size
@@ -296,84 +361,49 @@ class FinalEvaluation(object):
             if message_size != 1460 and normalize:
                 print(">>>>>>NORMALIZE<<<<<<")
                 normalization_factor = 1460 / message_size
-                sorted_list = [x * normalization_factor for x in sorted_list]
-
-            final_results.median = np.median(sorted_list)
-            final_results.upper_quartile = np.percentile(sorted_list, 75)
-            final_results.lower_quartile = np.percentile(sorted_list, 25)
-            final_results.range_val = sorted_list[-1] - sorted_list[0]
+                sorted_list = sorted_list * normalization_factor
 
-            final_results.iqr = final_results.upper_quartile - final_results.lower_quartile
-            final_results.iqr3_0 = 3.0 * final_results.iqr
+            rtt_statistics = Statistics.summarize(sorted_list)
+            boxplot_statistics = Statistics.get_boxplot_statistics(sorted_list)
 
-            final_results.counter_minor_outlier = 0
-            final_results.counter_extreme_outlier = 0
+            final_results.median = boxplot_statistics['median']
+            final_results.upper_quartile = boxplot_statistics['upper_quartile']
+            final_results.lower_quartile = boxplot_statistics['lower_quartile']
+            final_results.range_val = rtt_statistics['range']
 
-            final_results.rtt_mean = self.mean(sorted_list)
-            final_results.rtt_pstdev = self.pstdev(sorted_list)
-            final_results.rtt_stdev = self.stdev(sorted_list)
+            final_results.iqr = boxplot_statistics['iqr']
+            final_results.iqr3_0 = 3.0 * final_results.iqr
 
-            final_results.reconnection_mean = self.mean(final_results.connection_attempts_list)
-            final_results.reconnection_stdev = self.stdev(final_results.connection_attempts_list)
-            final_results.hop_mean = self.mean(final_results.hop_counter_list)
-            final_results.hop_stdev = self.stdev(final_results.hop_counter_list)
+            final_results.rtt_mean = rtt_statistics['mean']
+            final_results.rtt_pstdev = rtt_statistics['pstdev']
+            final_results.rtt_stdev = rtt_statistics['stdev']
 
-            list_boxplot = plt.boxplot(sorted_list)
-            boxplot_values = [item.get_ydata()[1] for item in list_boxplot['whiskers']]
-            final_results.lower_whisker = boxplot_values[0]
-            final_results.upper_whisker = boxplot_values[1]
+            reconnection_statistics = Statistics.summarize(final_results.connection_attempts_list, None)
+            final_results.reconnection_mean = reconnection_statistics['mean']
+            final_results.reconnection_stdev = reconnection_statistics['stdev']
+            hop_statistics = Statistics.summarize(final_results.hop_counter_list, None)
+            final_results.hop_mean = hop_statistics['mean']
+            final_results.hop_stdev = hop_statistics['stdev']
 
+            final_results.lower_whisker = boxplot_statistics['lower_whisker']
+            final_results.upper_whisker = boxplot_statistics['upper_whisker']
 
-            list_of_fliers = [item.get_ydata() for item in list_boxplot['fliers']][0]
+            list_of_fliers = boxplot_statistics['fliers']
             #LOGGER.info("listoffliers={}".format(list_of_fliers))
             #LOGGER.info("count={}".format(len(list_of_fliers)))
+            minor_outliers = (list_of_fliers >= final_results.upper_whisker) & (list_of_fliers < final_results.iqr3_0)
+            extreme_outliers = list_of_fliers >= final_results.iqr3_0
+            final_results.counter_minor_outlier = int(np.count_nonzero(minor_outliers))
+            final_results.counter_extreme_outlier = int(np.count_nonzero(extreme_outliers))
 
-            list_of_minor_outliers = []
-            list_of_extreme_outliers = []
-            for value in list_of_fliers:
-                if value >= final_results.upper_whisker and value < final_results.iqr3_0:
-                    final_results.counter_minor_outlier += 1
-                    list_of_minor_outliers.append(value)
-                elif value >= final_results.iqr3_0:
-                    final_results.counter_extreme_outlier += 1
-                    list_of_extreme_outliers.append(value)
-
-            # final_results.means_minor_outliers = []
-            # if len(list_of_minor_outliers) > 0:
-            #     for value in range(int((len(list_of_minor_outliers)/1000)) + 1):
-            #         pos_min = value*1000
-            #         pos_max = value*1000+1000
-            #         mean = self.mean(list_of_minor_outliers[pos_min:pos_max])
-            #         final_results.means_minor_outliers.append(mean)
-
-            # final_results.means_extreme_outliers = []
-            # if len(list_of_extreme_outliers) > 0:
-            #     for value in range(int((len(list_of_extreme_outliers)/1000)) + 1):
-            #         pos_min = value*1000
-            #         pos_max = value*1000+1000
-            #         mean = self.mean(list_of_extreme_outliers[pos_min:pos_max])
-            #         final_results.means_extreme_outliers.append(mean)
-
-            final_results.means_all_outliers = []
-            combination_value = len(list_of_fliers) / outliers_counter
-            print("combination value=", combination_value)
+            # the means of the outliers in outliers_counter groups of the sorted outliers
+            final_results.means_all_outliers = Statistics.get_chunk_means(list_of_fliers, outliers_counter)
             print("len_all_outliers=", len(list_of_fliers))
             print("len=", len(sorted_list))
-            for value in range(int((len(list_of_fliers)/combination_value))):
-                pos_min = value*combination_value
-                pos_max = value*combination_value+combination_value
-                print("pos_min=", pos_min, " pos_max=", pos_max)
-
-                mean = self.mean(list_of_fliers[pos_min:pos_max])
-                final_results.means_all_outliers.append(mean)
-
-            outliers_means_str = '  '
-            for outliers_means in final_results.means_all_outliers:
-                outliers_means_str += "(0, {}) ".format(outliers_means)
 
-            final_results.minimum_val = sorted_list[0]
-            final_results.maximum_val = sorted_list[-1]
-            final_results.total_count = len(sorted_list)
+            final_results.minimum_val = rtt_statistics['min']
+            final_results.maximum_val = rtt_statistics['max']
+            final_results.total_count = rtt_statistics['count']
 
             LOGGER.info("servers={}".format(final_results.server_list))
 
@@ -488,15 +518,17 @@ class FinalEvaluation(object):
                     "migrations_done;migrations_done_percentage;"+\
                     "migration_rejected_mig_tresh;migration_rejected_mig_tresh_percentage;"+\
                     "migration_rejected_num1;migration_rejected_num1_percentage;"+\
+                    "migration_rejected_cost;migration_rejected_cost_percentage;"+\
                     "migrations_error;migrations_error_percentage\n")
 
         migrations_done_percentage = (final_results.migrations_done_count / final_results.migrations_possible_count) * 100
         migration_rejected_mig_tresh_percentage = (final_results.migration_rejected_mig_tresh_count / final_results.migrations_possible_count) * 100
         migration_rejected_num1_percentage = (final_results.migration_rejected_num1_count / final_results.migrations_possible_count) * 100
+        migration_rejected_cost_percentage = (final_results.migration_rejected_cost_count / final_results.migrations_possible_count) * 100
         migrations_error_percentage = (final_results.migrations_error_count / final_results.migrations_possible_count) * 100
 
         with open(filename, 'a') as result_output_file:
-            result_output_file.write("{};{};{};{};{};{};{};{};{};{};{};{};{};{}\n".format(
+            result_output_file.write("{};{};{};{};{};{};{};{};{};{};{};{};{};{};{};{}\n".format(
                 final_results.config['repetition_counter'],
                 final_results.config['message_size'],
                 final_results.config['repetitions_per_minute'],
@@ -506,6 +538,7 @@ class FinalEvaluation(object):
                 final_results.migrations_done_count, migrations_done_percentage,
                 final_results.migration_rejected_mig_tresh_count, migration_rejected_mig_tresh_percentage,
                 final_results.migration_rejected_num1_count, migration_rejected_num1_percentage,
+                final_results.migration_rejected_cost_count, migration_rejected_cost_percentage,
                 final_results.migrations_error_count, migrations_error_percentage))
 
     def calculate_evaluation_results(self, output_file_name, index, final_results):
@@ -637,7 +670,7 @@ if __name__ == "__main__":
             if output_file_clients is None or output_file_servers is None or test_path_list is None:
                 continue
 
-            with FinalEvaluation() as final_evaluation:
+            with FinalEvaluation('../../Results/evaluation_cache/') as final_evaluation:
                     final_evaluation.import_client_test_files(test_path_list, remove_results_same_host)
 
                     for result_index, result in enumerate(final_evaluation.final_result_list):
@@ -2,6 +2,7 @@
 
 import json
 import logging
+import re
 import shutil
 import sys
 import time
@@ -20,11 +21,49 @@ from mininet.cli import CLI
 mininet_network = None
 adjacency_list_file_path = '/mnt/master-thesis/results/reachability_test/output_etx/seperated_adjacency_list.json'
 unreachable_hosts = '6,9,15,18,19,22,23,34,37,43,48,52,53,54,55,56,57,58,60'
+# the hosts running the test processes, the jobs are stopped on these hosts after the test
+operation_hosts = []
+
+## SERVER HOSTS
+#IOT_A_THROUGHPUT       = "11,45,30,50,12,28,33,44,1,17,39,49,10,24,32,2,8,27,47,25"
+#IOT_B_THROUGHPUT       = "42,13,31,7,4,29,41,51,14,36,40,59,16,26,46,5,21,38,20,35"
+#IOT_A_THROUGHPUT_HOSTS = ["h24", "h32", "h28", "h11", "h47"]
+#IOT_B_THROUGHPUT_HOSTS = ["h5", "h16", "h38", "h42", "h59"]
+
+INTERNET    = "3"
+
+IOT_A_ETX              = "35,26,28,24,29,11,16,31,30,21,27,25,5,10,4,2,1,7,8,20"
+IOT_A_ETX_WO_CLIENTS   = "26,28,24,16,31,30,27,25,5,10,4,2,1,7,8"
+IOT_B_ETX              = "47,59,46,51,50,13,14,49,42,41,45,17,12,40,44,38,39,33,32,36"
+IOT_A_ETX_HOSTS        = [ 'h20', 'h35', 'h29', 'h11', 'h21'] # h8>h20
+IOT_B_ETX_HOSTS        = ['h59', 'h47', 'h49', 'h44', 'h39'] #h32 > h39
+IOT_A_ETX_FIRST_SERVER = '16'
+IOT_B_ETX_FIRST_SERVER = '14'
+
+# scenario name: server hosts, client hosts, first server
+SCENARIOS = {
+    'iot_a_etx'             : (IOT_A_ETX, IOT_A_ETX_HOSTS, IOT_A_ETX_FIRST_SERVER),
+    'iot_a_etx_wo_clients'  : (IOT_A_ETX_WO_CLIENTS, IOT_A_ETX_HOSTS, IOT_A_ETX_FIRST_SERVER),
+    'iot_b_etx'             : (IOT_B_ETX, IOT_B_ETX_HOSTS, IOT_B_ETX_FIRST_SERVER),
+    'fixed_server'          : (INTERNET, IOT_A_ETX_HOSTS, INTERNET),
+}
+
+STP_STATE_PATTERN = re.compile(r'stp_state="?(\w+)')
+# a converged port forwards, is blocked by the spanning tree or has no link
+STP_SETTLED_STATES = ('forwarding', 'blocking', 'disabled')
+
+def get_node_prefix(slot):
+    # concurrent networks share the root namespace and OVS, so their switches and interfaces need own names
+    return 'e{}'.format(slot) if slot else ''
+
+def get_plain_name(node_name, slot):
+    return node_name[len(get_node_prefix(slot)):]
 
 class MeshNetworkTopo(Topo):
-    def build(self, adjacency_list):
+    def build(self, adjacency_list, slot=0):
         hosts = []
         switches = []
+        prefix = get_node_prefix(slot)
 
         #operator_host = self.addHost('operator', ip = '10.0.0.100')
 
@@ -33,8 +72,10 @@ class MeshNetworkTopo(Topo):
                 continue
 
             # Each host gets 50%/n of system CPU
-            host = self.addHost('h{}'.format(index), ip='10.0.0.{}/24'.format(index))#, cpu=.5/41)
-            switch = self.addSwitch('s{}'.format(index), cls=OVSSwitch)
+            host = self.addHost('{}h{}'.format(prefix, index), ip='10.0.0.{}/24'.format(index))#, cpu=.5/41)
+            # the class of the switches is given by the network
+            switch = self.addSwitch('{}s{}'.format(prefix, index),
+                                    dpid='{:016x}'.format((slot << 16) | index))
             #, failMode='standalone', stp=1))
             hosts.append(host)
             switches.append(switch)
@@ -57,9 +98,99 @@ class MeshNetworkTopo(Topo):
                 #, max_queue_size=1000000,
                 linkopts = dict(bw=bandwidth, loss=loss_rate, use_htb=True)
 
-                self.addLink('s{}'.format(index), 's{}'.format(node_number), **linkopts)
-
-def initNetwork(client_hosts):
+                self.addLink('{}s{}'.format(prefix, index), '{}s{}'.format(prefix, node_number), **linkopts)
+
+def wait_until(probe, timeout, interval=1.0, description="probe"):
+    """Calls the probe until it returns True or the timeout expires."""
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if probe() is True:
+            info("*** {} ready after {:.1f} s\n".format(description, time.time() - start_time))
+            return True
+        time.sleep(interval)
+    error("*** {} not ready after {} s\n".format(description, timeout))
+    return False
+
+def wait_for_routes(client_hosts, first_server, slot=0, timeout=300):
+    """Waits until every client host reaches the first server."""
+    global mininet_network
+    server_ip = '10.0.0.{}'.format(first_server)
+    waiting_hosts = set(client_hosts)
+
+    def probe():
+        for host_name in list(waiting_hosts):
+            host = mininet_network.get(get_node_prefix(slot) + host_name)
+            host.cmd('ping -c1 -W1 {}'.format(server_ip))
+            if int(host.cmd('echo $?').strip() or 1) == 0:
+                waiting_hosts.discard(host_name)
+        return not waiting_hosts
+
+    return wait_until(probe, timeout, description="routes to {}".format(server_ip))
+
+def get_stp_states(switches):
+    """Returns the STP state of every port of the switches by the port name."""
+    switch_names = set(switch.name for switch in switches)
+    states = {}
+    # one record per port: the name in the first line, the status map in the second
+    records = switches[0].cmd('ovs-vsctl --bare --columns=name,status list port').split('\n\n')
+    for record in records:
+        lines = record.strip().splitlines()
+        # the internal port of a bridge takes no part in the spanning tree
+        if not lines or '-eth' not in lines[0] or lines[0].split('-eth')[0] not in switch_names:
+            continue
+        state_match = STP_STATE_PATTERN.search(record)
+        states[lines[0]] = state_match.group(1) if state_match else None
+    return states
+
+def wait_for_stp(switches, timeout=180):
+    """Waits until the spanning tree has converged, all ports forward or block."""
+    def probe():
+        states = get_stp_states(switches)
+        return bool(states) and all(state in STP_SETTLED_STATES for state in states.values())
+
+    return wait_until(probe, timeout, description="spanning tree")
+
+def wait_for_reachability(hosts, slot=0, timeout=120):
+    """Pings all host pairs in parallel until every pair is reachable.
+
+    Every host pings the hosts it has not reached yet at the same time, all
+    hosts are sweeping in parallel. The pings also let the controller learn
+    the hosts and install the paths, like pingAll did before.
+    """
+    excluded_hosts = set('h' + number for number in unreachable_hosts.split(','))
+    hosts = [host for host in hosts if get_plain_name(host.name, slot) not in excluded_hosts]
+    missing_pairs = dict((host, set(other.IP() for other in hosts if other is not host)) for host in hosts)
+
+    def probe():
+        sweeping_hosts = [host for host in hosts if missing_pairs[host]]
+        for host in sweeping_hosts:
+            host.sendCmd('for ip in {}; do (ping -c1 -W1 $ip >/dev/null 2>&1 && echo reached $ip) & done; wait'.format(
+                ' '.join(sorted(missing_pairs[host]))))
+        for host in sweeping_hosts:
+            for reached_ip in re.findall(r'reached (\S+)', host.waitOutput()):
+                missing_pairs[host].discard(reached_ip)
+        missing_count = sum(len(ips) for ips in missing_pairs.values())
+        debug("*** {} host pairs not reachable yet\n".format(missing_count))
+        return missing_count == 0
+
+    return wait_until(probe, timeout, interval=0.5, description="reachability of {} hosts".format(len(hosts)))
+
+def is_port_listening(host, port):
+    return host.cmd("ss -Hltn 'sport = :{}'".format(port)).strip() != ''
+
+def wait_for_service_managers(hosts, first_server_host, timeout=120):
+    """Waits until the service managers listen on the transporter port and the first service is up."""
+    waiting_hosts = set(hosts)
+
+    def probe():
+        for host in list(waiting_hosts):
+            if is_port_listening(host, 6001):
+                waiting_hosts.discard(host)
+        return not waiting_hosts and is_port_listening(first_server_host, 5000)
+
+    return wait_until(probe, timeout, description="service managers")
+
+def initNetwork(client_hosts, slot=0):
     global mininet_network, adjacency_list_file_path
     
     #Create network and run simple performance test
@@ -76,18 +207,14 @@ def initNetwork(client_hosts):
         error("Unexpected error={}".format(sys.exc_info()[0]))
 
 
-    topology = MeshNetworkTopo(adjacency_list)
-    switch = partial(OVSSwitch, protocols='OpenFlow13')
+    topology = MeshNetworkTopo(adjacency_list, slot=slot)
+    # the bridges are created on the start of the network, so the switch class enables STP
+    switch = partial(OVSSwitch, protocols='OpenFlow13', stp=True)
     mininet_network = Mininet(topo=topology, link=TCLink, switch=switch, build=False)
     #, host=CPULimitedHost, , autoStaticArp=True)
 
     mininet_network.addController('c0', controller=RemoteController, ip="127.0.0.1", port=6653)
 
-    for index, switch in enumerate(mininet_network.switches):
-        #switch = mininet_network.get(switch_name)
-        switch.cmd('ifconfig {} 10.0.1.{}'.format(switch.name, index+1))
-        switch.cmd('ovs-vsctl set bridge {} protocols=OpenFlow13 stp-enable=true'.format(switch.name))
-
     mininet_network.build()
 
     #controller=POX
@@ -95,7 +222,13 @@ def initNetwork(client_hosts):
     #host=CPULimitedHost
     mininet_network.start()
 
-    time.sleep(120)
+    for index, switch in enumerate(mininet_network.switches):
+        #switch = mininet_network.get(switch_name)
+        switch.cmd('ifconfig {} 10.{}.1.{}'.format(switch.name, slot, index+1))
+
+    # the network is ready, as soon as the spanning tree has converged and the controller routes all hosts
+    if not wait_for_stp(mininet_network.switches):
+        return False
 
 
     #CLI(mininet_network)
@@ -109,7 +242,7 @@ def initNetwork(client_hosts):
     #         host1, host2 = mininet_network.get(host, other_host)
     #         info(host1.cmd('ping -c100 -i0.5 %s' % host2.IP()))
 
-    mininet_network.pingAll()
+    return wait_for_reachability(mininet_network.hosts, slot=slot)
 
 
 
@@ -130,8 +263,9 @@ def initNetwork(client_hosts):
     #h1, h4 = net.get('h1', 'h4')
     #net.iperf((h1, h4))
     
-def startOperations(repetitions, start_delay, message_size, repetitions_p_minute, migration_time, server_hosts, first_server, client_hosts):
-    global mininet_network, adjacency_list_file_path, unreachable_hosts
+def startOperations(repetitions, start_delay, message_size, repetitions_p_minute, migration_time, server_hosts, first_server, client_hosts,
+                    slot=0):
+    global mininet_network, adjacency_list_file_path, unreachable_hosts, operation_hosts
     migration_threshold = 2.0
 #    if server_hosts and  first_server not in server_hosts.split(','):
 #        first_server = "1"
@@ -143,6 +277,9 @@ def startOperations(repetitions, start_delay, message_size, repetitions_p_minute
         time.strftime("%Y-%m-%d-%H-%M-%S"), repetitions, 
         start_delay, message_size, repetitions_p_minute,
         migration_time, migration_threshold)
+    if slot:
+        # concurrent tests can start in the same second
+        test_path = test_path[:-1] + '_slot{}/'.format(slot)
 
     #adjacency_list, unreachable_hosts, repetitions, start_delay, message_size, requests_p_minute
     client_execfile_path = project_path + '3_performance/performance_client.py {} {} {} {} {} {} {}'.format(
@@ -167,39 +304,46 @@ def startOperations(repetitions, start_delay, message_size, repetitions_p_minute
     #os.mkdir(test_path + "operator/")
 
     client_exection_paths = {}
+    first_server_host = None
     for index, host in enumerate(mininet_network.hosts):
         #if host.name == "operator":
         #    continue
+        host_name = get_plain_name(host.name, slot)
 
-        os.mkdir(test_path + '{}/'.format(host.name))
+        os.mkdir(test_path + '{}/'.format(host_name))
 
-        client_exection_path = "cd " + test_path + "{}/".format(host.name) + \
+        client_exection_path = "cd " + test_path + "{}/".format(host_name) + \
                                " && python " + client_execfile_path + \
                                " >> ./performance_client.log 2>&1 &"
 
-        client_exection_paths[host.name] = client_exection_path
+        client_exection_paths[host_name] = client_exection_path
 
-        if host.name == "h{}".format(first_server):
+        if host_name == "h{}".format(first_server):
             info("h{} is executing the first server now".format(first_server))
-            shutil.copy(service_execfile_path, test_path + "{}/service.py".format(host.name))
-            server_exection_path = "cd " + test_path + "{}/".format(host.name) + \
+            first_server_host = host
+            shutil.copy(service_execfile_path, test_path + "{}/service.py".format(host_name))
+            server_exection_path = "cd " + test_path + "{}/".format(host_name) + \
                                    " && python " + server_execfile_path + \
                                    " -r" + \
                                    " >> ./performance_server.log 2>&1 &"
 
         else:
-            server_exection_path = "cd " + test_path + "{}/".format(host.name) + \
+            server_exection_path = "cd " + test_path + "{}/".format(host_name) + \
                                    " && python " + server_execfile_path + \
                                    " >> ./performance_server.log 2>&1 &"
 
         host.cmd(server_exection_path)
 
+    operation_hosts = list(mininet_network.hosts)
+    # the clients start, as soon as the service managers and the first service accept connections
+    wait_for_service_managers(mininet_network.hosts, first_server_host)
+
     for index, host in enumerate(mininet_network.hosts):
         #     continue
         # if host.name == "operator":
         
-        if host.name in client_hosts:
-            host.cmd(client_exection_paths[host.name])
+        if get_plain_name(host.name, slot) in client_hosts:
+            host.cmd(client_exection_paths[get_plain_name(host.name, slot)])
 
 
     # operator_exection_path = "cd " + test_path + "operator/" + \
@@ -208,28 +352,34 @@ def startOperations(repetitions, start_delay, message_size, repetitions_p_minute
 
     # mininet_network.get('operator').cmd(operator_exection_path)    
 
+    return test_path
+
+def stopOperations(grace_period=10.0):
+    """Stops the test processes, which have been started in the shells of the hosts."""
+    global operation_hosts
+
+    if not operation_hosts:
+        return
+
+    # the hosts share the PID namespace, so only the jobs of their own shells are signalled,
+    # every job has its own process group with the python process behind the cd
+    for host in operation_hosts:
+        host.cmd('for pid in $(jobs -p); do kill -INT -- -$pid; done 2>/dev/null')
+    time.sleep(grace_period)
+    for host in operation_hosts:
+        host.cmd('for pid in $(jobs -p); do kill -KILL -- -$pid; done 2>/dev/null')
+    operation_hosts = []
+
 def stopNetwork():
     global mininet_network
 
+    # only a network, which has been created and not stopped yet, is stopped
+    if mininet_network is None:
+        return
     mininet_network.stop()
+    mininet_network = None
 
 if __name__ == '__main__':
-    ## SERVER HOSTS
-    #IOT_A_THROUGHPUT       = "11,45,30,50,12,28,33,44,1,17,39,49,10,24,32,2,8,27,47,25"
-    #IOT_B_THROUGHPUT       = "42,13,31,7,4,29,41,51,14,36,40,59,16,26,46,5,21,38,20,35"
-    #IOT_A_THROUGHPUT_HOSTS = ["h24", "h32", "h28", "h11", "h47"]
-    #IOT_B_THROUGHPUT_HOSTS = ["h5", "h16", "h38", "h42", "h59"]
-
-    INTERNET    = "3"
-
-    IOT_A_ETX              = "35,26,28,24,29,11,16,31,30,21,27,25,5,10,4,2,1,7,8,20"
-    IOT_A_ETX_WO_CLIENTS   = "26,28,24,16,31,30,27,25,5,10,4,2,1,7,8"
-    IOT_B_ETX              = "47,59,46,51,50,13,14,49,42,41,45,17,12,40,44,38,39,33,32,36"
-    IOT_A_ETX_HOSTS        = [ 'h20', 'h35', 'h29', 'h11', 'h21'] # h8>h20
-    IOT_B_ETX_HOSTS        = ['h59', 'h47', 'h49', 'h44', 'h39'] #h32 > h39
-    IOT_A_ETX_FIRST_SERVER = '16'
-    IOT_B_ETX_FIRST_SERVER = '14'
-
     ###################################################
     ################## CONFIGURATION ##################
     ###################################################
@@ -264,8 +414,10 @@ if __name__ == '__main__':
     # first_server            = '1'
 
     setLogLevel('info')
-    initNetwork(client_hosts)
-    time.sleep(10)
+    if not initNetwork(client_hosts) or not wait_for_routes(client_hosts, first_server):
+        error("*** network is not ready, aborting\n")
+        stopNetwork()
+        sys.exit(1)
     startOperations(repetitions, start_delay, message_size,
                     repetitions_p_minute, migration_time,
                     server_hosts, first_server, client_hosts)
@@ -0,0 +1,191 @@
+"""Columnar store of the evaluated test runs.
+
+Every test run is stored once in a directory partitioned by its configuration
+parameters, e.g.
+
+    store/message_size=1460/repetitions_per_minute=10/migration_time=30/
+        migration_treshold=2.0/test_time2016-10-05-22-06-06_rep2000_.../
+
+The directory holds one compressed NumPy array per column (columns.npz) and
+the scalar results and the remaining configuration (meta.json). A query
+selects the partitions by their directory names and reads only the columns
+it needs, so no log is parsed again and no regex is run over the paths.
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+from optparse import OptionParser
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+PARTITION_KEYS = ('message_size', 'repetitions_per_minute', 'migration_time', 'migration_treshold')
+COLUMNS = {'time_diff': np.float64,
+           'sleeping_time': np.float64,
+           'connection_attempts': np.int32,
+           'hop_counter': np.int32}
+META_KEYS = ('client_count', 'error_timed_out', 'error_max_attempts', 'error_conn_reset', 'error_unknown',
+             'error_dropped')
+SERVER_META_KEYS = ('migrations_possible_count', 'migrations_done_count', 'migration_rejected_mig_tresh_count',
+                    'migration_rejected_num1_count', 'migration_rejected_cost_count', 'migrations_error_count',
+                    'migration_rejected_only_one_server')
+
+class ResultStore(object):
+    """Writes FinalResults into the store and reads columns of selected runs.
+
+    Attributes:
+        store_path (:obj:`str`): The root directory of the store.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self
+
+    def get_run_path(self, config, run_name):
+        partition = ["{}={}".format(key, config.get(key)) for key in PARTITION_KEYS]
+        return os.path.join(self.store_path, *(partition + [run_name]))
+
+    def ingest(self, final_results, final_server_results=None):
+        """Stores the client results and optionally the server results of one test run.
+
+        The run is written into a temporary directory and renamed, so a query
+        never sees a half written run. An existing run is replaced.
+
+        Returns:
+            The directory of the run.
+        """
+        run_name = os.path.basename(os.path.normpath(final_results.test_path))
+        run_path = self.get_run_path(final_results.config, run_name)
+        temporary_path = run_path + '.tmp'
+        if os.path.exists(temporary_path):
+            shutil.rmtree(temporary_path)
+        os.makedirs(temporary_path)
+
+        columns = dict((column, np.asarray(getattr(final_results, column + '_list'), dtype=dtype))
+                       for column, dtype in COLUMNS.items())
+        np.savez_compressed(os.path.join(temporary_path, 'columns.npz'), **columns)
+
+        meta = {'test_path': final_results.test_path,
+                'config': final_results.config,
+                'server_list': final_results.server_list}
+        for key in META_KEYS:
+            meta[key] = getattr(final_results, key)
+        if final_server_results is not None:
+            for key in SERVER_META_KEYS:
+                meta[key] = getattr(final_server_results, key)
+        with open(os.path.join(temporary_path, 'meta.json'), 'w') as meta_file:
+            json.dump(meta, meta_file, default=str)
+
+        if os.path.exists(run_path):
+            shutil.rmtree(run_path)
+        os.rename(temporary_path, run_path)
+        LOGGER.info("stored %s", run_path)
+        return run_path
+
+    def list_runs(self, **filters):
+        """Yields the partition values and the directory of every run matching the filters.
+
+        Args:
+            **filters: Partition keys with the wanted value or a list of
+                values, e.g. migration_time=['30', '60'].
+        """
+        filters = dict((key, set(str(v) for v in (value if isinstance(value, (list, tuple, set)) else [value])))
+                       for key, value in filters.items())
+        unknown_keys = set(filters) - set(PARTITION_KEYS)
+        if unknown_keys:
+            raise ValueError("no partition keys: {}".format(sorted(unknown_keys)))
+
+        def walk(path, depth, partition):
+            if depth == len(PARTITION_KEYS):
+                for run_name in sorted(os.listdir(path)):
+                    if not run_name.endswith('.tmp'):
+                        yield dict(partition), os.path.join(path, run_name)
+                return
+            key = PARTITION_KEYS[depth]
+            for entry in sorted(os.listdir(path)):
+                name, _, value = entry.partition('=')
+                if name != key or (key in filters and value not in filters[key]):
+                    continue
+                partition[key] = value
+                for run in walk(os.path.join(path, entry), depth + 1, partition):
+                    yield run
+
+        if not os.path.isdir(self.store_path):
+            return iter([])
+        return walk(self.store_path, 0, {})
+
+    def scan(self, columns, meta=False, **filters):
+        """Yields the partition values and the requested columns of every matching run.
+
+        Only the members of the requested columns are decompressed.
+        """
+        for partition, run_path in self.list_runs(**filters):
+            with np.load(os.path.join(run_path, 'columns.npz')) as run_columns:
+                values = dict((column, run_columns[column]) for column in columns)
+            if meta:
+                with open(os.path.join(run_path, 'meta.json'), 'r') as meta_file:
+                    values['meta'] = json.load(meta_file)
+            yield partition, values
+
+    def query(self, column, function, group_by, **filters):
+        """Applies a function to the column of all runs grouped by partition keys.
+
+        Args:
+            column (:obj:`str`): The column, e.g. time_diff.
+            function (:obj: function): The function of the concatenated
+                values, e.g. lambda values: np.percentile(values, 99).
+            group_by (:obj:`str` or :obj:`tuple`): The partition key(s).
+            **filters: See list_runs.
+
+        Returns:
+            A dictionary of the function results by the group values.
+        """
+        if isinstance(group_by, str):
+            group_by = (group_by,)
+        groups = {}
+        for partition, values in self.scan([column], **filters):
+            group = tuple(partition[key] for key in group_by)
+            groups.setdefault(group if len(group) > 1 else group[0], []).append(values[column])
+        return dict((group, function(np.concatenate(arrays))) for group, arrays in groups.items())
+
+if __name__ == "__main__":
+    parser = OptionParser(usage="usage: %prog [options] [test_path ...]")
+    parser.add_option('-s', '--store',
+                      action='store',
+                      default='../../Results/result_store',
+                      dest='store',
+                      help="root directory of the result store.")
+    parser.add_option('-q', '--query',
+                      action='store',
+                      default=None,
+                      dest='query',
+                      help="partition key to group the p99 of time_diff by, instead of ingesting.")
+    options, test_paths = parser.parse_args()
+
+    from final_evaluation import FinalEvaluation, get_config
+
+    with ResultStore(options.store) as result_store:
+        if options.query is not None:
+            for group, p99 in sorted(result_store.query('time_diff', lambda values: np.percentile(values, 99) * 1000,
+                                                        options.query).items()):
+                print("{}={}: p99={:.3f} ms".format(options.query, group, p99))
+            sys.exit(0)
+
+        test_path_lists = [test_paths] if test_paths else [get_config(index)[2] for index in range(6)]
+        for test_path_list in test_path_lists:
+            if not test_path_list:
+                continue
+            with FinalEvaluation() as final_evaluation:
+                final_evaluation.import_client_test_files(test_path_list, False)
+                final_evaluation.import_server_test_files(test_path_list)
+                for final_results, final_server_results in zip(final_evaluation.final_result_list,
+                                                                final_evaluation.final_server_result_list):
+                    result_store.ingest(final_results, final_server_results)
@@ -0,0 +1,148 @@
+"""Single-pass analyzer of the performance_server.log of the service managers.
+
+Every line is split once into its header (time, file, line, thread, function)
+and message. The function name selects the few message patterns of that
+function from a dispatch table, so each line is classified once and all
+other lines are skipped after one dictionary lookup. The file is read line
+by line and never loaded as a whole.
+"""
+
+import logging
+import re
+from collections import Counter
+from datetime import datetime
+
+LOGGER = logging.getLogger(__name__)
+
+LINE_PATTERN = re.compile(r"(?P<file>[\w.]+):(?P<line>\d+) \((?P<thread>[^)]*)\) (?P<function>\w+): (?P<message>.*)")
+# a Me=Other line only corrects the counters, if it has been logged by the migration checker
+CORRECTION_LOCATION_PATTERN = re.compile(r"migration_checker\.py:21[0-9] \(Thread-\d*\)$")
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+POSSIBLE = 'possible'
+DONE = 'done'
+DONE_OKAY = 'done_okay'
+REJECTED_THRESHOLD = 'rejected_mig_tresh'
+REJECTED_COST = 'rejected_cost'
+REJECTED_NO_NODE = 'rejected_num1'
+REJECTED_NO_NODE_CORRECTION = 'rejected_num1_correction'
+REJECTED_ONLY_ONE_SERVER = 'rejected_only_one_server'
+BEST_NODES = 'best_nodes'
+ERROR_TIMED_OUT = 'error_timed_out'
+ERROR_CONFLICT = 'error_conflict'
+
+# function name -> (message pattern, kind); the first matching pattern classifies the line
+DISPATCH_TABLE = {
+    'check_recent_connections_for_best_server': [
+        (re.compile(r"check_recent_connections_for_best_server enter"), POSSIBLE),
+        (re.compile(r"The new server wouldn't be really better as a server. Migration rejected."), REJECTED_THRESHOLD),
+        (re.compile(r"The predicted savings don't exceed the migration cost. Migration rejected."), REJECTED_COST),
+        (re.compile(r"No node as best server found!"), REJECTED_NO_NODE),
+        (re.compile(r"Me=\(([0-9]*), [0-9]*.[0-9]*\), Other=\((\1), [0-9]*.[0-9]*\)"), REJECTED_NO_NODE_CORRECTION),
+        (re.compile(r"Best Nodes: \[\((?P<node>[0-9]*), [0-9]*.[0-9]*\)\]"), REJECTED_ONLY_ONE_SERVER),
+        (re.compile(r"Best Nodes: \[\((?P<node>[0-9]*),"), BEST_NODES)],
+    'send_service': [
+        (re.compile(r"service status code by other server: 200"), DONE),
+        (re.compile(r"service status code by other server: OKAY"), DONE_OKAY)],
+    'run': [
+        (re.compile(r"Service could not be migrated: timed out"), ERROR_TIMED_OUT),
+        (re.compile(r"Service could not be migrated: CONFLICT"), ERROR_CONFLICT)],
+}
+
+# the kinds, which end a migration decision, with the result of the event
+RESULTS = {
+    DONE: 'done',
+    DONE_OKAY: 'done',
+    REJECTED_THRESHOLD: 'rejected_threshold',
+    REJECTED_COST: 'rejected_cost',
+    REJECTED_NO_NODE: 'rejected_no_node',
+    ERROR_TIMED_OUT: 'error_timed_out',
+    ERROR_CONFLICT: 'conflict',
+}
+
+class ServerLogAnalyzer(object):
+    """Counts the migration decisions of one server log and yields them as events.
+
+    Attributes:
+        node_number (:obj:`str`): The host of the log, the source of the
+            migrations.
+        counters (:obj:`Counter`): The number of lines per kind.
+    """
+
+    def __init__(self, node_number=None):
+        self.node_number = node_number
+        self.counters = Counter()
+
+    @staticmethod
+    def classify_line(line):
+        """Returns the kind, the match and the header match of a log line or None."""
+        line_match = LINE_PATTERN.search(line)
+        if line_match is None:
+            return None
+        patterns = DISPATCH_TABLE.get(line_match.group('function'))
+        if patterns is None:
+            return None
+
+        message = line_match.group('message')
+        for pattern, kind in patterns:
+            match = pattern.match(message)
+            if match is not None:
+                if kind == REJECTED_NO_NODE_CORRECTION and \
+                   not CORRECTION_LOCATION_PATTERN.match("{}:{} ({})".format(
+                       line_match.group('file'), line_match.group('line'), line_match.group('thread'))):
+                    return None
+                return kind, match, line_match
+        return None
+
+    @staticmethod
+    def parse_time(line):
+        try:
+            return datetime.strptime(line[:23], TIME_FORMAT)
+        except ValueError:
+            return None
+
+    def read_events(self, file_path):
+        """Yields one event per migration decision of the log.
+
+        An event is a dictionary with the time, the source node, the chosen
+        destination node (None if unknown) and the result. The counters are
+        updated while reading.
+        """
+        best_node = None
+        start_time = None
+        correction_pending = False
+        with open(file_path, 'r') as server_log_file:
+            for line in server_log_file:
+                classification = self.classify_line(line)
+                if classification is None:
+                    continue
+                kind, match, _ = classification
+                self.counters[kind] += 1
+
+                if kind in (BEST_NODES, REJECTED_ONLY_ONE_SERVER):
+                    # the first of the best nodes is the destination of the migration
+                    best_node = match.group('node')
+                    continue
+                if kind == POSSIBLE:
+                    best_node = None
+                    start_time = self.parse_time(line)
+                    continue
+                if kind == REJECTED_NO_NODE_CORRECTION:
+                    # the server itself is the best node, the following rejection counts as no node found
+                    correction_pending = True
+                    continue
+
+                result = RESULTS[kind]
+                if kind == REJECTED_THRESHOLD and correction_pending:
+                    result = RESULTS[REJECTED_NO_NODE]
+                correction_pending = False
+
+                yield {'start_time': start_time,
+                       'time': self.parse_time(line),
+                       'from': self.node_number,
+                       'to': best_node if result != RESULTS[REJECTED_NO_NODE] else None,
+                       'result': result}
+
+    def analyze(self, file_path):
+        """Reads the whole log and returns the list of its migration events."""
+        return list(self.read_events(file_path))